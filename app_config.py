@@ -0,0 +1,23 @@
+"""Расположение и загрузка JSON-конфигурации приложения (без зависимостей от GUI)"""
+
+import json
+import os
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "configs/test_config.json")
+
+
+def load_config(path: str = DEFAULT_CONFIG_PATH):
+    """
+    Загрузить конфигурацию из JSON-файла
+
+    Returns:
+        Словарь с конфигурацией или None, если файл отсутствует или поврежден
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ошибка при загрузке конфигурации {path}: {e}")
+        return None
@@ -0,0 +1 @@
+"""Замеры производительности на синтетических данных (запуск: python -m benchmarks.<модуль>)"""
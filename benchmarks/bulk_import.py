@@ -0,0 +1,83 @@
+"""
+Импорт сотрудников: add_employee в цикле (транзакция и соединение на каждого)
+и add_employees_bulk (одна транзакция, executemany, справочник диагнозов в памяти)
+
+Запуск: python -m benchmarks.bulk_import [число сотрудников]
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.connection_latency import LEGACY_SETTINGS
+from benchmarks.synthetic import create_synthetic_db
+from database import DatabaseManager, DEFAULT_DATABASE_SETTINGS
+
+
+def import_records(db: DatabaseManager, num_employees: int, seed: int = 0) -> list:
+    """Данные сотрудников для импорта: диагнозы из справочника и 5% новых названий"""
+    rng = random.Random(seed)
+    positions = [position['id'] for position in db.get_positions()]
+    departments = [department['id'] for department in db.get_all_departments()]
+    category_names = db.diagnosis_dictionary.category_names
+    diagnoses = [(category_names[diag['category_id']], diag['name']) for diag in db.get_all_diagnoses()
+                 if diag['category_id'] in category_names]
+
+    records = []
+    for i in range(num_employees):
+        employee_diagnoses = {}
+        for category, name in rng.sample(diagnoses, min(len(diagnoses), rng.randint(0, 5))):
+            if rng.random() < 0.05:
+                name = f"{name} (импорт {rng.randint(1, 200)})"
+            employee_diagnoses.setdefault(category, []).append(name)
+
+        records.append({
+            'lastname': f"Импортов{i}", 'firstname': 'Иван', 'patronymic': 'Иванович',
+            'birth_date': '1980-01-01', 'gender': 'М', 'start_year': '2000-01-01',
+            'position_id': rng.choice(positions), 'department_id': rng.choice(departments),
+            'diagnoses': employee_diagnoses,
+            'prof_harm_code': 'Т75.2' if rng.random() < 0.4 else '', 'prof_harm_year': '2010-01-01',
+            'disability_group': rng.randint(1, 3) if rng.random() < 0.15 else None
+        })
+    return records
+
+
+def run(db_path: str, settings: dict, records: list, bulk: bool) -> float:
+    DatabaseManager.close_connections()
+    DatabaseManager.configure({'database': settings})
+    db = DatabaseManager(db_path)
+
+    start = time.perf_counter()
+    if bulk:
+        db.add_employees_bulk(records)
+    else:
+        for record in records:
+            db.add_employee(record)
+    elapsed = time.perf_counter() - start
+
+    DatabaseManager.close_connections()
+    return elapsed
+
+
+def main():
+    num_employees = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = create_synthetic_db(os.path.join(tmp, "source.db"), 1000)
+        records = import_records(DatabaseManager(source), num_employees)
+        DatabaseManager.close_connections()
+
+        print(f"Импорт {num_employees} сотрудников (с):")
+        for name, settings, bulk in (('add_employee, прежний режим', LEGACY_SETTINGS, False),
+                                     ('add_employee, настроенные соединения', DEFAULT_DATABASE_SETTINGS, False),
+                                     ('add_employees_bulk', DEFAULT_DATABASE_SETTINGS, True)):
+            db_path = os.path.join(tmp, f"{name}.db")
+            shutil.copy(source, db_path)
+            print(f"  {name:<40} {run(db_path, settings, records, bulk):8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Задержки чтения и записи: новое соединение на каждый вызов с параметрами SQLite
+по умолчанию (прежний режим) и долгоживущие соединения с PRAGMA из конфигурации
+
+Запуск: python -m benchmarks.connection_latency [число сотрудников] [число вызовов]
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import create_synthetic_db
+from database import DatabaseManager, DEFAULT_DATABASE_SETTINGS
+
+# Прежний режим: соединение на вызов, журнал DELETE, остальные PRAGMA по умолчанию
+LEGACY_SETTINGS = {
+    "persistent_connections": False,
+    "journal_mode": "DELETE",
+    "synchronous": None,
+    "cache_size": None,
+    "mmap_size": None,
+    "temp_store": None,
+    "snapshot_cache": None
+}
+
+
+def mean_latency(func, calls: int) -> float:
+    """Средняя задержка вызова func (микросекунды)"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def run(db_path: str, settings: dict, employee_ids, calls: int, rng) -> dict:
+    DatabaseManager.close_connections()
+    DatabaseManager.configure({'database': settings})
+    db = DatabaseManager(db_path)
+    department_id = db.add_department("Замер")
+
+    results = {
+        'get_employee_by_id': mean_latency(lambda: db.get_employee_by_id(rng.choice(employee_ids)), calls),
+        'get_positions': mean_latency(db.get_positions, calls),
+        'get_all_departments': mean_latency(db.get_all_departments, calls),
+        'update_department': mean_latency(lambda: db.update_department(department_id, f"Замер {rng.random()}"), calls),
+    }
+
+    DatabaseManager.close_connections()
+    return results
+
+
+def main():
+    num_employees = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = create_synthetic_db(os.path.join(tmp, "source.db"), num_employees)
+        employee_ids = list(range(1, num_employees + 1))
+
+        report = {}
+        for name, settings in (('прежний режим', LEGACY_SETTINGS), ('настроенные соединения', DEFAULT_DATABASE_SETTINGS)):
+            db_path = os.path.join(tmp, f"{len(report)}.db")
+            shutil.copy(source, db_path)
+            report[name] = run(db_path, settings, employee_ids, calls, random.Random(0))
+
+        print(f"{num_employees} сотрудников, {calls} вызовов, средняя задержка (мкс):")
+        print(f"  {'':<22}" + "".join(f"{name:>24}" for name in report))
+        for operation in next(iter(report.values())):
+            print(f"  {operation:<22}" + "".join(f"{report[name][operation]:>24.0f}" for name in report))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Удаление предприятия: прежний цикл (три DELETE на каждого сотрудника) и
+delete_department (один DELETE сотрудников, их записи удаляются каскадно)
+
+Запуск: python -m benchmarks.department_delete [число сотрудников]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import create_synthetic_db, NUM_DEPARTMENTS
+from database import DatabaseManager
+
+
+def legacy_delete_department(db: DatabaseManager, department_id: int):
+    """Прежний DatabaseManager.delete_department"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT id FROM employees WHERE department_id = ?", (department_id,))
+        for emp in cursor.fetchall():
+            cursor.execute("DELETE FROM employee_diagnoses WHERE employee_id = ?", (emp['id'],))
+            cursor.execute("DELETE FROM employee_harm WHERE employee_id = ?", (emp['id'],))
+            cursor.execute("DELETE FROM employee_disability WHERE employee_id = ?", (emp['id'],))
+        cursor.execute("DELETE FROM employees WHERE department_id = ?", (department_id,))
+        cursor.execute("DELETE FROM departments WHERE id = ?", (department_id,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main():
+    num_employees = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = create_synthetic_db(os.path.join(tmp, "source.db"), num_employees)
+        DatabaseManager(source)
+        DatabaseManager.close_connections()
+
+        print(f"{num_employees} сотрудников, {NUM_DEPARTMENTS} предприятий:")
+        for name, delete in (('прежний цикл', legacy_delete_department),
+                             ('delete_department', DatabaseManager.delete_department)):
+            db_path = os.path.join(tmp, f"{name}.db")
+            shutil.copy(source, db_path)
+            db = DatabaseManager(db_path)
+
+            conn = db.get_connection()
+            department_id, count = conn.execute("""
+            SELECT department_id, COUNT(*) FROM employees GROUP BY department_id ORDER BY 2 DESC LIMIT 1
+            """).fetchone()
+            conn.close()
+
+            start = time.perf_counter()
+            delete(db, department_id)
+            print(f"  {name:<20} {count} сотрудников: {(time.perf_counter() - start) * 1000:8.0f} мс")
+            DatabaseManager.close_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Загрузка всех сотрудников с диагнозами: прежний путь (запрос диагнозов на каждого
+сотрудника), пакетная загрузка get_all_employees_with_details и EmployeeFrame
+
+Запуск: python -m benchmarks.employee_loading [число сотрудников ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import create_synthetic_db
+from database import DatabaseManager, EMPLOYEE_DETAILS_QUERY
+from employee_manager import EmployeeManager
+
+
+def load_per_employee(db: DatabaseManager):
+    """Прежняя реализация: основной запрос и отдельный запрос диагнозов на каждого сотрудника"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(EMPLOYEE_DETAILS_QUERY + "ORDER BY e.lastname")
+        employees = []
+        for row in cursor.fetchall():
+            emp_dict = dict(row)
+            emp_dict['full_name'] = db._full_name(emp_dict)
+            emp_dict['diagnoses'] = db._fetch_diagnoses(cursor, emp_dict['id'])
+            employees.append(emp_dict)
+        return employees
+    finally:
+        conn.close()
+
+
+def best_time(func, repeat: int = 3):
+    """Лучшее время из repeat запусков (секунды) и результат последнего"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_employees in sizes:
+            db_path = create_synthetic_db(os.path.join(tmp, f"employees_{num_employees}.db"), num_employees)
+            db = DatabaseManager(db_path)
+            manager = EmployeeManager(db_path)
+
+            legacy_time, legacy = best_time(lambda: load_per_employee(db))
+            bulk_time, bulk = best_time(lambda: db.get_all_employees_with_details())
+            frame_time, _ = best_time(manager.get_all_employees)
+            assert legacy == bulk, "результаты прежней и пакетной загрузки различаются"
+
+            print(f"{num_employees} сотрудников:")
+            print(f"  запрос на сотрудника        {legacy_time * 1000:10.1f} мс")
+            print(f"  пакетная загрузка           {bulk_time * 1000:10.1f} мс")
+            print(f"  EmployeeFrame               {frame_time * 1000:10.1f} мс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Память на одного сотрудника: список объектов с __dict__ (прежнее представление),
+список слотовых Employee и EmployeeFrame
+
+Запуск: python -m benchmarks.employee_memory [число сотрудников ...]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from benchmarks.synthetic import create_synthetic_db
+from database import DatabaseManager
+from employee_manager import Employee, EmployeeManager
+
+
+class DictEmployee:
+    """Прежнее представление: атрибуты Employee в __dict__ экземпляра"""
+
+    def __init__(self, employee: Employee):
+        for name in Employee.__slots__:
+            setattr(self, name, getattr(employee, name))
+
+
+def _load_dict_employees(db_path):
+    db = DatabaseManager(db_path)
+    return [DictEmployee(Employee(record)) for record in db.get_all_employees_with_details(include_diagnoses=True)]
+
+
+def _load_slotted_employees(db_path):
+    db = DatabaseManager(db_path)
+    return [Employee(record) for record in db.get_all_employees_with_details(include_diagnoses=True)]
+
+
+def _load_frame(db_path):
+    return EmployeeManager(db_path).get_all_employees()
+
+
+def measure(loader, db_path):
+    """Память, удерживаемая результатом loader (байт)"""
+    gc.collect()
+    tracemalloc.start()
+    result = loader(db_path)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_employees in sizes:
+            db_path = create_synthetic_db(os.path.join(tmp, f"employees_{num_employees}.db"), num_employees)
+            # Схема показателя здоровья создается до замеров
+            DatabaseManager(db_path)
+
+            print(f"{num_employees} сотрудников, байт на сотрудника:")
+            for name, loader in (('__dict__', _load_dict_employees),
+                                 ('__slots__', _load_slotted_employees),
+                                 ('EmployeeFrame', _load_frame)):
+                print(f"  {name:<14} {measure(loader, db_path) / num_employees:8.0f}")
+
+
+if __name__ == '__main__':
+    main()
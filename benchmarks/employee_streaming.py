@@ -0,0 +1,64 @@
+"""
+Пиковая память пакетного расчета показателя здоровья: все сотрудники одним
+EmployeeFrame и потоковый обход iter_employees
+
+Запуск: python -m benchmarks.employee_streaming [число сотрудников ...]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import create_synthetic_db
+from employee_manager import EmployeeManager
+from health_calculator import HealthCalculator
+
+BATCH_SIZE = 1000
+
+
+def score_all(manager: EmployeeManager) -> float:
+    return float(HealthCalculator.calculate_health_scores_for(manager.get_all_employees()).sum())
+
+
+def score_streaming(manager: EmployeeManager) -> float:
+    return float(sum(HealthCalculator.calculate_health_scores_for(frame).sum()
+                     for frame in manager.iter_employees(BATCH_SIZE)))
+
+
+def measure(func, manager):
+    """(пиковая память, МиБ; время, с; результат)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(manager)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20, elapsed, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+
+    print(f"{'сотрудников':>12} {'способ':<28} {'пик, МиБ':>10} {'время, с':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            manager = EmployeeManager(create_synthetic_db(os.path.join(tmp, f"{size}.db"), size))
+            # Справочник диагнозов загружается до замеров
+            manager.db.diagnosis_dictionary
+
+            results = []
+            for name, func in (('get_all_employees', score_all),
+                               (f'iter_employees({BATCH_SIZE})', score_streaming)):
+                peak, elapsed, result = measure(func, manager)
+                results.append(result)
+                print(f"{size:>12} {name:<28} {peak:>10.1f} {elapsed:>10.2f}")
+
+            assert abs(results[0] - results[1]) < 1e-6 * max(1.0, abs(results[0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Время выборки страницы сотрудников в зависимости от ее номера:
+LIMIT/OFFSET и get_employees_page (продолжение по ключу (фамилия, id))
+
+Запуск: python -m benchmarks.pagination_latency [число сотрудников]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import create_synthetic_db
+from database import DatabaseManager, EMPLOYEE_DETAILS_QUERY
+
+PAGE_SIZE = 100
+REPEATS = 20
+
+
+def offset_page(db: DatabaseManager, page: int):
+    """Страница через LIMIT/OFFSET - SQLite перебирает все предыдущие строки"""
+    conn = db.get_connection()
+    try:
+        return conn.execute(EMPLOYEE_DETAILS_QUERY + "ORDER BY e.lastname, e.id LIMIT ? OFFSET ?",
+                            (PAGE_SIZE, page * PAGE_SIZE)).fetchall()
+    finally:
+        conn.close()
+
+
+def _mean_ms(call) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        call()
+    return (time.perf_counter() - start) / REPEATS * 1000
+
+
+def main():
+    num_employees = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = create_synthetic_db(os.path.join(tmp, "synthetic.db"), num_employees)
+        db = DatabaseManager(db_path)
+
+        conn = db.get_connection()
+        keys = conn.execute("SELECT lastname, id FROM employees ORDER BY lastname, id").fetchall()
+        conn.close()
+
+        pages = len(keys) // PAGE_SIZE
+        print(f"{num_employees} сотрудников, страница {PAGE_SIZE} записей:")
+        print(f"  {'страница':>10} {'OFFSET, мс':>12} {'по ключу, мс':>14}")
+        for page in sorted({1, 10, pages // 10, pages // 2, pages - 1}):
+            lastname, employee_id = keys[page * PAGE_SIZE - 1]
+            token = db._encode_page_token(lastname, employee_id)
+
+            assert [row['id'] for row in offset_page(db, page)] == \
+                [emp['id'] for emp in db.get_employees_page(PAGE_SIZE, token, include_diagnoses=False)[0]]
+
+            offset_ms = _mean_ms(lambda: offset_page(db, page))
+            keyset_ms = _mean_ms(lambda: db.get_employees_page(PAGE_SIZE, token, include_diagnoses=False))
+            print(f"  {page:>10} {offset_ms:>12.2f} {keyset_ms:>14.2f}")
+
+        DatabaseManager.close_connections()
+
+
+if __name__ == '__main__':
+    main()
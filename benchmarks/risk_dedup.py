@@ -0,0 +1,87 @@
+"""
+Пакетный расчет риска: число нечетких выводов при выводе для каждого сотрудника
+(прежний цикл диалога) и в RiskAssessor.assess (один вывод на различный набор
+нормализованных входов)
+
+ControlSystemSimulation кэширует результаты уже встречавшихся входов, но сбрасывает кэш
+после каждых FLUSH_AFTER_RUN новых выводов, поэтому число выводов прежнего цикла
+подсчитывается с учетом этого кэша. Нечеткий вывод занимает сотни миллисекунд, поэтому
+полное время оценивается по среднему времени вывода на случайной выборке сотрудников;
+на ней же результаты RiskAssessor.assess сверяются с прежним циклом.
+
+Запуск: python -m benchmarks.risk_dedup [число сотрудников ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app_config import load_config
+from benchmarks.synthetic import create_synthetic_db
+from employee_manager import EmployeeManager
+from fuzzy_system import FuzzyRiskSystem
+from risk_assessment import RiskAssessor
+
+# Параметры рабочей среды: вибрация, дБ; шум, дБА; химический фактор, мг/м³
+VIBRATION, NOISE, CHEMICAL = 100.0, 80.0, 0.05
+# Выборка для оценки времени вывода и сверки результатов
+SAMPLE_SIZE = 10
+# Сброс кэша ControlSystemSimulation (значение skfuzzy по умолчанию)
+FLUSH_AFTER_RUN = 1000
+
+
+def legacy_assess(fuzzy_system, inputs) -> list:
+    """Прежний цикл MultiRiskCalculatorDialog.calculate_risk_for_all: вывод для каждого сотрудника"""
+    return [fuzzy_system.calculate_risk(*row)['value'] for row in inputs.tolist()]
+
+
+def legacy_evaluations(inputs) -> int:
+    """Число выводов прежнего цикла с учетом кэша ControlSystemSimulation"""
+    calculated = set()
+    evaluations = 0
+    for row in map(tuple, inputs.tolist()):
+        if row in calculated:
+            continue
+        calculated.add(row)
+        evaluations += 1
+        if evaluations % FLUSH_AFTER_RUN == 0:
+            calculated.clear()
+    return evaluations
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    rng = np.random.default_rng(0)
+    fuzzy_system = FuzzyRiskSystem(load_config())
+    assessor = RiskAssessor(fuzzy_system)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_employees in sizes:
+            manager = EmployeeManager(create_synthetic_db(os.path.join(tmp, f"{num_employees}.db"), num_employees))
+            manager.refresh_health_scores()
+            employees = manager.get_all_employees()
+            _, inputs = assessor.normalized_inputs(employees, VIBRATION, NOISE, CHEMICAL)
+            unique_count = len(np.unique(inputs, axis=0))
+            legacy_count = legacy_evaluations(inputs)
+
+            sample = employees.take(rng.choice(num_employees, SAMPLE_SIZE, replace=False))
+            start = time.perf_counter()
+            legacy = legacy_assess(fuzzy_system, assessor.normalized_inputs(sample, VIBRATION, NOISE, CHEMICAL)[1])
+            evaluation_seconds = (time.perf_counter() - start) / SAMPLE_SIZE
+
+            results = assessor.assess(sample, VIBRATION, NOISE, CHEMICAL)
+            assert legacy == [results[int(employee_id)]['value'] for employee_id in sample.id]
+
+            print(f"{num_employees} сотрудников, {unique_count} различных наборов входов "
+                  f"(в {num_employees / unique_count:.1f} раза меньше), вывод {evaluation_seconds * 1000:.0f} мс:")
+            print(f"  {'вывод для каждого сотрудника':<32} {legacy_count:>7} выводов "
+                  f"~{legacy_count * evaluation_seconds / 60:8.1f} мин")
+            print(f"  {'RiskAssessor.assess':<32} {unique_count:>7} выводов "
+                  f"~{unique_count * evaluation_seconds / 60:8.1f} мин")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Задержка поиска сотрудников: прежний поиск LIKE '%q%' по пяти столбцам
+и полнотекстовый индекс employee_search (FTS5) при разном числе сотрудников
+
+Замеряется только поиск id (без загрузки найденных сотрудников).
+Запуск: python -m benchmarks.search_latency [число вызовов]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import create_synthetic_db
+from database import DatabaseManager
+
+SIZES = (1000, 10000, 100000)
+
+# Запросы поиска: фамилия целиком, начало фамилии, имя и должность
+QUERIES = ('Виноградых', 'Медв', 'Светлана', 'Должность 17')
+
+LEGACY_SEARCH_QUERY = """
+SELECT DISTINCT e.id
+FROM employees e
+LEFT JOIN positions p ON e.position_id = p.id
+LEFT JOIN departments d ON e.department_id = d.id
+WHERE e.lastname LIKE ? OR e.firstname LIKE ? OR e.patronymic LIKE ? OR p.name LIKE ? OR d.name LIKE ?
+"""
+
+FTS_SEARCH_QUERY = "SELECT rowid FROM employee_search WHERE employee_search MATCH ? ORDER BY rank"
+
+
+def mean_latency(func, calls: int) -> float:
+    """Средняя задержка вызова func (миллисекунды)"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    print(f"Средняя задержка поиска id (мс), {calls} вызовов:")
+    print(f"  {'сотрудников':>12} {'запрос':<14} {'найдено':>8} {'LIKE':>10} {'FTS5':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            db_path = create_synthetic_db(os.path.join(tmp, f"{size}.db"), size)
+            db = DatabaseManager(db_path)
+            conn = db.get_connection()
+
+            for query in QUERIES:
+                like_params = (f"%{query}%",) * 5
+                match_query = db._search_match_query(query)
+                found = len(conn.execute(FTS_SEARCH_QUERY, (match_query,)).fetchall())
+
+                like_ms = mean_latency(lambda: conn.execute(LEGACY_SEARCH_QUERY, like_params).fetchall(), calls)
+                fts_ms = mean_latency(lambda: conn.execute(FTS_SEARCH_QUERY, (match_query,)).fetchall(), calls)
+                print(f"  {size:>12} {query:<14} {found:>8} {like_ms:>10.2f} {fts_ms:>10.2f}")
+
+            conn.close()
+            DatabaseManager.close_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Действия главного окна без снимка БД (каждое чтение - запросы и новое хранилище)
+и со снимком (DatabaseSnapshot): повторная загрузка списка и загрузка после
+изменения одного сотрудника
+
+Запуск: python -m benchmarks.snapshot_cache [число сотрудников]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import create_synthetic_db
+from database import DatabaseManager, DEFAULT_DATABASE_SETTINGS
+from employee_manager import EmployeeManager
+
+
+def edit_and_reload(manager: EmployeeManager, employee_id: int, lastname: str):
+    """Изменение сотрудника в диалоге и обновление главного окна (MainWindow.load_employees)"""
+    data = dict(manager.db.get_employee_by_id(employee_id))
+    position_id = manager.get_positions()[0]['id']
+    manager.update_employee(employee_id, **{**data, 'lastname': lastname, 'position_id': position_id})
+    manager.refresh_health_scores()
+    return manager.get_all_employees()
+
+
+def _ms(call) -> float:
+    start = time.perf_counter()
+    call()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    num_employees = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = create_synthetic_db(os.path.join(tmp, "source.db"), num_employees)
+        DatabaseManager(source)
+        DatabaseManager.close_connections()
+
+        print(f"{num_employees} сотрудников, мс:")
+        print(f"  {'':<16} {'первая загрузка':>16} {'повторная':>12} {'после изменения':>16}")
+        for name, snapshot_cache in (('без снимка', False), ('снимок БД', True)):
+            db_path = os.path.join(tmp, f"{name}.db")
+            shutil.copy(source, db_path)
+            DatabaseManager.configure({'database': {**DEFAULT_DATABASE_SETTINGS, 'snapshot_cache': snapshot_cache}})
+            manager = EmployeeManager(db_path)
+            manager.refresh_health_scores()
+
+            first_ms = _ms(manager.get_all_employees)
+            repeat_ms = _ms(manager.get_all_employees)
+            edit_ms = min(_ms(lambda: edit_and_reload(manager, employee_id, f"Измененный {employee_id}"))
+                          for employee_id in range(1, 6))
+            print(f"  {name:<16} {first_ms:>16.1f} {repeat_ms:>12.2f} {edit_ms:>16.1f}")
+            DatabaseManager.close_connections()
+
+
+if __name__ == '__main__':
+    main()
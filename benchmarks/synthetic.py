@@ -0,0 +1,104 @@
+"""Синтетическая БД для замеров: исходная схема, справочники из рабочей БД, N случайных сотрудников"""
+
+import os
+import random
+import sqlite3
+from datetime import date, timedelta
+
+from migrations import BASE_SCHEMA
+
+# Рабочая БД - источник справочников
+SOURCE_DB = 'database/risk_assesment.db'
+
+# Справочные таблицы, копируемые из рабочей БД
+REFERENCE_TABLES = ('diagnosis_categories', 'positions', 'departments', 'diagnoses')
+
+LASTNAME_STEMS = ['Иван', 'Петр', 'Сидор', 'Кузнец', 'Смирн', 'Волк', 'Мороз', 'Лебед', 'Сокол', 'Новик',
+                  'Орл', 'Зайц', 'Медвед', 'Белк', 'Комар', 'Павл', 'Семен', 'Голуб', 'Виноград', 'Борис']
+LASTNAME_ENDINGS = ['ов', 'ев', 'ин', 'енко', 'ский', 'ович', 'ук', 'ых']
+FIRSTNAMES = ['Александр', 'Сергей', 'Дмитрий', 'Андрей', 'Алексей', 'Иван', 'Михаил', 'Николай',
+              'Елена', 'Ольга', 'Татьяна', 'Наталья', 'Ирина', 'Светлана', 'Анна', 'Мария']
+PATRONYMICS = ['Александрович', 'Сергеевич', 'Владимирович', 'Петрович', 'Иванович', 'Николаевич',
+               'Александровна', 'Сергеевна', 'Владимировна', 'Петровна', 'Ивановна', 'Николаевна']
+
+NUM_POSITIONS = 30
+NUM_DEPARTMENTS = 20
+
+
+def _random_date(rng, first: date, last: date) -> str:
+    return (first + timedelta(days=rng.randrange((last - first).days))).isoformat()
+
+
+def create_synthetic_db(path: str, num_employees: int, source_db: str = SOURCE_DB, seed: int = 0) -> str:
+    """
+    Создать БД с исходной схемой и num_employees случайными сотрудниками
+
+    Создается исходная схема (версия 0), из рабочей БД копируются только справочники;
+    остальные объекты (индексы, employee_health, employee_search) создадут миграции.
+
+    Returns:
+        путь к созданной БД
+    """
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+
+    source = sqlite3.connect(source_db)
+    conn = sqlite3.connect(path)
+
+    try:
+        # Исходная схема (версия 0): миграции применит DatabaseManager при подключении
+        conn.executescript(BASE_SCHEMA)
+
+        for table in REFERENCE_TABLES:
+            rows = source.execute(f"SELECT * FROM {table}").fetchall()
+            if rows:
+                placeholders = ', '.join('?' * len(rows[0]))
+                conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+
+        positions_count = conn.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+        conn.executemany("INSERT INTO positions (name) VALUES (?)",
+                         [(f"Должность {i}",) for i in range(positions_count + 1, NUM_POSITIONS + 1)])
+        departments_count = conn.execute("SELECT COUNT(*) FROM departments").fetchone()[0]
+        conn.executemany("INSERT INTO departments (name) VALUES (?)",
+                         [(f"Предприятие {i}",) for i in range(departments_count + 1, NUM_DEPARTMENTS + 1)])
+
+        position_ids = [row[0] for row in conn.execute("SELECT id FROM positions")]
+        department_ids = [row[0] for row in conn.execute("SELECT id FROM departments")]
+        diagnosis_ids = [row[0] for row in conn.execute("SELECT id FROM diagnoses")]
+
+        employees, diagnoses, harm, disability = [], [], [], []
+        for employee_id in range(1, num_employees + 1):
+            employees.append((
+                employee_id,
+                rng.choice(LASTNAME_STEMS) + rng.choice(LASTNAME_ENDINGS),
+                rng.choice(FIRSTNAMES),
+                rng.choice(PATRONYMICS),
+                _random_date(rng, date(1955, 1, 1), date(2002, 1, 1)),
+                rng.choice('МЖ'),
+                rng.choice(position_ids),
+                rng.choice(department_ids),
+                _random_date(rng, date(1975, 1, 1), date(2024, 1, 1))
+            ))
+
+            for diagnosis_id in rng.sample(diagnosis_ids, min(len(diagnosis_ids), rng.randint(0, 5))):
+                diagnoses.append((employee_id, diagnosis_id))
+            if rng.random() < 0.4:
+                harm.append((employee_id, 'Т75.2', f"{rng.randint(1990, 2023)}-01-01"))
+            if rng.random() < 0.15:
+                disability.append((employee_id, rng.randint(1, 3)))
+
+        conn.executemany("""
+        INSERT INTO employees (id, lastname, firstname, patronymic, birth_date, gender,
+                               position_id, department_id, start_year)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, employees)
+        conn.executemany("INSERT INTO employee_diagnoses (employee_id, diagnosis_id) VALUES (?, ?)", diagnoses)
+        conn.executemany("INSERT INTO employee_harm (employee_id, prof_harm_code, prof_harm_year) VALUES (?, ?, ?)", harm)
+        conn.executemany("INSERT INTO employee_disability (employee_id, disability_group) VALUES (?, ?)", disability)
+        conn.commit()
+    finally:
+        conn.close()
+        source.close()
+
+    return path
@@ -0,0 +1,66 @@
+"""
+Поиск в главном окне: прежний путь на каждое нажатие клавиши (загрузка всех
+сотрудников из БД и проверка подстрок в Python) и индекс EmployeeSearchIndex в памяти
+
+Запуск: python -m benchmarks.typeahead_latency [число сотрудников] [число вызовов]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import create_synthetic_db
+from employee_manager import EmployeeManager
+from search_index import EmployeeSearchIndex
+
+# Последовательный ввод в поле ФИО и запрос по двум полям
+QUERIES = ({'name': 'с'}, {'name': 'се'}, {'name': 'сем'}, {'name': 'семен'},
+           {'name': 'ива', 'position': 'должн'})
+
+
+def legacy_search(manager: EmployeeManager, name: str = '', position: str = '', department: str = '') -> list:
+    """Прежний MainWindow.search_employees: все сотрудники из БД и проверка подстрок"""
+    found = []
+    for employee in manager.get_all_employees():
+        if name and not any(value and name.lower() in value.lower()
+                            for value in (employee.lastname, employee.firstname, employee.patronymic)):
+            continue
+        if position and not (employee.position and position.lower() in employee.position.lower()):
+            continue
+        if department and not (employee.department_name and department.lower() in employee.department_name.lower()):
+            continue
+        found.append(employee)
+    return found
+
+
+def main():
+    num_employees = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = EmployeeManager(create_synthetic_db(os.path.join(tmp, "search.db"), num_employees))
+        employees = manager.get_all_employees()
+
+        start = time.perf_counter()
+        index = EmployeeSearchIndex(employees)
+        print(f"{num_employees} сотрудников, построение индекса: {(time.perf_counter() - start) * 1000:.0f} мс")
+        print(f"  {'запрос':<36} {'найдено':>8} {'прежний, мс':>12} {'индекс, мс':>12}")
+
+        for query in QUERIES:
+            start = time.perf_counter()
+            legacy_found = legacy_search(manager, **query)
+            legacy_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            for _ in range(calls):
+                rows = index.search(**query)
+                employees.take(rows)
+            index_ms = (time.perf_counter() - start) / calls * 1000
+
+            assert len(rows) == len(legacy_found)
+            print(f"  {str(query):<36} {len(rows):>8} {legacy_ms:>12.1f} {index_ms:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Кэш объектов, построенных из конфигурации, с ключом по хэшу конфигурации"""
+
+import hashlib
+import json
+
+
+def config_hash(config) -> str:
+    """
+    Хэш конфигурации (не зависит от порядка ключей)
+
+    Args:
+        config: JSON-совместимый словарь или его часть
+    """
+    payload = json.dumps(config, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ConfigCache:
+    """
+    Кэш скомпилированных объектов (нечеткие системы, модели здоровья)
+
+    Ключ - вид объекта, хэш конфигурации и дополнительные параметры сборки,
+    поэтому повторное применение той же конфигурации не пересобирает объект.
+    """
+
+    def __init__(self, max_size: int = 16):
+        self.max_size = max_size
+        self._items = {}
+
+    def get(self, kind: str, config, factory, *extra_key):
+        """
+        Получить объект из кэша или построить его
+
+        Args:
+            kind: вид объекта (например, 'fuzzy' или 'health')
+            config: конфигурация, из которой строится объект
+            factory: функция без аргументов, строящая объект
+            extra_key: дополнительные хэшируемые параметры сборки
+        """
+        key = (kind, config_hash(config)) + extra_key
+        if key in self._items:
+            # Перемещаем в конец - недавно использованный
+            self._items[key] = self._items.pop(key)
+            return self._items[key]
+
+        item = factory()
+        self._items[key] = item
+        while len(self._items) > self.max_size:
+            self._items.pop(next(iter(self._items)))
+        return item
+
+    def clear(self):
+        """Очистить кэш"""
+        self._items.clear()
+
+
+# Общий кэш приложения
+compiled_configs = ConfigCache()
@@ -14,13 +14,16 @@ import matplotlib.pyplot as plt
 from PyQt6.QtWidgets import *
 from PyQt6.QtCore import pyqtSignal, Qt
 
+from health_calculator import DEFAULT_HEALTH_MODEL
+from database import DEFAULT_DATABASE_SETTINGS
+
 # Фиксированные имена переменных
 INPUT_VARS = ["vibration", "noise", "chemical", "health"]
 OUTPUT_VAR = "risk"
 
 import os
 
-DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "configs/test_config.json")
+from app_config import DEFAULT_CONFIG_PATH
 
 
 class MplCanvas(FigureCanvas):
@@ -1042,7 +1045,9 @@ def get_default_config():
                     ],
                     "then": "very_low"
                 }
-            ]
+            ],
+            "health_model": DEFAULT_HEALTH_MODEL,
+            "database": DEFAULT_DATABASE_SETTINGS
         }
 
         # Сохраняем конфигурацию в файл
@@ -1061,7 +1066,9 @@ def get_default_config():
         return {
             "variables": {var: {"terms": {}} for var in INPUT_VARS},
             "output": {OUTPUT_VAR: {"terms": {}}},
-            "rules": []
+            "rules": [],
+            "health_model": DEFAULT_HEALTH_MODEL,
+            "database": DEFAULT_DATABASE_SETTINGS
         }
 
 
@@ -1395,5 +1402,8 @@ class ConfigEditor(QDialog):
         return {
             "variables": variables,
             "output": output,
-            "rules": rules
+            "rules": rules,
+            # Параметры модели здоровья и соединений с БД редактор не изменяет - переносим как есть
+            "health_model": self.config.get('health_model', DEFAULT_HEALTH_MODEL),
+            "database": self.config.get('database', DEFAULT_DATABASE_SETTINGS)
         }
\ No newline at end of file
@@ -1,91 +1,645 @@
+import base64
+import bisect
+import json
+import re
 import sqlite3
-from typing import List, Dict, Optional
+import threading
+from datetime import datetime
+from typing import Iterator, List, Dict, Optional, Tuple
+
+from app_config import load_config
+from diagnosis_dictionary import DiagnosisDictionary
+from migrations import apply_migrations, format_report
+
+# Параметры соединений по умолчанию (секция database конфигурации).
+# Значение None - PRAGMA не выполняется (остается значение SQLite по умолчанию).
+DEFAULT_DATABASE_SETTINGS = {
+    # Долгоживущее соединение на каждый поток вместо нового соединения на каждый вызов
+    "persistent_connections": True,
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    # Отрицательное значение - размер кэша страниц в КиБ
+    "cache_size": -16000,
+    "mmap_size": 134217728,
+    "temp_store": "MEMORY",
+    # Снимок сотрудников и справочников в памяти (DatabaseSnapshot, нужны долгоживущие соединения)
+    "snapshot_cache": True
+}
+
+# PRAGMA, применяемые при открытии соединения (в этом порядке), и их допустимые значения:
+# ключевые слова (без учета регистра) или int - целое число. Параметры берутся из
+# редактируемой конфигурации, поэтому другие PRAGMA и значения в SQL не подставляются
+CONNECTION_PRAGMAS = {
+    'journal_mode': ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'),
+    'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+    'cache_size': int,
+    'mmap_size': int,
+    'temp_store': ('DEFAULT', 'FILE', 'MEMORY'),
+    'busy_timeout': int,
+}
+
+
+def _pragma_value(pragma: str, value) -> Optional[str]:
+    """Значение PRAGMA для подстановки в SQL или None, если значение недопустимо"""
+    allowed = CONNECTION_PRAGMAS[pragma]
+    if allowed is int:
+        # bool - подкласс int, но не число для PRAGMA
+        return str(value) if isinstance(value, int) and not isinstance(value, bool) else None
+    if isinstance(value, str) and value.upper() in allowed:
+        return value.upper()
+    return None
+
+# Столбцы результата расчета риска (кроме run_id, config_hash и assessed_at, общих для запуска)
+RISK_ASSESSMENT_COLUMNS = (
+    'employee_id', 'vibration_physical', 'noise_physical', 'chemical_physical', 'experience',
+    'vibration_norm', 'noise_norm', 'chemical_norm', 'health_score', 'risk_value', 'risk_category'
+)
+
+# Основная информация о сотрудниках (без диагнозов)
+EMPLOYEE_DETAILS_QUERY = """
+SELECT 
+    e.id,
+    e.lastname,
+    e.firstname,
+    e.patronymic,
+    p.name as position,
+    e.gender,
+    e.birth_date,
+    e.start_year,
+    d.id as department_id,
+    d.name as department_name,
+    eh.prof_harm_code,
+    eh.prof_harm_year,
+    ed.disability_group,
+    CASE WHEN h.computed_version = h.version THEN h.health_score END as health_score
+FROM employees e
+LEFT JOIN positions p ON e.position_id = p.id
+LEFT JOIN departments d ON e.department_id = d.id
+LEFT JOIN employee_harm eh ON e.id = eh.employee_id
+LEFT JOIN employee_disability ed ON e.id = ed.employee_id
+LEFT JOIN employee_health h ON e.id = h.employee_id
+"""
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Долгоживущее соединение потока: close() не закрывает соединение, а только
+    откатывает незафиксированную транзакцию - как при закрытии обычного соединения
+
+    get_connection/close могут быть вложенными (метод вызывает другой метод менеджера
+    посреди транзакции) - откат выполняется только при выходе из внешнего вызова.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.depth = 0
+
+    def close(self):
+        self.depth = max(self.depth - 1, 0)
+        if self.depth == 0 and self.in_transaction:
+            self.rollback()
+
+    def close_pooled(self):
+        """Действительно закрыть соединение"""
+        super().close()
+
+
+def _employee_order(record: Dict) -> Tuple:
+    """Ключ порядка сотрудников в снимке (как ORDER BY e.lastname, e.id)"""
+    return record['lastname'], record['id']
+
+
+class DatabaseSnapshot:
+    """
+    Данные БД в памяти потока: сотрудники, их диагнозы и справочники загружаются
+    при первом обращении и до изменения БД отдаются без запросов
+
+    Снимок привязан к соединению потока и действителен, пока не изменились
+    PRAGMA data_version этого соединения (меняется при фиксации транзакций других
+    соединений и процессов) и счетчик записей DatabaseManager (записи самого
+    соединения data_version не меняют). Запись отдельных сотрудников через менеджер
+    не сбрасывает снимок - их строки исправляются (patch_employees).
+    """
+
+    # Части, исправляемые при записи сотрудников
+    EMPLOYEE_PARTS = ('employees', 'employee_diagnosis_ids')
+    # Справочники - не зависят от записи сотрудников; остальные (производные) части
+    # при записи сотрудников удаляются
+    REFERENCE_PARTS = ('positions', 'diagnosis_categories', 'departments')
+
+    def __init__(self, conn, data_version: int, write_count: int):
+        self.conn = conn
+        self.data_version = data_version
+        self.write_count = write_count
+        self.parts = {}
+
+    def is_current(self, conn, data_version: int, write_count: int) -> bool:
+        """Действителен ли снимок для соединения conn с текущими data_version и счетчиком записей"""
+        return self.conn is conn and self.data_version == data_version and self.write_count == write_count
+
+    def patch_employees(self, employee_ids, records: List[Dict], diagnosis_pairs: List[Tuple[int, int]]):
+        """
+        Заменить в снимке сотрудников employee_ids
+
+        Args:
+            employee_ids: id записанных сотрудников (удаленных в records нет)
+            records: текущие записи сотрудников в формате части 'employees'
+            diagnosis_pairs: их пары (employee_id, diagnosis_id)
+        """
+        for name in list(self.parts):
+            if name not in self.EMPLOYEE_PARTS + self.REFERENCE_PARTS:
+                del self.parts[name]
+
+        employee_ids = set(employee_ids)
+        employees = self.parts.get('employees')
+        if employees is not None:
+            employees[:] = [record for record in employees if record['id'] not in employee_ids]
+            for record in records:
+                bisect.insort(employees, record, key=_employee_order)
+
+        pairs = self.parts.get('employee_diagnosis_ids')
+        if pairs is not None:
+            # Пары упорядочены по сотруднику - пары одного сотрудника идут подряд
+            for employee_id in employee_ids:
+                del pairs[bisect.bisect_left(pairs, (employee_id,)):bisect.bisect_left(pairs, (employee_id + 1,))]
+            for pair in diagnosis_pairs:
+                bisect.insort(pairs, pair)
+
 
 class DatabaseManager:
     """Менеджер базы данных"""
 
+    # Параметры соединений (None - загрузить из конфигурации по умолчанию)
+    _settings = None
+    # Номер версии параметров: соединения, открытые с прежними параметрами, пересоздаются
+    _settings_version = 0
+    # Соединения текущего потока: {путь к БД: (версия параметров, соединение)}
+    _thread_local = threading.local()
+
+    # Базы, к которым уже применены миграции схемы
+    _migrations_applied = set()
+
+    # Счетчик записей через менеджер по пути к БД: сбрасывает снимки, которые нельзя исправить
+    _write_counts = {}
+
+    # Фильтр сотрудников с устаревшим показателем здоровья
+    _DIRTY_HEALTH_FILTER = """
+            WHERE {column} IN (SELECT employee_id FROM employee_health WHERE computed_version < version)
+    """
+
     def __init__(self, db_path: str):
         self.db_path = db_path
+        self.ensure_migrations()
+
+    @classmethod
+    def configure(cls, config):
+        """
+        Применить параметры соединений
+
+        Args:
+            config: полная конфигурация (с секцией database) или сама секция
+        """
+        if config and 'database' in config:
+            config = config['database']
+        elif config and 'variables' in config:
+            config = None
+        cls._settings = {**DEFAULT_DATABASE_SETTINGS, **(config or {})}
+        cls._settings_version += 1
+
+    @classmethod
+    def get_settings(cls) -> Dict:
+        """Активные параметры соединений"""
+        if cls._settings is None:
+            cls.configure(load_config())
+        return cls._settings
+
+    @classmethod
+    def close_connections(cls):
+        """Закрыть долгоживущие соединения текущего потока"""
+        connections = getattr(cls._thread_local, 'connections', {})
+        for _, conn in connections.values():
+            conn.close_pooled()
+        connections.clear()
+        getattr(cls._thread_local, 'snapshots', {}).clear()
+
+    def _open_connection(self, settings: Dict, factory=sqlite3.Connection):
+        """Открыть соединение и применить PRAGMA из параметров"""
+        conn = sqlite3.connect(self.db_path, factory=factory)
+        conn.row_factory = sqlite3.Row
+
+        for pragma in CONNECTION_PRAGMAS:
+            value = settings.get(pragma)
+            if value is None:
+                continue
+            sql_value = _pragma_value(pragma, value)
+            if sql_value is None:
+                print(f"Invalid database setting {pragma}={value!r}, ignored")
+                continue
+            conn.execute(f"PRAGMA {pragma} = {sql_value}").fetchall()
+
+        # Данные сотрудника удаляются каскадно по внешним ключам (миграции 4 и 6),
+        # поэтому проверка внешних ключей включена всегда, а не параметром
+        conn.execute("PRAGMA foreign_keys = ON")
+
+        return conn
 
     def get_connection(self):
-        """Получить соединение с БД"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """Получить соединение с БД (долгоживущее соединение потока, если включено)"""
+        settings = self.get_settings()
+        if not settings.get('persistent_connections'):
+            return self._open_connection(settings)
+
+        connections = getattr(self._thread_local, 'connections', None)
+        if connections is None:
+            connections = self._thread_local.connections = {}
+
+        version, conn = connections.get(self.db_path, (None, None))
+        if version != DatabaseManager._settings_version:
+            if conn is not None:
+                conn.close_pooled()
+            conn = self._open_connection(settings, PooledConnection)
+            connections[self.db_path] = (DatabaseManager._settings_version, conn)
+
+        conn.depth += 1
         return conn
 
-    def get_all_employees_with_details(self) -> List[Dict]:
-        """Получить всех сотрудников с деталями"""
+    def _current_snapshot(self) -> Optional[DatabaseSnapshot]:
+        """Действительный снимок БД текущего потока (новый, если БД изменилась); None - снимок отключен"""
+        settings = self.get_settings()
+        if not settings.get('snapshot_cache') or not settings.get('persistent_connections'):
+            return None
+
+        conn = self.get_connection()
+        try:
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        finally:
+            conn.close()
+
+        snapshots = getattr(self._thread_local, 'snapshots', None)
+        if snapshots is None:
+            snapshots = self._thread_local.snapshots = {}
+
+        write_count = DatabaseManager._write_counts.get(self.db_path, 0)
+        snapshot = snapshots.get(self.db_path)
+        if snapshot is None or not snapshot.is_current(conn, data_version, write_count):
+            snapshot = snapshots[self.db_path] = DatabaseSnapshot(conn, data_version, write_count)
+        return snapshot
+
+    def cached(self, name: str, loader):
+        """
+        Часть снимка БД: loader() вызывается, если части нет в действительном снимке
+        (или снимок отключен) - результат общий для всех вызовов до изменения БД
+
+        Args:
+            name: имя части (производные данные вне DatabaseSnapshot.EMPLOYEE_PARTS и
+                  REFERENCE_PARTS удаляются при записи сотрудников)
+            loader: функция без аргументов, загружающая часть
+        """
+        snapshot = self._current_snapshot()
+        if snapshot is None:
+            return loader()
+        if name not in snapshot.parts:
+            snapshot.parts[name] = loader()
+        return snapshot.parts[name]
+
+    def _after_write(self, employee_ids=None):
+        """
+        Учесть зафиксированную запись в снимке БД: после записи не более _IN_CHUNK_SIZE
+        сотрудников действительный снимок исправляется, иначе - будет загружен заново
+
+        Args:
+            employee_ids: id добавленных, измененных или удаленных сотрудников
+                          (None - запись затронула справочники или многих сотрудников)
+        """
+        write_count = DatabaseManager._write_counts.get(self.db_path, 0)
+        DatabaseManager._write_counts[self.db_path] = write_count + 1
+
+        snapshot = getattr(self._thread_local, 'snapshots', {}).get(self.db_path)
+        if employee_ids is None or len(employee_ids) > self._IN_CHUNK_SIZE or snapshot is None:
+            return
+
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
-            # Основная информация о сотрудниках
-            query = """
-            SELECT 
-                e.id,
-                e.lastname,
-                e.firstname,
-                e.patronymic,
-                p.name as position,
-                e.gender,
-                e.birth_date,
-                e.start_year,
-                d.id as department_id,
-                d.name as department_name,
-                eh.prof_harm_code,
-                eh.prof_harm_year,
-                ed.disability_group
+            # Собственная запись data_version не меняет: другое значение - БД изменило другое соединение
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if not snapshot.is_current(conn, data_version, write_count):
+                return
+
+            records, pairs = self._fetch_employee_details(cursor, employee_ids)
+            snapshot.patch_employees(employee_ids, records, pairs)
+            snapshot.write_count = write_count + 1
+        except Exception as e:
+            print(f"Error patching database snapshot: {e}")
+        finally:
+            conn.close()
+
+    @property
+    def diagnosis_dictionary(self) -> DiagnosisDictionary:
+        """Общий для процесса справочник диагнозов этой БД"""
+        return DiagnosisDictionary.for_database(self)
+
+    def _resolve_diagnosis_ids(self, cursor, diagnoses: Dict[str, List[str]]) -> Tuple[List[int], List[Tuple]]:
+        """
+        id диагнозов по тексту из формы: поиск в справочнике, новые диагнозы добавляются в БД
+
+        Returns:
+            (id диагнозов без повторов, новые записи (id, название, id категории) - их нужно
+            зарегистрировать в справочнике после фиксации транзакции)
+        """
+        diagnosis_ids, new_diagnoses = self._resolve_diagnosis_ids_many(cursor, [diagnoses])
+        return diagnosis_ids[0], new_diagnoses
+
+    def _resolve_diagnosis_ids_many(self, cursor, diagnoses_list: List[Dict[str, List[str]]]) -> Tuple[List[List[int]], List[Tuple]]:
+        """
+        _resolve_diagnosis_ids для нескольких сотрудников: диагнозы, которых нет в справочнике,
+        ищутся в БД и добавляются пакетно (по запросу на _IN_CHUNK_SIZE названий)
+
+        Returns:
+            (списки id диагнозов по сотрудникам, новые записи (id, название, id категории))
+
+        Raises:
+            ValueError: категории диагноза нет в БД (диагнозы не отбрасываются молча)
+        """
+        dictionary = self.diagnosis_dictionary
+
+        unknown = {category_name for diagnoses in diagnoses_list for category_name in (diagnoses or {})
+                   if category_name not in dictionary.category_ids_by_name}
+        if unknown:
+            # Категорию мог добавить другой процесс после загрузки справочника
+            cursor.execute("SELECT id, category FROM diagnosis_categories")
+            dictionary.register_categories(cursor.fetchall())
+            unknown = [name for name in unknown if name not in dictionary.category_ids_by_name]
+            if unknown:
+                raise ValueError(f"Неизвестные категории диагнозов: {', '.join(sorted(unknown))}")
+
+        keys_list = []
+        missing = {}
+
+        for diagnoses in diagnoses_list:
+            keys = []
+            for category_name, diagnosis_names in (diagnoses or {}).items():
+                category_id = dictionary.category_ids_by_name[category_name]
+
+                for diagnosis_name in diagnosis_names:
+                    if not diagnosis_name.strip():
+                        continue
+                    key = (category_id, diagnosis_name)
+                    if dictionary.lookup(*key) is None:
+                        missing[key] = None
+                    keys.append(key)
+            keys_list.append(keys)
+
+        if missing:
+            # Нет в справочнике - диагноз мог добавить другой процесс
+            self._select_diagnosis_ids(cursor, missing)
+            absent = [key for key, diagnosis_id in missing.items() if diagnosis_id is None]
+            if absent:
+                cursor.executemany("INSERT INTO diagnoses (category_id, name) VALUES (?, ?)", absent)
+                self._select_diagnosis_ids(cursor, missing)
+
+        diagnosis_ids_list = []
+        for keys in keys_list:
+            diagnosis_ids = {}
+            for key in keys:
+                diagnosis_id = missing[key] if key in missing else dictionary.lookup(*key)
+                diagnosis_ids.setdefault(diagnosis_id)
+            diagnosis_ids_list.append(list(diagnosis_ids))
+
+        new_diagnoses = [(diagnosis_id, name, category_id) for (category_id, name), diagnosis_id in missing.items()]
+        return diagnosis_ids_list, new_diagnoses
+
+    def _select_diagnosis_ids(self, cursor, ids_by_key: Dict[Tuple, Optional[int]]):
+        """Заполнить ids_by_key ({(id категории, название): id}) наименьшими id диагнозов из БД"""
+        pending = {key for key, diagnosis_id in ids_by_key.items() if diagnosis_id is None}
+        names = list({name for _, name in pending})
+
+        for start in range(0, len(names), self._IN_CHUNK_SIZE):
+            chunk = names[start:start + self._IN_CHUNK_SIZE]
+            cursor.execute(f"SELECT id, name, category_id FROM diagnoses WHERE name IN ({', '.join('?' * len(chunk))})",
+                           chunk)
+
+            for row in cursor.fetchall():
+                key = (row['category_id'], row['name'])
+                if key in pending:
+                    diagnosis_id = ids_by_key[key]
+                    ids_by_key[key] = row['id'] if diagnosis_id is None else min(diagnosis_id, row['id'])
+
+    def _register_diagnoses(self, new_diagnoses: List[Tuple]):
+        """Добавить в справочник диагнозы, записанные в БД зафиксированной транзакцией"""
+        dictionary = self.diagnosis_dictionary
+        for diagnosis_id, name, category_id in new_diagnoses:
+            dictionary.register(diagnosis_id, name, category_id)
+
+    def ensure_migrations(self):
+        """Применить недостающие миграции схемы (однократно, при первом подключении к БД)"""
+        if self.db_path in DatabaseManager._migrations_applied:
+            return
+
+        conn = self.get_connection()
+
+        try:
+            report = apply_migrations(conn)
+            if report:
+                print(f"Applied schema migrations to {self.db_path}:\n{format_report(report)}")
+            DatabaseManager._migrations_applied.add(self.db_path)
+        except Exception as e:
+            print(f"Error applying migrations: {e}")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _full_name(emp_dict: Dict) -> str:
+        """Полное ФИО из фамилии, имени и отчества"""
+        full_name_parts = [emp_dict.get('lastname', '')]
+        if emp_dict.get('firstname'):
+            full_name_parts.append(emp_dict['firstname'])
+        if emp_dict.get('patronymic'):
+            full_name_parts.append(emp_dict['patronymic'])
+        return ' '.join(full_name_parts)
+
+    # Диагнозы с категориями; порядок - по id диагноза внутри сотрудника
+    _DIAGNOSES_QUERY = """
+        SELECT 
+            ediag.employee_id,
+            d.name as diagnosis_name,
+            dc.category as category
+        FROM employee_diagnoses ediag
+        JOIN diagnoses d ON ediag.diagnosis_id = d.id
+        JOIN diagnosis_categories dc ON d.category_id = dc.id
+        {where}
+        ORDER BY ediag.employee_id, ediag.diagnosis_id
+    """
+
+    @staticmethod
+    def _group_diagnoses(rows, diagnoses_by_employee: Dict[int, Dict[str, List[str]]]):
+        """Сгруппировать строки (employee_id, diagnosis_name, category) по сотрудникам и категориям"""
+        for diag in rows:
+            diagnoses_by_category = diagnoses_by_employee.setdefault(diag['employee_id'], {})
+            category = diag['category']
+            diagnosis_name = diag['diagnosis_name']
+
+            if category not in diagnoses_by_category:
+                diagnoses_by_category[category] = []
+
+            if diagnosis_name not in diagnoses_by_category[category]:
+                diagnoses_by_category[category].append(diagnosis_name)
+
+        return diagnoses_by_employee
+
+    @classmethod
+    def _fetch_diagnoses(cls, cursor, employee_id: int) -> Dict[str, List[str]]:
+        """Диагнозы сотрудника, сгруппированные по категориям"""
+        cursor.execute(cls._DIAGNOSES_QUERY.format(where="WHERE ediag.employee_id = ?"), (employee_id,))
+        return cls._group_diagnoses(cursor.fetchall(), {}).get(employee_id, {})
+
+    @classmethod
+    def _fetch_all_diagnoses(cls, cursor) -> Dict[int, Dict[str, List[str]]]:
+        """Диагнозы всех сотрудников одним запросом: {employee_id: {категория: [названия]}}"""
+        cursor.execute(cls._DIAGNOSES_QUERY.format(where=""))
+        return cls._group_diagnoses(cursor, {})
+
+    def get_employee_diagnoses(self, employee_id: int) -> Dict[str, List[str]]:
+        """Получить диагнозы сотрудника по категориям (ленивая загрузка текста диагнозов)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            return self._fetch_diagnoses(cursor, employee_id)
+        except Exception as e:
+            print(f"Error getting diagnoses: {e}")
+            return {}
+        finally:
+            conn.close()
+
+    def get_diagnosis_counts(self, dirty_only: bool = False) -> List[Tuple[int, int, int]]:
+        """
+        Количество диагнозов каждого сотрудника по категориям (агрегация на стороне SQL)
+
+        Args:
+            dirty_only: только сотрудники с устаревшим показателем здоровья
+
+        Returns:
+            Список (employee_id, category_id, count, наименьший id диагноза в категории)
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            # COUNT(DISTINCT) - одинаковые названия в категории считаются одним диагнозом
+            cursor.execute(f"""
+            SELECT ediag.employee_id, d.category_id, COUNT(DISTINCT d.name), MIN(ediag.diagnosis_id)
+            FROM employee_diagnoses ediag
+            JOIN diagnoses d ON ediag.diagnosis_id = d.id
+            {self._DIRTY_HEALTH_FILTER.format(column='ediag.employee_id') if dirty_only else ''}
+            GROUP BY ediag.employee_id, d.category_id
+            """)
+            return [tuple(row) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error getting diagnosis counts: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def get_all_diagnoses(self) -> List[Dict]:
+        """Справочник диагнозов: id, название и id категории"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("SELECT id, name, category_id FROM diagnoses ORDER BY id")
+            return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error getting diagnoses: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def get_employee_diagnosis_ids(self) -> List[Tuple[int, int]]:
+        """Пары (employee_id, diagnosis_id) всех сотрудников, упорядоченные по сотруднику (из снимка БД)"""
+        return list(self.cached('employee_diagnosis_ids', self._load_employee_diagnosis_ids))
+
+    def _load_employee_diagnosis_ids(self) -> List[Tuple[int, int]]:
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+            SELECT employee_id, diagnosis_id
+            FROM employee_diagnoses
+            ORDER BY employee_id, diagnosis_id
+            """)
+            return [tuple(row) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error getting employee diagnoses: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def get_health_factors(self, dirty_only: bool = False) -> List[Dict]:
+        """
+        Недиагностические факторы здоровья (даты, инвалидность, профвредность) всех сотрудников
+
+        Args:
+            dirty_only: только сотрудники с устаревшим показателем здоровья
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(f"""
+            SELECT e.id, e.birth_date, e.start_year, ed.disability_group, eh.prof_harm_code
             FROM employees e
-            LEFT JOIN positions p ON e.position_id = p.id
-            LEFT JOIN departments d ON e.department_id = d.id
             LEFT JOIN employee_harm eh ON e.id = eh.employee_id
             LEFT JOIN employee_disability ed ON e.id = ed.employee_id
-            ORDER BY e.lastname
-            """
+            {self._DIRTY_HEALTH_FILTER.format(column='e.id') if dirty_only else ''}
+            ORDER BY e.id
+            """)
+            return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error getting health factors: {e}")
+            return []
+        finally:
+            conn.close()
 
-            cursor.execute(query)
-            employees = []
+    @classmethod
+    def _employee_records(cls, rows) -> List[Dict]:
+        """Записи сотрудников (строки EMPLOYEE_DETAILS_QUERY) с полным именем"""
+        employees = []
+        for row in rows:
+            emp_dict = dict(row)
+            emp_dict['full_name'] = cls._full_name(emp_dict)
+            employees.append(emp_dict)
+        return employees
+
+    def get_all_employees_with_details(self, include_diagnoses: bool = True) -> List[Dict]:
+        """
+        Получить всех сотрудников с деталями
+
+        Args:
+            include_diagnoses: загружать ли текст диагнозов (иначе - только основные данные
+                               из снимка БД; записи общие со снимком и не должны изменяться)
+        """
+        if not include_diagnoses:
+            return list(self.cached('employees', lambda: self._load_employees(include_diagnoses=False)))
+        return self._load_employees(include_diagnoses=True)
+
+    def _load_employees(self, include_diagnoses: bool) -> List[Dict]:
+        """Все сотрудники в порядке фамилий (с текстом диагнозов или без)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
 
-            for row in cursor.fetchall():
-                emp_dict = dict(row)
-                emp_id = emp_dict['id']
-
-                # Формируем полное ФИО
-                full_name_parts = [emp_dict.get('lastname', '')]
-                if emp_dict.get('firstname'):
-                    full_name_parts.append(emp_dict['firstname'])
-                if emp_dict.get('patronymic'):
-                    full_name_parts.append(emp_dict['patronymic'])
-                emp_dict['full_name'] = ' '.join(full_name_parts)
-
-                # Получаем диагнозы для сотрудника
-                diag_query = """
-                SELECT 
-                    d.name as diagnosis_name,
-                    dc.category as category
-                FROM employee_diagnoses ediag
-                JOIN diagnoses d ON ediag.diagnosis_id = d.id
-                JOIN diagnosis_categories dc ON d.category_id = dc.id
-                WHERE ediag.employee_id = ?
-                """
-
-                cursor.execute(diag_query, (emp_id,))
-                diagnoses = cursor.fetchall()
-
-                # Группируем диагнозы по категориям
-                diagnoses_by_category = {}
-                for diag in diagnoses:
-                    category = diag['category']
-                    diagnosis_name = diag['diagnosis_name']
-
-                    if category not in diagnoses_by_category:
-                        diagnoses_by_category[category] = []
-
-                    if diagnosis_name not in diagnoses_by_category[category]:
-                        diagnoses_by_category[category].append(diagnosis_name)
-
-                emp_dict['diagnoses'] = diagnoses_by_category
-                employees.append(emp_dict)
+        try:
+            # Основная информация о сотрудниках
+            cursor.execute(EMPLOYEE_DETAILS_QUERY + "ORDER BY e.lastname, e.id")
+            employees = self._employee_records(cursor.fetchall())
+
+            # Диагнозы всех сотрудников - одним запросом; текст загружается только по запросу
+            if include_diagnoses:
+                diagnoses_by_employee = self._fetch_all_diagnoses(cursor)
+                for emp_dict in employees:
+                    emp_dict['diagnoses'] = diagnoses_by_employee.get(emp_dict['id'], {})
 
             return employees
 
@@ -95,34 +649,182 @@ class DatabaseManager:
         finally:
             conn.close()
 
+    @classmethod
+    def _fetch_employee_details(cls, cursor, employee_ids) -> Tuple[List[Dict], List[Tuple[int, int]]]:
+        """Записи сотрудников в порядке фамилий и их пары (employee_id, diagnosis_id), упорядоченные по сотруднику"""
+        employee_ids = list(employee_ids)
+        records, pairs = [], []
+        for start in range(0, len(employee_ids), cls._IN_CHUNK_SIZE):
+            chunk = employee_ids[start:start + cls._IN_CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            cursor.execute(EMPLOYEE_DETAILS_QUERY + f"WHERE e.id IN ({placeholders})", chunk)
+            records.extend(cls._employee_records(cursor.fetchall()))
+            cursor.execute(f"""
+            SELECT employee_id, diagnosis_id
+            FROM employee_diagnoses
+            WHERE employee_id IN ({placeholders})
+            ORDER BY employee_id, diagnosis_id
+            """, chunk)
+            pairs.extend(tuple(row) for row in cursor.fetchall())
+
+        records.sort(key=_employee_order)
+        pairs.sort()
+        return records, pairs
+
+    def get_employee_details_by_ids(self, employee_ids: List[int]) -> Tuple[List[Dict], List[Tuple[int, int]]]:
+        """
+        Основные данные и id диагнозов отдельных сотрудников - в формате
+        get_all_employees_with_details(include_diagnoses=False) и get_employee_diagnosis_ids
+
+        Returns:
+            (записи в порядке фамилий, пары (employee_id, diagnosis_id), упорядоченные по сотруднику)
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            return self._fetch_employee_details(cursor, employee_ids)
+        except Exception as e:
+            print(f"Error getting employee details: {e}")
+            return [], []
+        finally:
+            conn.close()
+
+    def iter_employee_batches(self, batch_size: int = 1000) -> Iterator[Tuple[List[Dict], List[Tuple[int, int]]]]:
+        """
+        Потоковое чтение сотрудников пакетами по batch_size, без загрузки всей таблицы
+
+        Пакеты идут по возрастанию id (ключевая пагинация: id > последнего id пакета),
+        каждый пакет читается своими запросами, и соединение не удерживается, пока
+        вызывающий код обрабатывает пакет.
+
+        Yields:
+            (записи сотрудников пакета в порядке фамилий, как в get_employee_details_by_ids,
+             пары (employee_id, diagnosis_id) этих сотрудников)
+
+        Raises:
+            sqlite3.Error: ошибка чтения очередного пакета
+        """
+        last_id = 0
+        while True:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+
+            try:
+                cursor.execute("SELECT id FROM employees WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size))
+                employee_ids = [row[0] for row in cursor.fetchall()]
+                if not employee_ids:
+                    return
+                batch = self._fetch_employee_details(cursor, employee_ids)
+            except Exception as e:
+                # Пропущенный пакет исказил бы пакетный расчет - ошибка передается вызывающему
+                print(f"Error streaming employees: {e}")
+                raise
+            finally:
+                conn.close()
+
+            last_id = employee_ids[-1]
+            yield batch
+
+    @staticmethod
+    def _encode_page_token(lastname: str, employee_id: int) -> str:
+        """Токен продолжения: ключ (фамилия, id) последней записи страницы"""
+        return base64.urlsafe_b64encode(json.dumps([lastname, employee_id]).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode_page_token(token: str) -> Tuple[str, int]:
+        """
+        Ключ (фамилия, id) из токена продолжения
+
+        Raises:
+            ValueError: токен поврежден или получен не от get_employees_page
+        """
+        try:
+            lastname, employee_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        except Exception as e:
+            raise ValueError(f"Некорректный токен страницы: {token!r}") from e
+        if not isinstance(lastname, str) or not isinstance(employee_id, int):
+            raise ValueError(f"Некорректный токен страницы: {token!r}")
+        return lastname, employee_id
+
+    def get_employees_page(self, page_size: int = 100, page_token: Optional[str] = None,
+                           department_id: Optional[int] = None, position_id: Optional[int] = None,
+                           include_diagnoses: bool = True) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Страница сотрудников в порядке (фамилия, id) - постраничная выборка по ключу
+
+        Следующая страница начинается после ключа последней записи предыдущей, поэтому
+        время выборки не зависит от номера страницы (в отличие от LIMIT/OFFSET).
+
+        Args:
+            page_size: число сотрудников на странице
+            page_token: токен продолжения из предыдущего вызова (None - первая страница)
+            department_id: только сотрудники предприятия
+            position_id: только сотрудники с должностью
+            include_diagnoses: загружать ли текст диагнозов
+
+        Returns:
+            (записи как в get_all_employees_with_details, токен следующей страницы
+             или None, если страница последняя)
+
+        Raises:
+            ValueError: некорректный page_token
+        """
+        conditions, params = [], []
+        if page_token is not None:
+            conditions.append("(e.lastname, e.id) > (?, ?)")
+            params.extend(self._decode_page_token(page_token))
+        if department_id is not None:
+            conditions.append("e.department_id = ?")
+            params.append(department_id)
+        if position_id is not None:
+            conditions.append("e.position_id = ?")
+            params.append(position_id)
+
+        where = f"WHERE {' AND '.join(conditions)}\n" if conditions else ""
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            # Лишняя запись показывает, есть ли следующая страница
+            cursor.execute(EMPLOYEE_DETAILS_QUERY + where + "ORDER BY e.lastname, e.id\nLIMIT ?",
+                           params + [page_size + 1])
+            rows = cursor.fetchall()
+
+            employees = [dict(row) for row in rows[:page_size]]
+            diagnoses_by_employee = {}
+            if include_diagnoses:
+                employee_ids = [emp_dict['id'] for emp_dict in employees]
+                for start in range(0, len(employee_ids), self._IN_CHUNK_SIZE):
+                    chunk = employee_ids[start:start + self._IN_CHUNK_SIZE]
+                    cursor.execute(self._DIAGNOSES_QUERY.format(
+                        where=f"WHERE ediag.employee_id IN ({', '.join('?' * len(chunk))})"), chunk)
+                    self._group_diagnoses(cursor.fetchall(), diagnoses_by_employee)
+
+            for emp_dict in employees:
+                emp_dict['full_name'] = self._full_name(emp_dict)
+                if include_diagnoses:
+                    emp_dict['diagnoses'] = diagnoses_by_employee.get(emp_dict['id'], {})
+
+            next_token = None
+            if len(rows) > page_size:
+                next_token = self._encode_page_token(employees[-1]['lastname'], employees[-1]['id'])
+            return employees, next_token
+
+        except Exception as e:
+            print(f"Error getting employees page: {e}")
+            return [], None
+        finally:
+            conn.close()
+
     def get_employee_by_id(self, employee_id: int) -> Optional[Dict]:
         """Получить сотрудника по ID"""
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
-            query = """
-            SELECT 
-                e.id,
-                e.lastname,
-                e.firstname,
-                e.patronymic,
-                p.name as position,
-                e.gender,
-                e.birth_date,
-                e.start_year,
-                d.id as department_id,
-                d.name as department_name,
-                eh.prof_harm_code,
-                eh.prof_harm_year,
-                ed.disability_group
-            FROM employees e
-            LEFT JOIN positions p ON e.position_id = p.id
-            LEFT JOIN departments d ON e.department_id = d.id
-            LEFT JOIN employee_harm eh ON e.id = eh.employee_id
-            LEFT JOIN employee_disability ed ON e.id = ed.employee_id
-            WHERE e.id = ?
-            """
+            query = EMPLOYEE_DETAILS_QUERY + "WHERE e.id = ?"
 
             cursor.execute(query, (employee_id,))
             row = cursor.fetchone()
@@ -132,117 +834,287 @@ class DatabaseManager:
 
             emp_dict = dict(row)
 
-            # Формируем полное ФИО
-            full_name_parts = [emp_dict.get('lastname', '')]
-            if emp_dict.get('firstname'):
-                full_name_parts.append(emp_dict['firstname'])
-            if emp_dict.get('patronymic'):
-                full_name_parts.append(emp_dict['patronymic'])
-            emp_dict['full_name'] = ' '.join(full_name_parts)
-
-            # Получаем диагнозы
-            diag_query = """
-            SELECT 
-                d.id as diagnosis_id,
-                d.name as diagnosis_name,
-                dc.category as category
-            FROM employee_diagnoses ediag
-            JOIN diagnoses d ON ediag.diagnosis_id = d.id
-            JOIN diagnosis_categories dc ON d.category_id = dc.id
-            WHERE ediag.employee_id = ?
-            """
+            emp_dict['full_name'] = self._full_name(emp_dict)
 
-            cursor.execute(diag_query, (employee_id,))
-            diagnoses = cursor.fetchall()
+            emp_dict['diagnoses'] = self._fetch_diagnoses(cursor, employee_id)
+
+            return emp_dict
 
-            # Группируем диагнозы по категориям
-            diagnoses_by_category = {}
-            for diag in diagnoses:
-                category = diag['category']
-                diagnosis_name = diag['diagnosis_name']
+        except Exception as e:
+            print(f"Error getting employee: {e}")
+            return None
+        finally:
+            conn.close()
 
-                if category not in diagnoses_by_category:
-                    diagnoses_by_category[category] = []
+    # Число id в одном IN (...) - меньше лимита параметров SQLite в старых сборках (999)
+    _IN_CHUNK_SIZE = 500
 
-                if diagnosis_name not in diagnoses_by_category[category]:
-                    diagnoses_by_category[category].append(diagnosis_name)
+    def _fetch_employees_by_ids(self, cursor, employee_ids) -> List[Dict]:
+        """Сотрудники с диагнозами по списку id: по два запроса на каждые _IN_CHUNK_SIZE id"""
+        employee_ids = list(dict.fromkeys(employee_ids))
+        employees_by_id = {}
+        diagnoses_by_employee = {}
 
-            emp_dict['diagnoses'] = diagnoses_by_category
+        for start in range(0, len(employee_ids), self._IN_CHUNK_SIZE):
+            chunk = employee_ids[start:start + self._IN_CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
 
-            return emp_dict
+            cursor.execute(EMPLOYEE_DETAILS_QUERY + f"WHERE e.id IN ({placeholders})", chunk)
+            for row in cursor.fetchall():
+                employees_by_id.setdefault(row['id'], dict(row))
+
+            cursor.execute(self._DIAGNOSES_QUERY.format(where=f"WHERE ediag.employee_id IN ({placeholders})"), chunk)
+            self._group_diagnoses(cursor.fetchall(), diagnoses_by_employee)
+
+        # Порядок результата - порядок переданных id
+        employees = []
+        for employee_id in employee_ids:
+            emp_dict = employees_by_id.get(employee_id)
+            if emp_dict:
+                emp_dict['full_name'] = self._full_name(emp_dict)
+                emp_dict['diagnoses'] = diagnoses_by_employee.get(employee_id, {})
+                employees.append(emp_dict)
 
+        return employees
+
+    def get_employees_by_ids(self, employee_ids: List[int]) -> List[Dict]:
+        """Получить сотрудников по списку ID (в порядке списка, отсутствующие пропускаются)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            return self._fetch_employees_by_ids(cursor, employee_ids)
         except Exception as e:
-            print(f"Error getting employee: {e}")
-            return None
+            print(f"Error getting employees: {e}")
+            return []
         finally:
             conn.close()
 
+    @staticmethod
+    def _employee_row(employee_data: Dict) -> Tuple:
+        """Значения столбцов employees (lastname, ..., start_year) из данных формы"""
+        # Предприятие обязательно: внешний ключ не допускает несуществующего предприятия
+        if employee_data.get('department_id') is None:
+            raise ValueError("Не указано предприятие сотрудника")
+
+        return (
+            employee_data['lastname'],
+            employee_data.get('firstname', ''),
+            employee_data.get('patronymic', ''),
+            employee_data['birth_date'],
+            employee_data['gender'],
+            employee_data['position_id'],
+            employee_data['department_id'],
+            employee_data.get('start_year')
+        )
+
+    @staticmethod
+    def _begin_write(conn):
+        """Начать транзакцию записи (с блокировкой БД сразу, а не при первом INSERT)"""
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+
+    def _insert_details(self, cursor, records: List[Tuple[int, Dict]]) -> List[Tuple]:
+        """
+        Записать диагнозы, профвредность и инвалидность сотрудников (пакетно)
+
+        Args:
+            records: пары (id сотрудника, данные формы)
+
+        Returns:
+            новые диагнозы для _register_diagnoses
+        """
+        with_diagnoses = [(employee_id, data) for employee_id, data in records if 'diagnoses' in data]
+        diagnosis_ids_list, new_diagnoses = self._resolve_diagnosis_ids_many(
+            cursor, [data['diagnoses'] for _, data in with_diagnoses])
+
+        cursor.executemany("""
+        INSERT OR IGNORE INTO employee_diagnoses (employee_id, diagnosis_id)
+        VALUES (?, ?)
+        """, [(employee_id, diagnosis_id)
+              for (employee_id, _), diagnosis_ids in zip(with_diagnoses, diagnosis_ids_list)
+              for diagnosis_id in diagnosis_ids])
+
+        cursor.executemany("""
+        INSERT INTO employee_harm (employee_id, prof_harm_code, prof_harm_year)
+        VALUES (?, ?, ?)
+        """, [(employee_id, data['prof_harm_code'], data.get('prof_harm_year'))
+              for employee_id, data in records if data.get('prof_harm_code')])
+
+        cursor.executemany("""
+        INSERT INTO employee_disability (employee_id, disability_group)
+        VALUES (?, ?)
+        """, [(employee_id, data['disability_group'])
+              for employee_id, data in records if data.get('disability_group')])
+
+        return new_diagnoses
+
+    def _insert_employees(self, cursor, employees_data: List[Dict]) -> Tuple[List[int], List[Tuple]]:
+        """
+        Добавить сотрудников в открытой транзакции записи (_begin_write)
+
+        id назначаются подряд после последнего выданного (как AUTOINCREMENT),
+        чтобы вставлять сотрудников одним executemany.
+
+        Returns:
+            (id добавленных сотрудников в порядке employees_data, новые диагнозы)
+        """
+        cursor.execute("""
+        SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'employees'), 0),
+                   COALESCE((SELECT MAX(id) FROM employees), 0))
+        """)
+        first_id = cursor.fetchone()[0] + 1
+        employee_ids = list(range(first_id, first_id + len(employees_data)))
+
+        cursor.executemany("""
+        INSERT INTO employees (id, lastname, firstname, patronymic, birth_date, gender, position_id, department_id, start_year)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(employee_id,) + self._employee_row(data) for employee_id, data in zip(employee_ids, employees_data)])
+
+        new_diagnoses = self._insert_details(cursor, list(zip(employee_ids, employees_data)))
+        return employee_ids, new_diagnoses
+
+    # Части данных сотрудника в отчете об изменениях update_employee
+    EMPLOYEE_PARTS = ('employee', 'diagnoses', 'harm', 'disability')
+
+    def _fetch_stored_state(self, cursor, employee_ids: List[int]) -> Dict[int, Dict]:
+        """
+        Записанные данные сотрудников для сравнения с формой
+
+        Returns:
+            {id: {'employee': кортеж _employee_row, 'diagnoses': set(id диагнозов),
+                  'harm': [(код, год)], 'disability': [группа]}}
+        """
+        state = {}
+        for start in range(0, len(employee_ids), self._IN_CHUNK_SIZE):
+            chunk = employee_ids[start:start + self._IN_CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+
+            cursor.execute(f"""
+            SELECT id, lastname, firstname, patronymic, birth_date, gender, position_id, department_id, start_year
+            FROM employees WHERE id IN ({placeholders})
+            """, chunk)
+            for row in cursor.fetchall():
+                state[row['id']] = {'employee': tuple(row)[1:], 'diagnoses': set(), 'harm': [], 'disability': []}
+
+            cursor.execute(f"SELECT employee_id, diagnosis_id FROM employee_diagnoses WHERE employee_id IN ({placeholders})",
+                           chunk)
+            for employee_id, diagnosis_id in cursor.fetchall():
+                state[employee_id]['diagnoses'].add(diagnosis_id)
+
+            cursor.execute(f"""
+            SELECT employee_id, prof_harm_code, prof_harm_year FROM employee_harm
+            WHERE employee_id IN ({placeholders}) ORDER BY id
+            """, chunk)
+            for employee_id, code, year in cursor.fetchall():
+                state[employee_id]['harm'].append((code, year))
+
+            cursor.execute(f"""
+            SELECT employee_id, disability_group FROM employee_disability
+            WHERE employee_id IN ({placeholders}) ORDER BY id
+            """, chunk)
+            for employee_id, group in cursor.fetchall():
+                state[employee_id]['disability'].append(group)
+
+        return {employee_id: state[employee_id] for employee_id in employee_ids if employee_id in state}
+
+    def _update_employees(self, cursor, updates: List[Tuple[int, Dict]]) -> Tuple[Dict[int, Dict[str, bool]], List[Tuple]]:
+        """
+        Обновить сотрудников в открытой транзакции: данные формы сравниваются с записанными,
+        изменяются только отличающиеся строки (триггеры показателя здоровья и поиска
+        срабатывают только для них)
+
+        Args:
+            updates: пары (id сотрудника, данные формы); отсутствующие в БД id пропускаются
+
+        Returns:
+            ({id: {часть из EMPLOYEE_PARTS: изменена ли}}, новые диагнозы для _register_diagnoses)
+        """
+        stored = self._fetch_stored_state(cursor, list(dict.fromkeys(employee_id for employee_id, _ in updates)))
+        updates = [(employee_id, data) for employee_id, data in updates if employee_id in stored]
+
+        # Диагнозы: без ключа 'diagnoses' у сотрудника не остается диагнозов (как при добавлении)
+        with_diagnoses = [(employee_id, data) for employee_id, data in updates if 'diagnoses' in data]
+        diagnosis_ids_list, new_diagnoses = self._resolve_diagnosis_ids_many(
+            cursor, [data['diagnoses'] for _, data in with_diagnoses])
+        target_diagnoses = {employee_id: set() for employee_id, _ in updates}
+        for (employee_id, _), diagnosis_ids in zip(with_diagnoses, diagnosis_ids_list):
+            target_diagnoses[employee_id] = set(diagnosis_ids)
+
+        changes = {}
+        employee_rows, removed_diagnoses, added_diagnoses = [], [], []
+        harm_changed, harm_rows, disability_changed, disability_rows = [], [], [], []
+
+        for employee_id, data in updates:
+            current = stored[employee_id]
+
+            # Пустая строка из формы и NULL в БД считаются одинаковыми
+            employee_row = self._employee_row(data)
+            employee_changed = (tuple('' if value is None else value for value in employee_row) !=
+                                tuple('' if value is None else value for value in current['employee']))
+            if employee_changed:
+                employee_rows.append(employee_row + (employee_id,))
+
+            removed = current['diagnoses'] - target_diagnoses[employee_id]
+            added = target_diagnoses[employee_id] - current['diagnoses']
+            removed_diagnoses.extend((employee_id, diagnosis_id) for diagnosis_id in removed)
+            added_diagnoses.extend((employee_id, diagnosis_id) for diagnosis_id in added)
+
+            harm = [(data['prof_harm_code'], data.get('prof_harm_year'))] if data.get('prof_harm_code') else []
+            if harm != current['harm']:
+                harm_changed.append((employee_id,))
+                harm_rows.extend((employee_id,) + row for row in harm)
+
+            disability = [data['disability_group']] if data.get('disability_group') else []
+            if disability != current['disability']:
+                disability_changed.append((employee_id,))
+                disability_rows.extend((employee_id, group) for group in disability)
+
+            changes[employee_id] = {
+                'employee': employee_changed,
+                'diagnoses': bool(removed or added),
+                'harm': harm != current['harm'],
+                'disability': disability != current['disability']
+            }
+
+        cursor.executemany("""
+        UPDATE employees 
+        SET lastname = ?, firstname = ?, patronymic = ?, birth_date = ?, gender = ?, 
+            position_id = ?, department_id = ?, start_year = ?
+        WHERE id = ?
+        """, employee_rows)
+
+        cursor.executemany("DELETE FROM employee_diagnoses WHERE employee_id = ? AND diagnosis_id = ?", removed_diagnoses)
+        cursor.executemany("INSERT OR IGNORE INTO employee_diagnoses (employee_id, diagnosis_id) VALUES (?, ?)",
+                           added_diagnoses)
+
+        cursor.executemany("DELETE FROM employee_harm WHERE employee_id = ?", harm_changed)
+        cursor.executemany("""
+        INSERT INTO employee_harm (employee_id, prof_harm_code, prof_harm_year)
+        VALUES (?, ?, ?)
+        """, harm_rows)
+
+        cursor.executemany("DELETE FROM employee_disability WHERE employee_id = ?", disability_changed)
+        cursor.executemany("""
+        INSERT INTO employee_disability (employee_id, disability_group)
+        VALUES (?, ?)
+        """, disability_rows)
+
+        return changes, new_diagnoses
+
     def add_employee(self, employee_data: Dict) -> int:
         """Добавить нового сотрудника"""
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
-            # Добавляем основную информацию
-            cursor.execute("""
-            INSERT INTO employees (lastname, firstname, patronymic, birth_date, gender, position_id, department_id, start_year)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                employee_data['lastname'],
-                employee_data.get('firstname', ''),
-                employee_data.get('patronymic', ''),
-                employee_data['birth_date'],
-                employee_data['gender'],
-                employee_data['position_id'],
-                employee_data.get('department_id', 1),
-                employee_data.get('start_year')
-            ))
-
-            employee_id = cursor.lastrowid
-
-            # Добавляем диагнозы
-            if 'diagnoses' in employee_data:
-                for category_name, diagnosis_names in employee_data['diagnoses'].items():
-                    for diagnosis_name in diagnosis_names:
-                        if diagnosis_name.strip():
-                            cursor.execute("SELECT id FROM diagnosis_categories WHERE category = ?", (category_name,))
-                            category_row = cursor.fetchone()
-
-                            if category_row:
-                                category_id = category_row['id']
-
-                                cursor.execute("SELECT id FROM diagnoses WHERE name = ? AND category_id = ?",
-                                               (diagnosis_name, category_id))
-                                existing_diag = cursor.fetchone()
-
-                                if existing_diag:
-                                    diagnosis_id = existing_diag['id']
-                                else:
-                                    cursor.execute("INSERT INTO diagnoses (name, category_id) VALUES (?, ?)",
-                                                   (diagnosis_name, category_id))
-                                    diagnosis_id = cursor.lastrowid
-
-                                cursor.execute("""
-                                INSERT OR IGNORE INTO employee_diagnoses (employee_id, diagnosis_id)
-                                VALUES (?, ?)
-                                """, (employee_id, diagnosis_id))
-
-            # Добавляем профвредность
-            if employee_data.get('prof_harm_code'):
-                cursor.execute("""
-                INSERT INTO employee_harm (employee_id, prof_harm_code, prof_harm_year)
-                VALUES (?, ?, ?)
-                """, (employee_id, employee_data['prof_harm_code'], employee_data.get('prof_harm_year')))
-
-            # Добавляем инвалидность
-            if employee_data.get('disability_group'):
-                cursor.execute("""
-                INSERT INTO employee_disability (employee_id, disability_group)
-                VALUES (?, ?)
-                """, (employee_id, employee_data['disability_group']))
+            self._begin_write(conn)
+            employee_ids, new_diagnoses = self._insert_employees(cursor, [employee_data])
 
             conn.commit()
-            return employee_id
+            self._register_diagnoses(new_diagnoses)
+            self._after_write(employee_ids)
+            return employee_ids[0]
 
         except Exception as e:
             conn.rollback()
@@ -251,188 +1123,375 @@ class DatabaseManager:
         finally:
             conn.close()
 
-    def update_employee(self, employee_id: int, employee_data: Dict) -> bool:
-        """Обновить информацию о сотруднике"""
+    def add_employees_bulk(self, employees_data: List[Dict]) -> List[int]:
+        """
+        Добавить сотрудников одной транзакцией (импорт)
+
+        Args:
+            employees_data: данные сотрудников в формате add_employee
+
+        Returns:
+            id добавленных сотрудников в порядке employees_data
+        """
+        if not employees_data:
+            return []
+
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
-            # Обновляем основную информацию
-            cursor.execute("""
-            UPDATE employees 
-            SET lastname = ?, firstname = ?, patronymic = ?, birth_date = ?, gender = ?, 
-                position_id = ?, department_id = ?, start_year = ?
-            WHERE id = ?
-            """, (
-                employee_data['lastname'],
-                employee_data.get('firstname', ''),
-                employee_data.get('patronymic', ''),
-                employee_data['birth_date'],
-                employee_data['gender'],
-                employee_data['position_id'],
-                employee_data.get('department_id', 1),
-                employee_data.get('start_year'),
-                employee_id
-            ))
-
-            # Удаляем старые диагнозы
-            cursor.execute("DELETE FROM employee_diagnoses WHERE employee_id = ?", (employee_id,))
-
-            # Добавляем новые диагнозы
-            if 'diagnoses' in employee_data:
-                for category_name, diagnosis_names in employee_data['diagnoses'].items():
-                    for diagnosis_name in diagnosis_names:
-                        if diagnosis_name.strip():
-                            cursor.execute("SELECT id FROM diagnosis_categories WHERE category = ?", (category_name,))
-                            category_row = cursor.fetchone()
-
-                            if category_row:
-                                category_id = category_row['id']
-
-                                cursor.execute("SELECT id FROM diagnoses WHERE name = ? AND category_id = ?",
-                                               (diagnosis_name, category_id))
-                                existing_diag = cursor.fetchone()
-
-                                if existing_diag:
-                                    diagnosis_id = existing_diag['id']
-                                else:
-                                    cursor.execute("INSERT INTO diagnoses (name, category_id) VALUES (?, ?)",
-                                                   (diagnosis_name, category_id))
-                                    diagnosis_id = cursor.lastrowid
-
-                                cursor.execute("""
-                                INSERT INTO employee_diagnoses (employee_id, diagnosis_id)
-                                VALUES (?, ?)
-                                """, (employee_id, diagnosis_id))
-
-            # Обновляем профвредность
-            cursor.execute("DELETE FROM employee_harm WHERE employee_id = ?", (employee_id,))
-            if employee_data.get('prof_harm_code'):
-                cursor.execute("""
-                INSERT INTO employee_harm (employee_id, prof_harm_code, prof_harm_year)
-                VALUES (?, ?, ?)
-                """, (employee_id, employee_data['prof_harm_code'], employee_data.get('prof_harm_year')))
-
-            # Обновляем инвалидность
-            cursor.execute("DELETE FROM employee_disability WHERE employee_id = ?", (employee_id,))
-            if employee_data.get('disability_group'):
-                cursor.execute("""
-                INSERT INTO employee_disability (employee_id, disability_group)
-                VALUES (?, ?)
-                """, (employee_id, employee_data['disability_group']))
+            self._begin_write(conn)
+            employee_ids, new_diagnoses = self._insert_employees(cursor, employees_data)
+
+            conn.commit()
+            self._register_diagnoses(new_diagnoses)
+            self._after_write(employee_ids)
+            return employee_ids
+
+        except Exception as e:
+            conn.rollback()
+            print(f"Error adding employees: {e}")
+            raise
+        finally:
+            conn.close()
+
+    def update_employee(self, employee_id: int, employee_data: Dict) -> Optional[Dict[str, bool]]:
+        """
+        Обновить информацию о сотруднике (записываются только изменившиеся данные)
+
+        Returns:
+            {часть из EMPLOYEE_PARTS: изменена ли} или None при ошибке
+        """
+        changes = self.update_employees_bulk([(employee_id, employee_data)])
+        if changes is None:
+            return None
+        return changes.get(employee_id, dict.fromkeys(self.EMPLOYEE_PARTS, False))
+
+    def update_employees_bulk(self, updates: List[Tuple[int, Dict]]) -> Optional[Dict[int, Dict[str, bool]]]:
+        """
+        Обновить сотрудников одной транзакцией (записываются только изменившиеся данные)
+
+        Args:
+            updates: пары (id сотрудника, данные в формате update_employee)
+
+        Returns:
+            {id: {часть из EMPLOYEE_PARTS: изменена ли}} для найденных сотрудников
+            или None при ошибке (ничего не изменено)
+        """
+        if not updates:
+            return {}
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            self._begin_write(conn)
+            changes, new_diagnoses = self._update_employees(cursor, updates)
 
             conn.commit()
-            return True
+            self._register_diagnoses(new_diagnoses)
+            changed_ids = [employee_id for employee_id, parts in changes.items() if any(parts.values())]
+            if changed_ids:
+                self._after_write(changed_ids)
+            return changes
 
         except Exception as e:
             conn.rollback()
             print(f"Error updating employee: {e}")
-            return False
+            return None
         finally:
             conn.close()
 
-    def delete_employee(self, employee_id: int) -> bool:
-        """Удалить сотрудника"""
+    def get_dirty_health_scores(self) -> List[Tuple[int, int]]:
+        """
+        Получить сотрудников с устаревшим показателем здоровья
+
+        Returns:
+            Список пар (employee_id, version), где version - текущая версия входных данных
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
-            # Удаляем связанные записи
-            cursor.execute("DELETE FROM employee_diagnoses WHERE employee_id = ?", (employee_id,))
-            cursor.execute("DELETE FROM employee_harm WHERE employee_id = ?", (employee_id,))
-            cursor.execute("DELETE FROM employee_disability WHERE employee_id = ?", (employee_id,))
+            # Записи всех сотрудников созданы миграцией 2 и триггерами
+            cursor.execute("""
+            SELECT employee_id, version
+            FROM employee_health
+            WHERE computed_version < version
+            """)
+            return [(row['employee_id'], row['version']) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error getting dirty health scores: {e}")
+            return []
+        finally:
+            conn.close()
 
-            # Удаляем сотрудника
-            cursor.execute("DELETE FROM employees WHERE id = ?", (employee_id,))
+    def invalidate_health_scores(self, config_hash: str) -> int:
+        """
+        Пометить устаревшими показатели, посчитанные с другими параметрами модели
+
+        Сначала выполняется чтение: если таких показателей нет, транзакция записи не открывается
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+            SELECT EXISTS (
+                SELECT 1 FROM employee_health
+                WHERE computed_version = version AND config_hash IS NOT ?
+            )
+            """, (config_hash,))
+            if not cursor.fetchone()[0]:
+                return 0
 
+            cursor.execute("""
+            UPDATE employee_health
+            SET version = version + 1
+            WHERE computed_version = version AND config_hash IS NOT ?
+            """, (config_hash,))
             conn.commit()
-            return cursor.rowcount > 0
+            if cursor.rowcount > 0:
+                self._after_write()
+            return cursor.rowcount
+        except Exception as e:
+            conn.rollback()
+            print(f"Error invalidating health scores: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def save_health_scores(self, scores: List[Tuple[int, int, float]], config_hash: str) -> int:
+        """
+        Сохранить пересчитанные показатели здоровья одной транзакцией
 
+        Args:
+            scores: список (employee_id, version, health_score); запись обновляется,
+                    только если версия входных данных не изменилась с момента чтения
+            config_hash: хэш параметров модели, с которыми посчитаны показатели
+
+        Returns:
+            Количество обновленных записей
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.executemany("""
+            UPDATE employee_health
+            SET health_score = ?, computed_version = ?, config_hash = ?
+            WHERE employee_id = ? AND version = ?
+            """, [(score, version, config_hash, employee_id, version) for employee_id, version, score in scores])
+            conn.commit()
+            if cursor.rowcount > 0:
+                self._after_write([employee_id for employee_id, _, _ in scores])
+            return cursor.rowcount
         except Exception as e:
             conn.rollback()
-            print(f"Error deleting employee: {e}")
-            return False
+            print(f"Error saving health scores: {e}")
+            return 0
         finally:
             conn.close()
 
-    def get_all_departments(self) -> List[Dict]:
-        """Получить все предприятия"""
+    def save_risk_assessments(self, results: List[Tuple], config_hash: str,
+                              run_id: Optional[int] = None) -> Optional[int]:
+        """
+        Сохранить результаты пакетного расчета риска как новый запуск (одной транзакцией)
+
+        Args:
+            results: кортежи значений в порядке RISK_ASSESSMENT_COLUMNS
+            config_hash: хэш конфигурации, с которой посчитан риск
+            run_id: дописать результаты к уже сохраненному запуску (None - новый запуск);
+                    пакетные задания сохраняют так результаты по частям
+
+        Returns:
+            Номер запуска (run_id) или None при ошибке
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
-            cursor.execute("SELECT id, name FROM departments ORDER BY name")
+            self._begin_write(conn)
+            if run_id is None:
+                cursor.execute("SELECT COALESCE(MAX(run_id), 0) + 1 FROM risk_assessments")
+                run_id = cursor.fetchone()[0]
+            assessed_at = datetime.now().isoformat(sep=' ', timespec='seconds')
+
+            cursor.executemany(f"""
+            INSERT INTO risk_assessments (run_id, config_hash, assessed_at, {', '.join(RISK_ASSESSMENT_COLUMNS)})
+            VALUES (?, ?, ?, {', '.join('?' * len(RISK_ASSESSMENT_COLUMNS))})
+            """, [(run_id, config_hash, assessed_at) + tuple(result) for result in results])
+            # Результаты расчета риска не входят в снимок БД - _after_write не нужен
+            conn.commit()
+            return run_id
+        except Exception as e:
+            conn.rollback()
+            print(f"Error saving risk assessments: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def get_risk_history(self, employee_id: int) -> List[Dict]:
+        """Результаты расчета риска сотрудника, начиная с последнего"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+            SELECT * FROM risk_assessments
+            WHERE employee_id = ?
+            ORDER BY id DESC
+            """, (employee_id,))
             return [dict(row) for row in cursor.fetchall()]
         except Exception as e:
-            print(f"Error getting departments: {e}")
+            print(f"Error getting risk history: {e}")
             return []
         finally:
             conn.close()
 
-    def search_employees(self, query: str) -> List[Dict]:
-        """Поиск сотрудников"""
+    def get_latest_risk_assessments(self, employee_ids: Optional[List[int]] = None) -> Dict[int, Dict]:
+        """
+        Последний сохраненный результат расчета риска для каждого сотрудника
+
+        Args:
+            employee_ids: только эти сотрудники (None - все)
+
+        Returns:
+            {id сотрудника: строка risk_assessments}
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
-            search_term = f"%{query}%"
+            query = """
+            SELECT * FROM risk_assessments
+            WHERE id IN (SELECT MAX(id) FROM risk_assessments {where} GROUP BY employee_id)
+            """
+            if employee_ids is None:
+                cursor.execute(query.format(where=""))
+                rows = cursor.fetchall()
+            else:
+                rows = []
+                for start in range(0, len(employee_ids), self._IN_CHUNK_SIZE):
+                    chunk = list(employee_ids[start:start + self._IN_CHUNK_SIZE])
+                    cursor.execute(query.format(where=f"WHERE employee_id IN ({', '.join('?' * len(chunk))})"), chunk)
+                    rows.extend(cursor.fetchall())
+            return {row['employee_id']: dict(row) for row in rows}
+        except Exception as e:
+            print(f"Error getting latest risk assessments: {e}")
+            return {}
+        finally:
+            conn.close()
+
+    def get_risk_run_summary(self, run_id: int) -> List[Dict]:
+        """Сводка запуска по категориям риска: число сотрудников, средний, минимальный и максимальный риск"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
 
+        try:
             cursor.execute("""
-            SELECT DISTINCT e.id
-            FROM employees e
-            LEFT JOIN positions p ON e.position_id = p.id
-            LEFT JOIN departments d ON e.department_id = d.id
-            WHERE e.lastname LIKE ? 
-               OR e.firstname LIKE ? 
-               OR e.patronymic LIKE ? 
-               OR p.name LIKE ?
-               OR d.name LIKE ?
-            """, (search_term, search_term, search_term, search_term, search_term))
+            SELECT risk_category, COUNT(*) as count, AVG(risk_value) as mean_risk,
+                   MIN(risk_value) as min_risk, MAX(risk_value) as max_risk
+            FROM risk_assessments
+            WHERE run_id = ?
+            GROUP BY risk_category
+            ORDER BY mean_risk
+            """, (run_id,))
+            return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error getting risk run summary: {e}")
+            return []
+        finally:
+            conn.close()
 
-            employee_ids = [row['id'] for row in cursor.fetchall()]
-            employees = []
+    def delete_employee(self, employee_id: int) -> bool:
+        """Удалить сотрудника"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
 
-            for emp_id in employee_ids:
-                emp_data = self.get_employee_by_id(emp_id)
-                if emp_data:
-                    employees.append(emp_data)
+        try:
+            # Связанные записи удаляются каскадно (ON DELETE CASCADE)
+            cursor.execute("DELETE FROM employees WHERE id = ?", (employee_id,))
 
-            return employees
+            conn.commit()
+            if cursor.rowcount > 0:
+                self._after_write([employee_id])
+            return cursor.rowcount > 0
 
         except Exception as e:
-            print(f"Error searching employees: {e}")
-            return []
+            conn.rollback()
+            print(f"Error deleting employee: {e}")
+            return False
         finally:
             conn.close()
 
-    def get_diagnosis_categories(self) -> List[Dict]:
-        """Получить все категории диагнозов"""
+    def get_all_departments(self) -> List[Dict]:
+        """Получить все предприятия (из снимка БД)"""
+        return [dict(row) for row in self.cached('departments', lambda: self._load_reference(
+            "SELECT id, name FROM departments ORDER BY name", 'departments'))]
+
+    @staticmethod
+    def _search_match_query(query: str) -> str:
+        """
+        Запрос FTS5 из строки поиска: каждое слово ищется как префикс, слова через AND,
+        ё заменяется на е (как в индексе employee_search)
+
+        Returns:
+            строка для MATCH (пустая - в запросе нет слов)
+        """
+        query = query.replace('ё', 'е').replace('Ё', 'Е')
+        return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+    def search_employees(self, query: str) -> List[Dict]:
+        """Поиск сотрудников по началу слов ФИО, должности и предприятия (индекс employee_search)"""
+        match_query = self._search_match_query(query)
+        if not match_query:
+            return []
+
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
-            cursor.execute("SELECT id, category FROM diagnosis_categories ORDER BY category")
-            return [dict(row) for row in cursor.fetchall()]
+            cursor.execute("""
+            SELECT rowid AS id
+            FROM employee_search
+            WHERE employee_search MATCH ?
+            ORDER BY rank
+            """, (match_query,))
+
+            employee_ids = [row['id'] for row in cursor.fetchall()]
+            return self._fetch_employees_by_ids(cursor, employee_ids)
+
         except Exception as e:
-            print(f"Error getting categories: {e}")
+            print(f"Error searching employees: {e}")
             return []
         finally:
             conn.close()
 
-    def get_positions(self) -> List[Dict]:
-        """Получить все должности"""
+    def _load_reference(self, query: str, name: str) -> List[Dict]:
+        """Строки справочника"""
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
-            cursor.execute("SELECT id, name FROM positions ORDER BY name")
+            cursor.execute(query)
             return [dict(row) for row in cursor.fetchall()]
         except Exception as e:
-            print(f"Error getting positions: {e}")
+            print(f"Error getting {name}: {e}")
             return []
         finally:
             conn.close()
 
+    def get_diagnosis_categories(self) -> List[Dict]:
+        """Получить все категории диагнозов (из снимка БД)"""
+        return [dict(row) for row in self.cached('diagnosis_categories', lambda: self._load_reference(
+            "SELECT id, category FROM diagnosis_categories ORDER BY category", 'categories'))]
+
+    def get_positions(self) -> List[Dict]:
+        """Получить все должности (из снимка БД)"""
+        return [dict(row) for row in self.cached('positions', lambda: self._load_reference(
+            "SELECT id, name FROM positions ORDER BY name", 'positions'))]
+
     def get_department_by_id(self, department_id: int) -> Optional[Dict]:
         """Получить предприятие по ID"""
         conn = self.get_connection()
@@ -461,6 +1520,7 @@ class DatabaseManager:
 
             cursor.execute("INSERT INTO departments (name) VALUES (?)", (name,))
             conn.commit()
+            self._after_write()
             return cursor.lastrowid
         except Exception as e:
             conn.rollback()
@@ -482,6 +1542,7 @@ class DatabaseManager:
 
             cursor.execute("UPDATE departments SET name = ? WHERE id = ?", (name, department_id))
             conn.commit()
+            self._after_write()
             return cursor.rowcount > 0
         except Exception as e:
             conn.rollback()
@@ -491,28 +1552,21 @@ class DatabaseManager:
             conn.close()
 
     def delete_department(self, department_id: int) -> bool:
-        """Удалить предприятие и всех его сотрудников"""
+        """Удалить предприятие и всех его сотрудников (одной транзакцией, без цикла по сотрудникам)"""
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
-            # Получаем всех сотрудников этого предприятия
-            cursor.execute("SELECT id FROM employees WHERE department_id = ?", (department_id,))
-            employees = cursor.fetchall()
-
-            # Удаляем всех сотрудников (каскадно удалятся их связи благодаря внешним ключам)
-            for emp in employees:
-                emp_id = emp['id']
-                cursor.execute("DELETE FROM employee_diagnoses WHERE employee_id = ?", (emp_id,))
-                cursor.execute("DELETE FROM employee_harm WHERE employee_id = ?", (emp_id,))
-                cursor.execute("DELETE FROM employee_disability WHERE employee_id = ?", (emp_id,))
+            self._begin_write(conn)
 
+            # Сотрудники предприятия одним запросом, их записи удаляются каскадно (ON DELETE CASCADE)
             cursor.execute("DELETE FROM employees WHERE department_id = ?", (department_id,))
 
             # Удаляем предприятие
             cursor.execute("DELETE FROM departments WHERE id = ?", (department_id,))
 
             conn.commit()
+            self._after_write()
             return cursor.rowcount > 0
         except Exception as e:
             conn.rollback()
@@ -0,0 +1,165 @@
+"""Разбор дат и расчет возраста/стажа (скалярно и векторно через numpy.datetime64)"""
+
+import re
+from datetime import date, datetime
+from typing import Optional
+
+import numpy as np
+
+# Форматы дат, встречающиеся в БД и во входных данных
+DATE_FORMATS = [
+    '%Y-%m-%d',
+    '%d.%m.%Y',
+    '%d/%m/%Y',
+    '%Y/%m/%d',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f'
+]
+
+# Строка ISO-даты без времени - единственный формат, который разбирается NumPy целиком
+ISO_DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+def parse_date(value) -> Optional[date]:
+    """
+    Привести значение к date
+
+    Args:
+        value: date, datetime или строка в одном из DATE_FORMATS
+
+    Returns:
+        date или None для пустого значения
+
+    Raises:
+        ValueError: если строку не удалось разобрать ни в одном формате
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+
+    text = str(value).strip()
+
+    # Быстрый путь для ISO-даты (основной формат БД)
+    if len(text) == 10 and text[4] == '-' and text[7] == '-':
+        try:
+            return date.fromisoformat(text)
+        except ValueError:
+            pass
+
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+
+    raise ValueError(f"Неизвестный формат даты: {value!r}")
+
+
+def try_parse_date(value) -> Optional[date]:
+    """parse_date, возвращающий None для некорректной строки"""
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+def full_years(start: date, reference: date) -> int:
+    """Число полных лет между датами (возраст на дату reference)"""
+    years = reference.year - start.year
+
+    # Проверяем, была ли уже годовщина в году reference
+    if (reference.month, reference.day) < (start.month, start.day):
+        years -= 1
+
+    return years
+
+
+def experience_years(start: date, reference: date) -> float:
+    """
+    Стаж в годах на дату reference: полные годы плюс дробная часть по месяцам
+    """
+    experience = full_years(start, reference)
+
+    # Добавляем дробную часть (месяцы)
+    if experience > 0:
+        experience += ((reference.month - start.month) % 12) / 12.0
+
+    return max(0.0, experience)
+
+
+def to_datetime64(dates) -> np.ndarray:
+    """Массив date/None -> numpy.datetime64[D] (None -> NaT)"""
+    return np.array([np.datetime64(value, 'D') if value else np.datetime64('NaT') for value in dates],
+                    dtype='datetime64[D]')
+
+
+def parse_dates_array(values) -> np.ndarray:
+    """
+    Массив значений дат (строки, date, None) -> numpy.datetime64[D]
+
+    Строки вида YYYY-MM-DD (и объекты date) разбираются NumPy целиком; при другом
+    формате - поэлементно через try_parse_date (некорректное значение -> NaT)
+    """
+    values = [value if value else None for value in values]
+    # NumPy принимает и неполные даты ('2020'), и дату со временем ('1985-03-12T10:00'),
+    # которые try_parse_date не разбирает, - такие значения разбираем поэлементно
+    if all(value is None or type(value) is date
+           or (isinstance(value, str) and ISO_DATE_PATTERN.fullmatch(value)) for value in values):
+        try:
+            return np.array([value or 'NaT' for value in values], dtype='datetime64[D]')
+        except ValueError:
+            pass
+    return to_datetime64([try_parse_date(value) for value in values])
+
+
+def _split_dates(dates):
+    """Разложить datetime64[D] на год, месяц (1-12) и день (1-31)"""
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    years = dates.astype('datetime64[Y]')
+    months = dates.astype('datetime64[M]')
+    return (
+        years.astype(np.int64) + 1970,
+        (months - years.astype('datetime64[M]')).astype(np.int64) + 1,
+        (dates - months.astype('datetime64[D]')).astype(np.int64) + 1
+    )
+
+
+def _full_years_array(start_dates, reference: date):
+    """Векторный full_years: массив полных лет и месяцы начальных дат"""
+    start_year, start_month, start_day = _split_dates(start_dates)
+
+    years = reference.year - start_year
+    before_anniversary = (reference.month < start_month) | (
+        (reference.month == start_month) & (reference.day < start_day)
+    )
+    return years - before_anniversary, start_month
+
+
+def ages_array(birth_dates, reference: date) -> np.ndarray:
+    """
+    Возраст на дату reference для массива дат рождения (datetime64[D])
+
+    Returns:
+        float-массив, NaN для неизвестной даты рождения
+    """
+    birth_dates = np.asarray(birth_dates, dtype='datetime64[D]')
+    ages, _ = _full_years_array(birth_dates, reference)
+    return np.where(np.isnat(birth_dates), np.nan, ages.astype(np.float64))
+
+
+def experience_years_array(start_dates, reference: date) -> np.ndarray:
+    """
+    Стаж в годах на дату reference для массива дат начала работы (datetime64[D])
+
+    Совпадает с experience_years поэлементно; неизвестная дата дает стаж 0
+    """
+    start_dates = np.asarray(start_dates, dtype='datetime64[D]')
+    experience, start_month = _full_years_array(start_dates, reference)
+
+    experience = experience.astype(np.float64)
+    experience = np.where(experience > 0, experience + ((reference.month - start_month) % 12) / 12.0, experience)
+
+    return np.where(np.isnat(start_dates), 0.0, np.maximum(experience, 0.0))
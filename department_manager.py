@@ -89,7 +89,8 @@ class DepartmentsWindow(QMainWindow):
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.employee_manager = EmployeeManager()
+        # Менеджер главного окна: удаление предприятия сообщает его подписчикам об удаленных сотрудниках
+        self.employee_manager = getattr(parent, 'employee_manager', None) or EmployeeManager()
         self.main_window = parent
         self.setup_ui()
         self.load_departments()
@@ -0,0 +1,144 @@
+"""Общий справочник диагнозов: сотрудники хранят целочисленные id, текст - только для отображения"""
+
+import sys
+from itertools import chain
+
+import numpy as np
+
+
+class DiagnosisDictionary:
+    """
+    Справочник диагнозов и категорий, загружаемый из БД один раз на процесс
+
+    Одинаковые названия в одной категории - один диагноз (как COUNT(DISTINCT d.name)),
+    поэтому каждый id диагноза приводится к каноническому - id первой записи с таким
+    названием. Названия интернированы и хранятся в одном экземпляре.
+    """
+
+    # Справочники по пути к БД
+    _instances = {}
+
+    def __init__(self, diagnoses, categories):
+        """
+        Args:
+            diagnoses: записи diagnoses ({'id', 'name', 'category_id'})
+            categories: записи diagnosis_categories ({'id', 'category'})
+        """
+        self.category_names = {cat['id']: sys.intern(cat['category']) for cat in categories}
+        self.category_ids_by_name = {category: category_id for category_id, category in self.category_names.items()}
+
+        self.names = np.empty(0, dtype=object)
+        self.category_ids = np.zeros(0, dtype=np.int64)
+        self.known = np.zeros(0, dtype=bool)
+        self.canonical_ids = np.zeros(0, dtype=np.int64)
+        self._ids_by_key = {}
+        self._column_maps = {}
+
+        for diag in diagnoses:
+            self.register(diag['id'], diag['name'], diag['category_id'])
+
+    @classmethod
+    def for_database(cls, db):
+        """Справочник для БД db (DatabaseManager), загружается при первом обращении"""
+        dictionary = cls._instances.get(db.db_path)
+        if dictionary is None:
+            dictionary = cls.load(db)
+        return dictionary
+
+    @classmethod
+    def load(cls, db):
+        """Загрузить (или перезагрузить) справочник для БД db"""
+        dictionary = cls(db.get_all_diagnoses(), db.get_diagnosis_categories())
+        cls._instances[db.db_path] = dictionary
+        return dictionary
+
+    def _grow(self, size: int):
+        """Расширить массивы, индексируемые id диагноза, до size элементов"""
+        extra = size - len(self.names)
+        if extra <= 0:
+            return
+        capacity = max(size, 2 * len(self.names))
+        extra = capacity - len(self.names)
+        self.names = np.concatenate([self.names, np.empty(extra, dtype=object)])
+        self.category_ids = np.concatenate([self.category_ids, np.zeros(extra, dtype=np.int64)])
+        self.known = np.concatenate([self.known, np.zeros(extra, dtype=bool)])
+        self.canonical_ids = np.concatenate([
+            self.canonical_ids, np.arange(len(self.canonical_ids), capacity, dtype=np.int64)
+        ])
+
+    def register(self, diagnosis_id: int, name: str, category_id: int) -> int:
+        """
+        Добавить диагноз в справочник
+
+        Returns:
+            канонический id диагноза
+        """
+        self._grow(diagnosis_id + 1)
+        self.names[diagnosis_id] = sys.intern(name)
+        self.category_ids[diagnosis_id] = category_id
+        self.known[diagnosis_id] = category_id in self.category_names
+
+        canonical_id = self._ids_by_key.setdefault((category_id, name), diagnosis_id)
+        self.canonical_ids[diagnosis_id] = canonical_id
+        return int(canonical_id)
+
+    def register_categories(self, categories):
+        """
+        Добавить категории, появившиеся в БД после загрузки справочника
+
+        Args:
+            categories: записи diagnosis_categories ({'id', 'category'})
+        """
+        for cat in categories:
+            category = sys.intern(cat['category'])
+            self.category_names[cat['id']] = category
+            self.category_ids_by_name[category] = cat['id']
+
+        self.known = np.isin(self.category_ids, list(self.category_names)) & ~np.equal(self.names, None)
+        self._column_maps.clear()
+
+    def lookup(self, category_id: int, name: str):
+        """Канонический id диагноза по категории и названию (None - нет в справочнике)"""
+        return self._ids_by_key.get((category_id, name))
+
+    def is_known(self, diagnosis_ids) -> np.ndarray:
+        """Маска id, известных справочнику (с существующей категорией)"""
+        diagnosis_ids = np.asarray(diagnosis_ids, dtype=np.int64)
+        inside = (diagnosis_ids >= 0) & (diagnosis_ids < len(self.known))
+        inside[inside] = self.known[diagnosis_ids[inside]]
+        return inside
+
+    def group(self, diagnosis_ids) -> dict:
+        """Диагнозы по категориям ({категория: [названия]}) для массива id диагнозов"""
+        diagnoses_by_category = {}
+        for diagnosis_id in diagnosis_ids:
+            category = self.category_names[self.category_ids[diagnosis_id]]
+            diagnoses_by_category.setdefault(category, []).append(self.names[diagnosis_id])
+        return diagnoses_by_category
+
+    def join(self, diagnosis_ids, separator: str = ", ") -> str:
+        """Текст диагнозов для отображения (в порядке группировки по категориям)"""
+        return separator.join(chain.from_iterable(self.group(diagnosis_ids).values()))
+
+    def column_map(self, model) -> np.ndarray:
+        """
+        Массив: id категории -> столбец матрицы модели здоровья (-1 - категория не учитывается)
+
+        Кэшируется для модели (модели кэшируются по хэшу конфигурации)
+        """
+        key = id(model)
+        cached = self._column_maps.get(key)
+        if cached is not None and cached[0] is model:
+            return cached[1]
+
+        columns = np.full(max(self.category_names, default=0) + 1, -1, dtype=np.int64)
+        for category_id, category in self.category_names.items():
+            columns[category_id] = model.category_ids.get(category, -1)
+        if len(self._column_maps) >= 16:
+            self._column_maps.clear()
+        self._column_maps[key] = (model, columns)
+        return columns
+
+    def count_columns(self, diagnosis_ids, model) -> np.ndarray:
+        """Столбцы матрицы модели здоровья для массива id диагнозов (-1 - не учитывается)"""
+        return self.column_map(model)[self.category_ids[diagnosis_ids]]
@@ -1,10 +1,26 @@
+import bisect
+import sys
+
+import numpy as np
+
 from database import DatabaseManager
-from datetime import datetime
+from health_calculator import HealthCalculator
+from diagnosis_dictionary import DiagnosisDictionary
+from date_utils import parse_date, try_parse_date, full_years, experience_years, to_datetime64, parse_dates_array, ages_array, experience_years_array
+from datetime import date
 
 class Employee:
     """Класс работника с данными из БД"""
 
-    def __init__(self, employee_dict: dict):
+    __slots__ = (
+        'id', 'full_name', 'lastname', 'firstname', 'patronymic', 'position', 'gender',
+        'birth_date', 'start_year', 'department_id', 'department_name',
+        'birth_day', 'start_day', '_age_cache', '_experience_cache',
+        '_diagnoses', '_diagnosis_loader', 'diagnosis_counts', 'diagnosis_ids', 'diagnosis_dictionary',
+        'prof_harm_code', 'prof_harm_year', 'disability_group', 'health_score'
+    )
+
+    def __init__(self, employee_dict: dict, diagnosis_loader=None):
         self.id = employee_dict['id']
         self.full_name = employee_dict['full_name']
         self.lastname = employee_dict.get('lastname', '')
@@ -17,8 +33,30 @@ class Employee:
         self.department_id = employee_dict.get('department_id')
         self.department_name = employee_dict.get('department_name', '')
 
-        # Диагнозы
-        self.diagnoses = employee_dict.get('diagnoses', {})
+        # Даты разбираются один раз при загрузке записи (EmployeeFrame передает готовые даты)
+        if 'birth_day' in employee_dict:
+            self.birth_day = employee_dict['birth_day']
+            self.start_day = employee_dict['start_day']
+        else:
+            self.birth_day = self._parse_date_field('birth_date', self.birth_date)
+            self.start_day = self._parse_date_field('start_year', self.start_year)
+
+        # Кэш возраста и стажа: (дата расчета, значение)
+        self._age_cache = None
+        self._experience_cache = None
+
+        # Диагнозы: массив id общего справочника (текст - только для отображения)
+        # либо текст, загружаемый через diagnosis_loader при первом обращении
+        self.diagnosis_ids = employee_dict.get('diagnosis_ids')
+        self.diagnosis_dictionary = employee_dict.get('diagnosis_dictionary')
+        self._diagnoses = employee_dict.get('diagnoses')
+        self._diagnosis_loader = diagnosis_loader
+        if self._diagnoses is None and diagnosis_loader is None and self.diagnosis_ids is None:
+            self._diagnoses = {}
+
+        self.diagnosis_counts = employee_dict.get('diagnosis_counts')
+        if self.diagnosis_counts is None and self._diagnoses is not None:
+            self.diagnosis_counts = {category: len(names) for category, names in self._diagnoses.items()}
 
         # Профвредность
         self.prof_harm_code = employee_dict.get('prof_harm_code')
@@ -27,80 +65,538 @@ class Employee:
         # Инвалидность
         self.disability_group = employee_dict.get('disability_group')
 
-    def get_age(self):
-        """Рассчитать возраст"""
-        if not self.birth_date:
-            print("Нет возраста")
-            return None
+        # Материализованный показатель здоровья (None, если в БД он устарел)
+        self.health_score = employee_dict.get('health_score')
 
+    @property
+    def diagnoses(self):
+        """Диагнозы по категориям: {категория: [названия]}"""
+        if self._diagnoses is None:
+            if self.diagnosis_ids is not None:
+                self._diagnoses = self.diagnosis_dictionary.group(self.diagnosis_ids)
+            else:
+                self._diagnoses = self._diagnosis_loader(self.id)
+        return self._diagnoses
+
+    @diagnoses.setter
+    def diagnoses(self, value):
+        self._diagnoses = value
+        self.diagnosis_ids = None
+
+    def diagnoses_text(self, separator: str = ", ") -> str:
+        """Текст диагнозов для отображения и экспорта"""
+        if self._diagnoses is None and self.diagnosis_ids is not None:
+            return self.diagnosis_dictionary.join(self.diagnosis_ids, separator)
+        return separator.join(name for names in self.diagnoses.values() for name in names)
+
+    def _parse_date_field(self, field_name, value):
+        """Разобрать дату из записи БД (некорректное значение -> None с предупреждением)"""
         try:
-            formats = [
-                '%Y-%m-%d',
-                '%d.%m.%Y',
-                '%d/%m/%Y',
-                '%Y/%m/%d',
-                '%Y-%m-%d %H:%M:%S',
-                '%Y-%m-%d %H:%M:%S.%f'
-            ]
-            for fmt in formats:
-                try:
-                    birth_date = datetime.strptime(str(self.birth_date), fmt)
-                except:
-                    continue
-            today = datetime.now()
-            age = today.year - birth_date.year
-
-            # Проверяем, был ли уже день рождения в этом году
-            if (today.month, today.day) < (birth_date.month, birth_date.day):
-                age -= 1
-
-            return age
-        except:
+            return parse_date(value)
+        except ValueError as e:
+            print(f"Employee {self.id}: {field_name}: {e}")
             return None
 
-    def get_experience(self):
-        """Получить стаж работы в годах"""
-        if not self.start_year:
-            return 0.0
+    def get_age(self, reference_date: date = None):
+        """
+        Рассчитать возраст
 
-        try:
-            if isinstance(self.start_year, str):
-                start_date = datetime.strptime(str(self.start_year), '%Y-%m-%d')
-            else:
-                start_date = self.start_year
-
-            today = datetime.now()
-            experience = today.year - start_date.year
-
-            # Проверяем, был ли уже день начала работы в этом году
-            if (today.month, today.day) < (start_date.month, start_date.day):
-                experience -= 1
-
-            # Добавляем дробную часть (месяцы/дни)
-            if experience > 0:
-                # Примерная дробная часть
-                if today.month >= start_date.month:
-                    months_diff = today.month - start_date.month
-                else:
-                    months_diff = 12 - start_date.month + today.month
-                experience += months_diff / 12.0
-
-            return max(0.0, experience)
-        except Exception as e:
-            print(f"Error calculating experience: {e}")
+        Args:
+            reference_date: дата, на которую считается возраст (по умолчанию - сегодня)
+        """
+        if not self.birth_day:
+            return None
+
+        reference_date = reference_date or date.today()
+        if self._age_cache is None or self._age_cache[0] != reference_date:
+            self._age_cache = (reference_date, full_years(self.birth_day, reference_date))
+
+        return self._age_cache[1]
+
+    def get_experience(self, reference_date: date = None):
+        """
+        Получить стаж работы в годах
+
+        Args:
+            reference_date: дата, на которую считается стаж (по умолчанию - сегодня)
+        """
+        if not self.start_day:
             return 0.0
 
+        reference_date = reference_date or date.today()
+        if self._experience_cache is None or self._experience_cache[0] != reference_date:
+            self._experience_cache = (reference_date, experience_years(self.start_day, reference_date))
+
+        return self._experience_cache[1]
+
+    @staticmethod
+    def experience_array(employees, reference_date: date = None):
+        """Стаж списка сотрудников одним векторным расчетом (для пакетной нормализации)"""
+        if isinstance(employees, EmployeeFrame):
+            return employees.get_experience(reference_date)
+        return experience_years_array(
+            to_datetime64([employee.start_day for employee in employees]),
+            reference_date or date.today()
+        )
+
+
+def _intern(value):
+    """Интернировать строку (повторяющиеся значения столбца хранятся один раз)"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _object_column(values):
+    """Одномерный object-массив из списка значений"""
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+class EmployeeFrame:
+    """
+    Колоночное хранилище сотрудников
+
+    Столбцы - массивы NumPy с именами атрибутов Employee (frame.id, frame.birth_date, ...),
+    объекты Employee создаются по запросу (frame[i]) и не хранятся. Диагнозы сотрудника i -
+    интернированные id diagnosis_ids[diagnosis_offsets[i]:diagnosis_offsets[i + 1]].
+    """
+
+    # Строковые столбцы (object-массивы интернированных строк)
+    TEXT_COLUMNS = ('lastname', 'firstname', 'patronymic', 'position', 'gender',
+                    'department_name', 'prof_harm_code', 'prof_harm_year')
+    # Даты (datetime64[D], NaT - нет даты)
+    DATE_COLUMNS = ('birth_date', 'start_year')
+    # Числовые столбцы
+    NUMBER_COLUMNS = ('id', 'department_id', 'disability_group', 'health_score')
+
+    def __init__(self, columns: dict, diagnosis_offsets, diagnosis_ids, diagnosis_dictionary: DiagnosisDictionary):
+        self.id = columns['id']
+        for name in self.TEXT_COLUMNS + self.DATE_COLUMNS:
+            setattr(self, name, columns[name])
+        # 0 - нет предприятия / нет инвалидности, NaN - показатель здоровья устарел
+        self.department_id = columns['department_id']
+        self.disability_group = columns['disability_group']
+        self.health_score = columns['health_score']
+
+        self.diagnosis_offsets = diagnosis_offsets
+        self.diagnosis_ids = diagnosis_ids
+        self.diagnosis_dictionary = diagnosis_dictionary
+
+    @classmethod
+    def from_records(cls, records, diagnosis_pairs, diagnosis_dictionary: DiagnosisDictionary):
+        """
+        Собрать хранилище из записей get_all_employees_with_details
+
+        Args:
+            records: словари сотрудников (порядок записей сохраняется)
+            diagnosis_pairs: пары (employee_id, diagnosis_id), упорядоченные по сотруднику
+            diagnosis_dictionary: справочник диагнозов
+        """
+        columns = {'id': np.array([record['id'] for record in records], dtype=np.int64)}
+        for name in cls.TEXT_COLUMNS:
+            columns[name] = _object_column([_intern(record.get(name)) for record in records])
+        for name in cls.DATE_COLUMNS:
+            columns[name] = parse_dates_array([record.get(name) for record in records])
+        columns['department_id'] = np.array([record.get('department_id') or 0 for record in records], dtype=np.int64)
+        columns['disability_group'] = np.array([record.get('disability_group') or 0 for record in records], dtype=np.int8)
+        columns['health_score'] = np.array(
+            [np.nan if record.get('health_score') is None else record['health_score'] for record in records],
+            dtype=np.float64
+        )
+
+        offsets, diagnosis_ids = cls._pack_diagnoses(columns['id'], diagnosis_pairs, diagnosis_dictionary)
+        return cls(columns, offsets, diagnosis_ids, diagnosis_dictionary)
+
+    @staticmethod
+    def _pack_diagnoses(employee_ids, diagnosis_pairs, diagnosis_dictionary: DiagnosisDictionary):
+        """Пары (employee_id, diagnosis_id) -> смещения и id диагнозов в порядке строк хранилища"""
+        num_rows = len(employee_ids)
+        pairs = np.asarray(diagnosis_pairs, dtype=np.int64).reshape(-1, 2)
+
+        # Строка хранилища для каждой пары (пары неизвестных сотрудников и диагнозов отбрасываются)
+        order = np.argsort(employee_ids, kind='stable')
+        sorted_ids = employee_ids[order]
+        if num_rows:
+            positions = np.minimum(np.searchsorted(sorted_ids, pairs[:, 0]), num_rows - 1)
+            valid = sorted_ids[positions] == pairs[:, 0]
+        else:
+            positions = np.zeros(len(pairs), dtype=np.int64)
+            valid = np.zeros(len(pairs), dtype=bool)
+        valid &= diagnosis_dictionary.is_known(pairs[:, 1])
+
+        rows = order[positions[valid]]
+        diagnosis_ids = diagnosis_dictionary.canonical_ids[pairs[valid, 1]]
+
+        # Группировка по строкам с сохранением порядка диагнозов и удаление повторов
+        grouping = np.argsort(rows, kind='stable')
+        rows, diagnosis_ids = rows[grouping], diagnosis_ids[grouping]
+        _, first = np.unique(rows * len(diagnosis_dictionary.known) + diagnosis_ids, return_index=True)
+        first.sort()
+        rows, diagnosis_ids = rows[first], diagnosis_ids[first]
+
+        offsets = np.zeros(num_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_rows), out=offsets[1:])
+        return offsets, diagnosis_ids.astype(np.int32)
+
+    def __len__(self):
+        return len(self.id)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.row(row)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self.take(np.arange(len(self))[item])
+        return self.row(item)
+
+    def take(self, indices):
+        """Хранилище из строк с указанными номерами (в указанном порядке)"""
+        indices = np.asarray(indices, dtype=np.int64)
+        columns = {name: getattr(self, name)[indices]
+                   for name in self.NUMBER_COLUMNS + self.TEXT_COLUMNS + self.DATE_COLUMNS}
+
+        starts = self.diagnosis_offsets[indices]
+        lengths = self.diagnosis_offsets[indices + 1] - starts
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+
+        return EmployeeFrame(columns, offsets, self.diagnosis_ids[positions], self.diagnosis_dictionary)
+
+    @classmethod
+    def concat(cls, frames, diagnosis_dictionary: DiagnosisDictionary = None):
+        """
+        Хранилище из строк нескольких хранилищ (подряд, в указанном порядке)
+
+        Args:
+            frames: хранилища
+            diagnosis_dictionary: справочник результата (None - справочник первого хранилища)
+        """
+        columns = {name: np.concatenate([getattr(frame, name) for frame in frames])
+                   for name in cls.NUMBER_COLUMNS + cls.TEXT_COLUMNS + cls.DATE_COLUMNS}
+
+        lengths = np.concatenate([np.diff(frame.diagnosis_offsets) for frame in frames])
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        diagnosis_ids = np.concatenate([frame.diagnosis_ids for frame in frames]).astype(np.int32)
+
+        return cls(columns, offsets, diagnosis_ids, diagnosis_dictionary or frames[0].diagnosis_dictionary)
+
+    def diagnoses_at(self, row: int) -> dict:
+        """Диагнозы сотрудника в строке row по категориям: {категория: [названия]}"""
+        start, end = self.diagnosis_offsets[row], self.diagnosis_offsets[row + 1]
+        return self.diagnosis_dictionary.group(self.diagnosis_ids[start:end])
+
+    @staticmethod
+    def _date_value(value):
+        """datetime64 -> (date, строка ISO) или (None, None) для NaT"""
+        if np.isnat(value):
+            return None, None
+        day = value.astype(object)
+        return day, day.isoformat()
+
+    def row(self, row: int) -> Employee:
+        """Создать объект Employee для строки row"""
+        row = range(len(self))[row]
+        birth_day, birth_date = self._date_value(self.birth_date[row])
+        start_day, start_year = self._date_value(self.start_year[row])
+        health_score = self.health_score[row]
+
+        lastname, firstname, patronymic = self.lastname[row], self.firstname[row], self.patronymic[row]
+        full_name_parts = [lastname] + [part for part in (firstname, patronymic) if part]
+
+        return Employee({
+            'id': int(self.id[row]),
+            'full_name': ' '.join(full_name_parts),
+            'lastname': lastname,
+            'firstname': firstname,
+            'patronymic': patronymic,
+            'position': self.position[row],
+            'gender': self.gender[row],
+            'birth_date': birth_date,
+            'start_year': start_year,
+            'birth_day': birth_day,
+            'start_day': start_day,
+            'department_id': int(self.department_id[row]) or None,
+            'department_name': self.department_name[row],
+            'prof_harm_code': self.prof_harm_code[row],
+            'prof_harm_year': self.prof_harm_year[row],
+            'disability_group': int(self.disability_group[row]) or None,
+            'health_score': None if np.isnan(health_score) else float(health_score),
+            'diagnosis_ids': self.diagnosis_ids[self.diagnosis_offsets[row]:self.diagnosis_offsets[row + 1]],
+            'diagnosis_dictionary': self.diagnosis_dictionary
+        })
+
+    def get_ages(self, reference_date: date = None):
+        """Возраст всех сотрудников (NaN - неизвестная дата рождения)"""
+        return ages_array(self.birth_date, reference_date or date.today())
+
+    def get_experience(self, reference_date: date = None):
+        """Стаж всех сотрудников в годах"""
+        return experience_years_array(self.start_year, reference_date or date.today())
+
+    def health_inputs(self, model):
+        """Входные массивы HealthModel.calculate без создания объектов Employee"""
+        counts = np.zeros((len(self), model.num_columns), dtype=np.int64)
+        rows = np.repeat(np.arange(len(self)), np.diff(self.diagnosis_offsets))
+        columns = self.diagnosis_dictionary.count_columns(self.diagnosis_ids, model)
+        known = columns >= 0
+        rows, columns = rows[known], columns[known]
+        np.add.at(counts, (rows, columns), 1)
+
+        # Порядок суммирования - порядок появления категорий в диагнозах сотрудника
+        _, first = np.unique(rows * model.num_columns + columns, return_index=True)
+        first.sort()
+        category_order = model.order_from_positions(rows[first], columns[first], len(self))
+
+        ages = self.get_ages() if model.uses_age else None
+        experience = self.get_experience() if model.uses_experience else None
+        return counts, self.disability_group.astype(np.int64), self.prof_harm_code, ages, experience, category_order
+
+
+class EmployeeList:
+    """
+    Список работников, упорядоченный по (фамилия, id), с построчными изменениями
+
+    Пока список не менялся, строки - строки исходного EmployeeFrame. При первом
+    изменении строятся ссылки на строки: номер строки в последовательности
+    хранилищ - исходного и небольших хранилищ добавленных и измененных работников
+    (наложение поверх исходного). Изменение работника - вставка или удаление одной
+    ссылки, без копирования столбцов. Хранилище всех строк (frame) собирается
+    заново только при обращении после изменений (поиск, пересчет показателей).
+    """
+
+    def __init__(self, frame: EmployeeFrame):
+        self._frame = frame
+        self._diagnosis_dictionary = frame.diagnosis_dictionary
+        # Ссылки на строки и ключи (фамилия, id) по строкам - строятся при первом изменении
+        self._refs = None
+        self._keys = None
+        self._key_by_id = None
+        # Хранилища, на строки которых ссылается список, и номер первой строки каждого
+        self._sources = [frame]
+        self._starts = [0]
+
+    def __len__(self):
+        return len(self._refs) if self._refs is not None else len(self._frame)
+
+    def __getitem__(self, row: int) -> Employee:
+        if self._refs is None:
+            return self._frame[row]
+        ref = self._refs[row]
+        source = bisect.bisect_right(self._starts, ref) - 1
+        return self._sources[source][ref - self._starts[source]]
+
+    def _build_refs(self):
+        """Ссылки на строки исходного хранилища и ключи порядка"""
+        if self._refs is None:
+            frame = self._sources[0]
+            self._refs = list(range(len(frame)))
+            self._keys = list(zip(frame.lastname.tolist(), frame.id.tolist()))
+            self._key_by_id = {key[1]: key for key in self._keys}
+
+    @property
+    def frame(self) -> EmployeeFrame:
+        """Хранилище строк списка (после изменений собирается из исходного и измененных хранилищ)"""
+        if self._frame is None:
+            self._frame = EmployeeFrame.concat(self._sources, self._diagnosis_dictionary).take(self._refs)
+            # Дальнейшие изменения накладываются на собранное хранилище
+            self._sources = [self._frame]
+            self._starts = [0]
+            self._refs = list(range(len(self._frame)))
+        return self._frame
+
+    def find_row(self, employee_id: int) -> int:
+        """Строка работника employee_id (-1 - работника нет в списке)"""
+        self._build_refs()
+        key = self._key_by_id.get(employee_id)
+        return -1 if key is None else bisect.bisect_left(self._keys, key)
+
+    def sorted_row(self, lastname: str, employee_id: int, moving_row: int = -1) -> int:
+        """
+        Строка, на которую встает работник по (фамилия, id)
+
+        Args:
+            moving_row: текущая строка перемещаемого работника (результат - строка после ее удаления)
+        """
+        self._build_refs()
+        row = bisect.bisect_left(self._keys, (lastname, employee_id))
+        return row - 1 if 0 <= moving_row < row else row
+
+    def remove_row(self, row: int):
+        """Удалить строку row"""
+        self._build_refs()
+        del self._refs[row]
+        del self._key_by_id[self._keys.pop(row)[1]]
+        self._frame = None
+
+    def insert_row(self, row: int, frame: EmployeeFrame, source_row: int):
+        """Вставить перед строкой row работника из строки source_row хранилища frame"""
+        self._build_refs()
+        if self._sources[-1] is not frame:
+            self._starts.append(self._starts[-1] + len(self._sources[-1]))
+            self._sources.append(frame)
+        key = (frame.lastname[source_row], int(frame.id[source_row]))
+        self._refs.insert(row, self._starts[-1] + source_row)
+        self._keys.insert(row, key)
+        self._key_by_id[key[1]] = key
+        self._diagnosis_dictionary = frame.diagnosis_dictionary
+        self._frame = None
+
+    def apply_change(self, change, changed: EmployeeFrame):
+        """
+        Применить изменение работников ко всему списку
+
+        Args:
+            change: EmployeeChange
+            changed: хранилище добавленных и измененных работников (EmployeeManager.get_employees_frame)
+        """
+        for employee_id in change.deleted + change.updated:
+            row = self.find_row(employee_id)
+            if row >= 0:
+                self.remove_row(row)
+        for index, employee_id in enumerate(changed.id.tolist()):
+            self.insert_row(self.sorted_row(changed.lastname[index], employee_id), changed, index)
+
+
+class EmployeeChange:
+    """Изменение работников, записанное через EmployeeManager: id добавленных, измененных и удаленных"""
+
+    __slots__ = ('inserted', 'updated', 'deleted')
+
+    def __init__(self, inserted=(), updated=(), deleted=()):
+        self.inserted = tuple(int(employee_id) for employee_id in inserted)
+        self.updated = tuple(int(employee_id) for employee_id in updated)
+        self.deleted = tuple(int(employee_id) for employee_id in deleted)
+
+    def __bool__(self):
+        return bool(self.inserted or self.updated or self.deleted)
+
+    def __len__(self):
+        return len(self.inserted) + len(self.updated) + len(self.deleted)
+
+    def __repr__(self):
+        return f"EmployeeChange(inserted={self.inserted}, updated={self.updated}, deleted={self.deleted})"
+
 
 class EmployeeManager:
     """Менеджер работников (работает с БД)"""
 
     def __init__(self, db_path: str = "database/risk_assesment.db"):
         self.db = DatabaseManager(db_path)
-
-    def get_all_employees(self) -> list:
-        """Получить всех работников"""
-        employees_data = self.db.get_all_employees_with_details()
-        return [Employee(emp_data) for emp_data in employees_data]
+        # Подписчики на изменения работников через этот менеджер
+        self._listeners = []
+
+    def subscribe(self, listener):
+        """
+        Подписаться на изменения работников
+
+        Args:
+            listener: функция (EmployeeChange), вызываемая после каждой успешной записи
+                      работников через этот менеджер
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """Отписаться от изменений работников"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, inserted=(), updated=(), deleted=()):
+        """Сообщить подписчикам об изменении работников"""
+        change = EmployeeChange(inserted, updated, deleted)
+        if change:
+            for listener in list(self._listeners):
+                listener(change)
+
+    def get_all_employees(self) -> EmployeeFrame:
+        """
+        Получить всех работников (колоночное хранилище, объекты Employee создаются по запросу)
+
+        Хранилище строится один раз для снимка БД (DatabaseManager.cached) и общее для
+        всех вызовов, пока данные в БД не изменились
+        """
+        return self.db.cached('employee_frame', self._load_all_employees)
+
+    def _load_all_employees(self) -> EmployeeFrame:
+        diagnosis_pairs = self.db.get_employee_diagnosis_ids()
+
+        diagnosis_dictionary = self.db.diagnosis_dictionary
+        if diagnosis_pairs and not diagnosis_dictionary.is_known([pair[1] for pair in diagnosis_pairs]).all():
+            # Диагнозы, добавленные в БД в обход этого процесса
+            diagnosis_dictionary = DiagnosisDictionary.load(self.db)
+
+        return EmployeeFrame.from_records(
+            self.db.get_all_employees_with_details(include_diagnoses=False),
+            diagnosis_pairs,
+            diagnosis_dictionary
+        )
+
+    def get_employees_frame(self, employee_ids) -> EmployeeFrame:
+        """
+        Хранилище отдельных работников (в порядке фамилий) - для обновления уже
+        загруженного списка после изменения, без загрузки всех работников
+        """
+        records, diagnosis_pairs = self.db.get_employee_details_by_ids(employee_ids)
+
+        diagnosis_dictionary = self.db.diagnosis_dictionary
+        if diagnosis_pairs and not diagnosis_dictionary.is_known([pair[1] for pair in diagnosis_pairs]).all():
+            # Диагнозы, добавленные в БД в обход этого процесса
+            diagnosis_dictionary = DiagnosisDictionary.load(self.db)
+
+        return EmployeeFrame.from_records(records, diagnosis_pairs, diagnosis_dictionary)
+
+    def iter_employees(self, batch_size: int = 1000):
+        """
+        Потоковый обход работников для пакетных расчетов: EmployeeFrame по batch_size
+        работников (пакеты по возрастанию id), память не растет с числом работников
+
+        Каждый пакет готов к расчету (HealthCalculator.get_health_scores, health_inputs),
+        итерация по пакету дает слотовые объекты Employee.
+        """
+        diagnosis_dictionary = self.db.diagnosis_dictionary
+        for records, diagnosis_pairs in self.db.iter_employee_batches(batch_size):
+            if diagnosis_pairs and not diagnosis_dictionary.is_known([pair[1] for pair in diagnosis_pairs]).all():
+                # Диагнозы, добавленные в БД в обход этого процесса
+                diagnosis_dictionary = DiagnosisDictionary.load(self.db)
+
+            yield EmployeeFrame.from_records(records, diagnosis_pairs, diagnosis_dictionary)
+
+    def get_health_model(self):
+        """Модель здоровья активной конфигурации, столбцы матрицы - id категорий в БД"""
+        return HealthCalculator.get_model(self.db.get_diagnosis_categories())
+
+    def get_health_inputs(self, model, dirty_only: bool = False):
+        """
+        Входные массивы пакетного расчета здоровья, собранные SQL-агрегацией
+        (без загрузки текста диагнозов)
+
+        Args:
+            model: HealthModel, в матрицу которой упаковываются количества диагнозов
+            dirty_only: только сотрудники с устаревшим показателем здоровья
+
+        Returns:
+            (employee_ids, counts, disability_groups, prof_harm_codes, ages, experience, category_order);
+            ages и experience равны None, если модель их не использует
+        """
+        factors = self.db.get_health_factors(dirty_only)
+        employee_ids = np.array([row['id'] for row in factors], dtype=np.int64)
+
+        count_rows = self.db.get_diagnosis_counts(dirty_only)
+        counts = model.pack_count_matrix(employee_ids, count_rows)
+        category_order = model.pack_category_order(employee_ids, count_rows)
+        disability_groups = np.array([row['disability_group'] or 0 for row in factors], dtype=np.int64)
+        prof_harm_codes = np.array([row['prof_harm_code'] for row in factors], dtype=object)
+
+        ages = experience = None
+        today = date.today()
+        if model.uses_age:
+            ages = ages_array(to_datetime64([try_parse_date(row['birth_date']) for row in factors]), today)
+        if model.uses_experience:
+            experience = experience_years_array(to_datetime64([try_parse_date(row['start_year']) for row in factors]), today)
+
+        return employee_ids, counts, disability_groups, prof_harm_codes, ages, experience, category_order
 
     def get_employee_by_id(self, employee_id: int) -> Employee:
         """Получить работника по ID"""
@@ -109,10 +605,26 @@ class EmployeeManager:
             return Employee(emp_data)
         return None
 
+    def get_employees_by_ids(self, employee_ids) -> list:
+        """Получить работников по списку ID (одним соединением, без запроса на каждого)"""
+        return [Employee(emp_data) for emp_data in self.db.get_employees_by_ids(employee_ids)]
+
+    def get_employees_page(self, page_size: int = 100, page_token: str = None,
+                           department_id: int = None, position_id: int = None) -> tuple:
+        """
+        Страница работников в порядке (фамилия, id) с необязательным фильтром по
+        предприятию и должности
+
+        Returns:
+            (список Employee, токен следующей страницы или None для последней)
+        """
+        employees_data, next_token = self.db.get_employees_page(page_size, page_token, department_id, position_id)
+        return [Employee(emp_data) for emp_data in employees_data], next_token
+
     def search_employees(self, query: str) -> list:
-        """Поиск работников по ФИО или должности"""
+        """Поиск работников по ФИО или должности (пустой запрос - все работники), список Employee"""
         if not query or not query.strip():
-            return self.get_all_employees()
+            return list(self.get_all_employees())
 
         employees_data = self.db.search_employees(query.strip())
         return [Employee(emp_data) for emp_data in employees_data]
@@ -120,15 +632,87 @@ class EmployeeManager:
     def add_employee(self, **kwargs) -> Employee:
         """Добавить нового работника"""
         employee_id = self.db.add_employee(kwargs)
-        return self.get_employee_by_id(employee_id) if employee_id else None
-
-    def update_employee(self, employee_id: int, **kwargs) -> bool:
-        """Обновить данные работника"""
-        return self.db.update_employee(employee_id, kwargs)
+        if not employee_id:
+            return None
+        self._notify(inserted=[employee_id])
+        return self.get_employee_by_id(employee_id)
+
+    def add_employees_bulk(self, employees_data: list) -> list:
+        """Добавить работников одной транзакцией (импорт), возвращает их id"""
+        employee_ids = self.db.add_employees_bulk(employees_data)
+        if employee_ids:
+            self._notify(inserted=employee_ids)
+        return employee_ids
+
+    def update_employee(self, employee_id: int, **kwargs):
+        """Обновить данные работника: {часть данных: изменена ли} или None при ошибке"""
+        changes = self.db.update_employee(employee_id, kwargs)
+        if changes and any(changes.values()):
+            self._notify(updated=[employee_id])
+        return changes
+
+    def update_employees_bulk(self, updates: list):
+        """Обновить работников одной транзакцией (пары (id, данные)), см. DatabaseManager.update_employees_bulk"""
+        changes = self.db.update_employees_bulk(updates)
+        if changes:
+            self._notify(updated=[employee_id for employee_id, parts in changes.items() if any(parts.values())])
+        return changes
 
     def delete_employee(self, employee_id: int) -> bool:
         """Удалить работника"""
-        return self.db.delete_employee(employee_id)
+        success = self.db.delete_employee(employee_id)
+        if success:
+            self._notify(deleted=[employee_id])
+        return success
+
+    def refresh_health_scores(self) -> int:
+        """Пересчитать одним пакетом все устаревшие показатели здоровья в БД"""
+        model = self.get_health_model()
+
+        # Показатели, посчитанные с другими параметрами модели, тоже устарели
+        stamp = model.config_hash
+        if model.uses_age or model.uses_experience:
+            # Возраст и стаж меняются со временем - значения актуальны в пределах дня
+            stamp = f"{stamp}:{date.today().isoformat()}"
+        # Проверка один раз на снимок БД: повторная загрузка таблицы без изменений в БД
+        # и без смены параметров модели и даты не обращается к employee_health
+        self.db.cached(f'health_stamp:{stamp}', lambda: self.db.invalidate_health_scores(stamp))
+
+        dirty = dict(self.db.get_dirty_health_scores())
+        if not dirty:
+            return 0
+
+        employee_ids, *inputs = self.get_health_inputs(model, dirty_only=True)
+        scores = model.calculate(*inputs)
+
+        return self.db.save_health_scores([
+            (int(employee_id), dirty[employee_id], float(score))
+            for employee_id, score in zip(employee_ids, scores)
+            if employee_id in dirty
+        ], stamp)
+
+    def save_risk_assessments(self, results: dict, config_hash: str, run_id: int = None):
+        """
+        Сохранить результаты пакетного расчета риска (RiskAssessor.assess) как новый запуск
+        (или дописать к запуску run_id)
+
+        Returns:
+            Номер запуска или None при ошибке
+        """
+        return self.db.save_risk_assessments([
+            (employee_id, result['vibration_physical'], result['noise_physical'], result['chemical_physical'],
+             result['experience'], result['vibration_norm'], result['noise_norm'], result['chemical_norm'],
+             result['health_val'], result['value'], result['category'])
+            for employee_id, result in results.items()
+        ], config_hash, run_id)
+
+    def get_risk_history(self, employee_id: int) -> list:
+        """Результаты расчета риска работника, начиная с последнего"""
+        return self.db.get_risk_history(employee_id)
+
+    def get_latest_risk_assessments(self, employee_ids=None) -> dict:
+        """Последний сохраненный результат расчета риска по работникам: {id: строка risk_assessments}"""
+        return self.db.get_latest_risk_assessments(employee_ids)
 
     def get_positions(self) -> list:
         """Получить список должностей"""
@@ -156,4 +740,11 @@ class EmployeeManager:
 
     def delete_department(self, department_id: int) -> bool:
         """Удалить предприятие и всех его сотрудников"""
-        return self.db.delete_department(department_id)
\ No newline at end of file
+        # Сотрудники удаляются каскадно в БД - их id берутся из снимка до удаления
+        employees = self.get_all_employees()
+        employee_ids = employees.id[employees.department_id == department_id].tolist()
+
+        success = self.db.delete_department(department_id)
+        if success:
+            self._notify(deleted=employee_ids)
+        return success
\ No newline at end of file
@@ -300,6 +300,16 @@ df_employee_diagnoses = df_employee_diagnoses.drop_duplicates()
 print(f"Таблица employee_diagnoses: {len(df_employee_diagnoses)} записей")
 print(df_employee_diagnoses.head(10))
 
+# Схема создается миграциями - иначе to_sql создаст таблицы без ключей и индексов
+import sqlite3
+from migrations import apply_migrations, format_report
+
+migration_conn = sqlite3.connect('database/risk_assesment.db')
+try:
+    print(format_report(apply_migrations(migration_conn)))
+finally:
+    migration_conn.close()
+
 from sqlalchemy import create_engine
 engine = create_engine('sqlite:///database/risk_assesment.db')
 
@@ -0,0 +1,151 @@
+"""
+Планы выполнения (EXPLAIN QUERY PLAN) всех запросов DatabaseManager
+
+Методы менеджера вызываются на временной копии БД, выполненные запросы
+перехватываются через set_trace_callback. Запуск:
+    python explain_queries.py [путь к БД]
+"""
+
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+from database import DatabaseManager, DEFAULT_DATABASE_SETTINGS
+
+DB_PATH = 'database/risk_assesment.db'
+
+# Служебные операторы без плана выполнения; '--' - внутренние запросы триггеров и FTS5
+SKIPPED_PREFIXES = ('--', 'BEGIN', 'COMMIT', 'ROLLBACK', 'PRAGMA', 'CREATE', 'ALTER', 'DROP', 'ANALYZE')
+
+
+def scenario(db: DatabaseManager):
+    """Вызовы всех методов DatabaseManager, обращающихся к БД: (название, функция)"""
+    employees = db.get_all_employees_with_details(include_diagnoses=False)
+    employee_id = employees[0]['id'] if employees else 1
+    department_id = employees[0]['department_id'] if employees else 1
+    position_id = db.get_positions()[0]['id'] if db.get_positions() else 1
+    category = db.get_diagnosis_categories()[0]['category'] if db.get_diagnosis_categories() else ''
+
+    new_employee = {
+        'lastname': 'План', 'firstname': 'Запроса', 'patronymic': '', 'birth_date': '1980-01-01',
+        'gender': 'М', 'position_id': position_id, 'department_id': department_id, 'start_year': '2000-01-01',
+        'diagnoses': {category: ['Диагноз для плана']}, 'prof_harm_code': 'Т75.2', 'prof_harm_year': '2010-01-01',
+        'disability_group': 2
+    }
+    # Изменены основная информация, диагнозы и инвалидность
+    changed_employee = {**new_employee, 'lastname': 'Измененный', 'diagnoses': {}, 'disability_group': 3}
+    state = {}
+
+    def add_department_with_employee():
+        state['department_id'] = db.add_department('Предприятие для плана')
+        db.add_employee({**new_employee, 'department_id': state['department_id']})
+
+    return [
+        ('get_all_employees_with_details', lambda: db.get_all_employees_with_details()),
+        ('iter_employee_batches', lambda: list(db.iter_employee_batches(100))),
+        ('get_employees_page', lambda: db.get_employees_page(10, db.get_employees_page(10)[1])),
+        ('get_employees_page(department_id)', lambda: db.get_employees_page(10, department_id=department_id)),
+        ('get_employees_page(position_id)', lambda: db.get_employees_page(10, position_id=position_id)),
+        ('get_employee_by_id', lambda: db.get_employee_by_id(employee_id)),
+        ('get_employees_by_ids', lambda: db.get_employees_by_ids([employee_id])),
+        ('get_employee_details_by_ids', lambda: db.get_employee_details_by_ids([employee_id])),
+        ('search_employees', lambda: db.search_employees('Ив')),
+        ('get_employee_diagnoses', lambda: db.get_employee_diagnoses(employee_id)),
+        ('get_all_diagnoses', db.get_all_diagnoses),
+        ('get_employee_diagnosis_ids', db.get_employee_diagnosis_ids),
+        ('get_diagnosis_counts', lambda: db.get_diagnosis_counts()),
+        ('get_diagnosis_counts(dirty_only)', lambda: db.get_diagnosis_counts(dirty_only=True)),
+        ('get_health_factors', lambda: db.get_health_factors()),
+        ('get_health_factors(dirty_only)', lambda: db.get_health_factors(dirty_only=True)),
+        ('get_dirty_health_scores', db.get_dirty_health_scores),
+        ('invalidate_health_scores', lambda: db.invalidate_health_scores('explain')),
+        ('save_health_scores', lambda: db.save_health_scores([(employee_id, 1, 0.5)], 'explain')),
+        ('save_risk_assessments', lambda: db.save_risk_assessments(
+            [(employee_id, 100.0, 80.0, 0.05, 10.0, 0.1, 0.3, 0.25, 0.5, 0.6, 'Умеренный')], 'explain')),
+        ('get_risk_history', lambda: db.get_risk_history(employee_id)),
+        ('get_latest_risk_assessments', lambda: db.get_latest_risk_assessments()),
+        ('get_latest_risk_assessments(ids)', lambda: db.get_latest_risk_assessments([employee_id])),
+        ('get_risk_run_summary', lambda: db.get_risk_run_summary(1)),
+        ('get_diagnosis_categories', db.get_diagnosis_categories),
+        ('get_positions', db.get_positions),
+        ('get_all_departments', db.get_all_departments),
+        ('get_department_by_id', lambda: db.get_department_by_id(department_id)),
+        ('add_employee', lambda: state.update(employee_id=db.add_employee(new_employee))),
+        ('update_employee', lambda: db.update_employee(state['employee_id'], changed_employee)),
+        ('add_employees_bulk', lambda: state.update(bulk_ids=db.add_employees_bulk([new_employee] * 3))),
+        ('update_employees_bulk', lambda: db.update_employees_bulk([(i, changed_employee) for i in state['bulk_ids']])),
+        ('delete_employee', lambda: db.delete_employee(state['employee_id'])),
+        ('add_department', add_department_with_employee),
+        ('update_department', lambda: db.update_department(state['department_id'], 'Предприятие')),
+        ('delete_department', lambda: db.delete_department(state['department_id'])),
+    ]
+
+
+def _statement_key(sql: str) -> str:
+    """Запрос без литералов - одинаковые запросы с разными параметрами выводятся один раз"""
+    return re.sub(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b", '?', ' '.join(sql.split()))
+
+
+def collect_queries(db_path: str):
+    """Выполнить сценарий и вернуть [(метод, [запросы])]"""
+    DatabaseManager.close_connections()
+    # Без снимка БД - иначе чтения из него не выполняют запросов
+    DatabaseManager.configure({'database': {**DEFAULT_DATABASE_SETTINGS, 'persistent_connections': True,
+                                            'snapshot_cache': False}})
+    db = DatabaseManager(db_path)
+
+    conn = db.get_connection()
+    conn.close()
+    traced = []
+    conn.set_trace_callback(traced.append)
+
+    queries = []
+    for name, call in scenario(db):
+        traced.clear()
+        call()
+
+        statements = {}
+        for sql in traced:
+            if not sql.lstrip().upper().startswith(SKIPPED_PREFIXES):
+                statements.setdefault(_statement_key(sql), sql)
+        queries.append((name, list(statements.values())))
+
+    conn.set_trace_callback(None)
+    return conn, queries
+
+
+def format_plan(conn, sql: str) -> str:
+    """EXPLAIN QUERY PLAN в виде дерева"""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    depth = {0: -1}
+    lines = []
+    for node_id, parent_id, _, detail in rows:
+        depth[node_id] = depth.get(parent_id, -1) + 1
+        lines.append("    " + "  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else DB_PATH
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, os.path.basename(source))
+        shutil.copy(source, db_path)
+
+        conn, queries = collect_queries(db_path)
+        for name, statements in queries:
+            print(f"=== {name}")
+            for sql in statements:
+                print("  " + " ".join(sql.split())[:160])
+                plan = format_plan(conn, sql)
+                if plan:
+                    print(plan)
+            print()
+
+        DatabaseManager.close_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,9 +2,13 @@ import numpy as np
 import skfuzzy as fuzz
 from skfuzzy import control as ctrl
 
+from config_cache import compiled_configs, config_hash
+
 # Фиксированные имена переменных
 INPUT_VARS = ["vibration", "noise", "chemical", "health"]
 OUTPUT_VAR = "risk"
+# Секции конфигурации, из которых строится нечеткая система
+FUZZY_CONFIG_KEYS = ('variables', 'output', 'rules')
 
 
 class FuzzyRiskSystem:
@@ -18,6 +22,7 @@ class FuzzyRiskSystem:
             config: Словарь с конфигурацией или None для использования по умолчанию
         """
         self.config = config
+        self.config_hash = None
         self.input_variables = {}
         self.output_variables = {}
         self.rules = []
@@ -29,9 +34,23 @@ class FuzzyRiskSystem:
         else:
             self.create_default_system()
 
+    @classmethod
+    def from_config(cls, config):
+        """
+        Система для конфигурации из общего кэша: для уже применявшейся
+        конфигурации нечеткая система повторно не строится
+
+        Args:
+            config: Словарь с конфигурацией
+        """
+        # Ключ кэша - только нечеткая часть конфигурации
+        fuzzy_config = {key: config.get(key) for key in FUZZY_CONFIG_KEYS}
+        return compiled_configs.get('fuzzy', fuzzy_config, lambda: cls(config))
+
     def create_system_from_config(self, config):
         """Создание системы из конфигурационного словаря"""
         self.config = config
+        self.config_hash = config_hash({key: config.get(key) for key in FUZZY_CONFIG_KEYS})
 
         # Создание входных переменных
         for var_name in INPUT_VARS:
@@ -1,5 +1,6 @@
 import os
 
+import numpy as np
 from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
@@ -7,13 +8,22 @@ from PyQt6.QtGui import *
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill
 
-from employee_manager import EmployeeManager
+from database import DatabaseManager
+from employee_manager import EmployeeManager, EmployeeFrame, EmployeeList
 from health_calculator import HealthCalculator
 from fuzzy_system import FuzzyRiskSystem
 
 from normalizers import ParameterNormalizer
+from search_index import EmployeeSearchIndex
+from risk_assessment import RiskAssessor
 
 DB_URL = 'database/risk_assesment.db'
+# Пауза в вводе (мс), после которой запускается поиск
+SEARCH_DEBOUNCE_MS = 150
+# Изменения большего числа работников применяются перезагрузкой таблицы, а не построчно
+PATCH_MAX_EMPLOYEES = 500
+# Число объектов Employee строк таблицы, хранимых моделью (отображаемые строки)
+ROW_CACHE_SIZE = 1000
 
 class ConfigInfoDialog(QDialog):
     """Диалог отображения информации о конфигурации"""
@@ -49,7 +59,16 @@ class EmployeeTableModel(QAbstractTableModel):
 
     def __init__(self, employees):
         super().__init__()
+        # Хранилище работников оборачивается в список с построчными изменениями
+        if isinstance(employees, EmployeeFrame):
+            employees = EmployeeList(employees)
         self.employees = employees
+        # Показатели здоровья считаются один раз для всей таблицы, а не при каждой отрисовке ячейки
+        self.health_scores = HealthCalculator.get_health_scores(
+            employees.frame if isinstance(employees, EmployeeList) else employees).tolist()
+        # Объекты Employee строк: data() вызывается для каждой ячейки и роли, а EmployeeFrame
+        # создает объект при каждом обращении
+        self.row_employees = {}
         self.headers = ['№', 'ФИО', 'Должность', 'Предприятие', 'Пол', 'Возраст', 'Дата приема на работу', 'Проф. вредность', 'Год вредности', 'Инвалидность',
                         'Диагнозы', 'Показатель здоровья']
 
@@ -59,11 +78,20 @@ class EmployeeTableModel(QAbstractTableModel):
     def columnCount(self, parent=None):
         return len(self.headers)
 
+    def employee_at(self, row):
+        """Работник строки row (объект создается один раз, пока строка отображается)"""
+        employee = self.row_employees.get(row)
+        if employee is None:
+            if len(self.row_employees) >= ROW_CACHE_SIZE:
+                self.row_employees.clear()
+            employee = self.row_employees[row] = self.employees[row]
+        return employee
+
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
         if not index.isValid():
             return None
 
-        employee = self.employees[index.row()]
+        employee = self.employee_at(index.row())
         col = index.column()
 
         if role == Qt.ItemDataRole.DisplayRole:
@@ -84,19 +112,13 @@ class EmployeeTableModel(QAbstractTableModel):
                 elif col == 6:
                     return employee.start_year if hasattr(employee, 'start_year') and employee.start_year else ""
                 elif col == 11:
-                    score = HealthCalculator.calculate_health_score(employee)
+                    score = self.health_scores[index.row()]
                     #desc = HealthCalculator.get_health_description(score)
                     return f"{score:.2f}"
                     #return f"{score:.2f} ({desc})"
                 elif col == 10:
-                    if hasattr(employee, 'diagnoses') and employee.diagnoses:
-                        all_diagnoses = []
-                        for category, diagnoses in employee.diagnoses.items():
-                            if diagnoses:
-                                all_diagnoses.extend(diagnoses)  # По одному из каждой категории
-                        return ", ".join(all_diagnoses)
-
-                    return ""
+                    # Текст собирается из id справочника только при отображении
+                    return employee.diagnoses_text()
                 elif col == 7:
                     return employee.prof_harm_code if hasattr(employee,
                                                               'prof_harm_code') and employee.prof_harm_code else ""
@@ -135,13 +157,71 @@ class EmployeeTableModel(QAbstractTableModel):
             return self.headers[section]
         return None
 
+    def apply_change(self, change, changed, matches=None):
+        """
+        Применить изменение работников построчно (без сброса модели - выделение и
+        прокрутка таблицы сохраняются)
+
+        Args:
+            change: EmployeeChange
+            changed: EmployeeFrame добавленных и измененных работников (EmployeeManager.get_employees_frame)
+            matches: маска работников changed, попадающих в таблицу (активный поиск);
+                     None - таблица показывает всех работников
+        """
+        changed_scores = HealthCalculator.get_health_scores(changed).tolist()
+        last_column = self.columnCount() - 1
+        # Номера строк сдвигаются
+        self.row_employees.clear()
+
+        for employee_id in change.deleted:
+            row = self.employees.find_row(employee_id)
+            if row >= 0:
+                self.remove_row(row)
+
+        for index, employee_id in enumerate(changed.id.tolist()):
+            row = self.employees.find_row(employee_id)
+            if matches is not None and not matches[index]:
+                # Работник не подходит под активный поиск
+                if row >= 0:
+                    self.remove_row(row)
+                continue
+
+            if row < 0:
+                target = self.employees.sorted_row(changed.lastname[index], employee_id)
+                self.beginInsertRows(QModelIndex(), target, target)
+                self.employees.insert_row(target, changed, index)
+                self.health_scores.insert(target, changed_scores[index])
+                self.endInsertRows()
+                continue
+
+            # Измененный работник встает на место по (фамилия, id) - строка перемещается
+            target = self.employees.sorted_row(changed.lastname[index], employee_id, moving_row=row)
+            moved = target != row and self.beginMoveRows(QModelIndex(), row, row, QModelIndex(),
+                                                         target + 1 if target > row else target)
+            self.employees.remove_row(row)
+            self.employees.insert_row(target, changed, index)
+            del self.health_scores[row]
+            self.health_scores.insert(target, changed_scores[index])
+            if moved:
+                self.endMoveRows()
+            self.dataChanged.emit(self.index(target, 0), self.index(target, last_column))
+
+    def remove_row(self, row):
+        """Удалить строку row из таблицы"""
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.employees.remove_row(row)
+        del self.health_scores[row]
+        self.endRemoveRows()
+
 
 class DiagnosisInputWidget(QWidget):
     """Виджет для ввода диагнозов"""
 
-    def __init__(self, parent=None):
+    def __init__(self, categories, parent=None):
         super().__init__(parent)
         self.diagnosis_widgets = []  # Список виджетов для каждого диагноза
+        # Категории диагнозов (EmployeeManager.get_diagnosis_categories) - общие для всех строк диагнозов
+        self.categories = categories
         self.setup_ui()
 
     def setup_ui(self):
@@ -171,12 +251,7 @@ class DiagnosisInputWidget(QWidget):
         category_combo = QComboBox()
         category_combo.addItem("Выберите категорию...", "")
 
-        # Загружаем категории из БД
-        from employee_manager import EmployeeManager
-        manager = EmployeeManager(DB_URL)
-        categories = manager.get_diagnosis_categories()
-
-        for cat in categories:
+        for cat in self.categories:
             category_combo.addItem(cat['category'], cat['category'])
 
         # Поле для ввода названия диагноза
@@ -256,8 +331,10 @@ class DiagnosisInputWidget(QWidget):
 class AddEditEmployeeDialog(QDialog):
     """Диалог добавления/редактирования работника"""
 
-    def __init__(self, parent=None, employee=None):
+    def __init__(self, manager, parent=None, employee=None):
         super().__init__(parent)
+        # Менеджер главного окна - справочники читаются из его снимка БД
+        self.manager = manager
         self.employee = employee
         self.setup_ui()
 
@@ -294,16 +371,14 @@ class AddEditEmployeeDialog(QDialog):
 
         # Должность
         self.position_combo = QComboBox()
-        from employee_manager import EmployeeManager
-        manager = EmployeeManager(DB_URL)
-        positions = manager.get_positions()
+        positions = self.manager.get_positions()
         for pos in positions:
             self.position_combo.addItem(pos['name'], pos['id'])
         info_layout.addRow("Должность:", self.position_combo)
 
         # Предприятие
         self.department_combo = QComboBox()
-        departments = manager.get_departments()
+        departments = self.manager.get_departments()
         for dept in departments:
             self.department_combo.addItem(dept['name'], dept['id'])
         info_layout.addRow("Предприятие:", self.department_combo)
@@ -329,7 +404,8 @@ class AddEditEmployeeDialog(QDialog):
         content_layout.addWidget(info_group)
 
         # Диагнозы
-        self.diagnosis_widget = DiagnosisInputWidget()
+        # Категории диагнозов читаются один раз и передаются всем строкам диагнозов
+        self.diagnosis_widget = DiagnosisInputWidget(self.manager.get_diagnosis_categories())
         content_layout.addWidget(self.diagnosis_widget)
 
         # Профвредность
@@ -645,10 +721,12 @@ class ParameterInputWidget(QWidget):
 class MultiRiskCalculatorDialog(QDialog):
     """Диалог расчета риска для нескольких сотрудников"""
 
-    def __init__(self, parent=None, employees=None, fuzzy_system=None):
+    def __init__(self, parent=None, employees=None, fuzzy_system=None, employee_manager=None):
         super().__init__(parent)
         self.employees = employees if employees else []
         self.results = {}
+        # Менеджер для сохранения результатов расчета в БД (None - не сохранять)
+        self.employee_manager = employee_manager
 
         if fuzzy_system:
             self.fuzzy_system = fuzzy_system
@@ -751,6 +829,7 @@ class MultiRiskCalculatorDialog(QDialog):
     def load_employees_data(self):
         """Загрузка данных сотрудников в таблицу"""
         self.table_widget.setRowCount(len(self.employees))
+        self.health_scores = HealthCalculator.get_health_scores(self.employees)
 
         for row, employee in enumerate(self.employees):
             # ФИО
@@ -767,7 +846,7 @@ class MultiRiskCalculatorDialog(QDialog):
             self.table_widget.setItem(row, 2, dept_item)
 
             # Показатель здоровья
-            health_score = HealthCalculator.calculate_health_score(employee)
+            health_score = self.health_scores[row]
             health_item = QTableWidgetItem(f"{health_score:.4f}")
             health_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
             self.table_widget.setItem(row, 3, health_item)
@@ -811,100 +890,81 @@ class MultiRiskCalculatorDialog(QDialog):
             progress.setMinimumDuration(500)
             progress.setValue(0)
 
-            cancelled = False
-
-            # Рассчитываем риск для каждого сотрудника
-            for row, employee in enumerate(self.employees):
-                if progress.wasCanceled():
-                    cancelled = True
-                    break
-
-                progress.setValue(row + 1)
-                progress.setLabelText(f"Расчет для: {employee.full_name}")
-
-                experience = employee.get_experience()
-
-                # Нормализуем параметры с учетом стажа сотрудника
-                vibration_norm = ParameterNormalizer.normalize_vibration(
-                    vibration_physical, experience
-                )
-                noise_norm = ParameterNormalizer.normalize_noise(
-                    noise_physical, experience
-                )
-                chemical_norm = ParameterNormalizer.normalize_chemical(
-                    chemical_physical
-                )
-
-                # Получаем показатель здоровья
-                health_val = HealthCalculator.calculate_health_score(employee)
-
-                # Валидация
-                vibration_norm = max(0.0, min(1.0, vibration_norm))
-                noise_norm = max(0.0, min(1.0, noise_norm))
-                chemical_norm = max(0.0, min(1.0, chemical_norm))
-
-                # Рассчитываем риск через нечеткую систему
-                result = self.fuzzy_system.calculate_risk(
-                    vibration_norm, noise_norm, chemical_norm, health_val
-                )
-
-                if result['success']:
-                    # Сохраняем результат
-                    self.results[employee.id] = {
-                        **result,
-                        'vibration_physical': vibration_physical,
-                        'noise_physical': noise_physical,
-                        'chemical_physical': chemical_physical,
-                        'vibration_norm': vibration_norm,
-                        'noise_norm': noise_norm,
-                        'chemical_norm': chemical_norm,
-                        'health_val': health_val,
-                        'experience': experience
-                    }
-
-                    # Обновляем таблицу - уровень риска
-                    risk_item = QTableWidgetItem(f"{result['value']:.4f}")
-                    risk_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                    self.table_widget.setItem(row, 4, risk_item)
-
-                    # Категория риска
-                    category_item = QTableWidgetItem(result['category'])
-                    category_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                    self.table_widget.setItem(row, 5, category_item)
-
-                    # Нормализованная вибрация
-                    vib_norm_item = QTableWidgetItem(f"{vibration_norm:.8f}")
-                    vib_norm_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                    self.table_widget.setItem(row, 6, vib_norm_item)
-
-                    # Нормализованный шум
-                    noise_norm_item = QTableWidgetItem(f"{noise_norm:.8f}")
-                    noise_norm_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                    self.table_widget.setItem(row, 7, noise_norm_item)
-
-                    # Нормализованный Хим. фактор
-                    chem_norm_item = QTableWidgetItem(f"{chemical_norm:.4f}")
-                    chem_norm_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                    self.table_widget.setItem(row, 8, chem_norm_item)
-
+            # Нечеткий вывод выполняется по различным наборам входов, а не по сотрудникам
+            def report_progress(done, total):
+                progress.setMaximum(total)
+                progress.setValue(done + 1)
+                progress.setLabelText(f"Расчет риска: набор входных данных {done + 1} из {total}")
                 QApplication.processEvents()
-
+                return not progress.wasCanceled()
+
+            # Сохраненные результаты с теми же входами и конфигурацией не пересчитываются
+            previous = None
+            if self.employee_manager:
+                previous = self.employee_manager.get_latest_risk_assessments(
+                    [employee.id for employee in self.employees])
+
+            assessor = RiskAssessor(self.fuzzy_system)
+            self.results = assessor.assess(self.employees, vibration_physical, noise_physical, chemical_physical,
+                                           self.health_scores, report_progress, previous)
+            cancelled = progress.wasCanceled()
             progress.close()
 
+            for row, employee in enumerate(self.employees):
+                if employee.id in self.results:
+                    self.show_result(row, self.results[employee.id])
+
             if cancelled:
                 QMessageBox.information(self, "Расчет прерван", "Расчет риска был отменен пользователем")
             else:
                 self.calculate_all_btn.setStyleSheet("background-color: #45a049; color: white; font-weight: bold;")
 
                 if self.results:
-                    QMessageBox.information(self, "Расчет завершен",
-                                            f"Рассчитано сотрудников: {len(self.results)}")
+                    message = f"Рассчитано сотрудников: {len(self.results)}"
+                    if assessor.stats['unique_inputs']:
+                        message += (f"\nРазличных наборов входных данных: {assessor.stats['unique_inputs']} "
+                                    f"(в {assessor.stats['dedup_ratio']:.1f} раза меньше расчетов)")
+                    if assessor.stats['reused']:
+                        message += f"\nБез пересчета (данные не изменились): {assessor.stats['reused']}"
+                    # Результаты полного расчета сохраняются как запуск в БД
+                    if self.employee_manager:
+                        run_id = self.employee_manager.save_risk_assessments(self.results, assessor.config_hash)
+                        if run_id is not None:
+                            message += f"\nРезультаты сохранены (запуск №{run_id})"
+                    QMessageBox.information(self, "Расчет завершен", message)
 
         except Exception as e:
             progress.close() if 'progress' in locals() else None
             QMessageBox.critical(self, "Ошибка расчета",
                                  f"Произошла ошибка при расчете: {str(e)}")
 
+    def show_result(self, row, result):
+        """Показать результат расчета в строке таблицы"""
+        # Уровень риска
+        risk_item = QTableWidgetItem(f"{result['value']:.4f}")
+        risk_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.table_widget.setItem(row, 4, risk_item)
+
+        # Категория риска
+        category_item = QTableWidgetItem(result['category'])
+        category_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.table_widget.setItem(row, 5, category_item)
+
+        # Нормализованная вибрация
+        vib_norm_item = QTableWidgetItem(f"{result['vibration_norm']:.8f}")
+        vib_norm_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.table_widget.setItem(row, 6, vib_norm_item)
+
+        # Нормализованный шум
+        noise_norm_item = QTableWidgetItem(f"{result['noise_norm']:.8f}")
+        noise_norm_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.table_widget.setItem(row, 7, noise_norm_item)
+
+        # Нормализованный Хим. фактор
+        chem_norm_item = QTableWidgetItem(f"{result['chemical_norm']:.4f}")
+        chem_norm_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.table_widget.setItem(row, 8, chem_norm_item)
+
     def export_results(self):
         """Экспорт результатов в Excel"""
         if not self.results:
@@ -974,8 +1034,13 @@ class MainWindow(QMainWindow):
             self.fuzzy_system = None
 
         self.current_config_file = None
+        # Все сотрудники из БД и индекс поиска по ним (строится при первом поиске)
+        self.all_employees = []
+        self.search_index = None
         self.setup_ui()
         self.load_employees()
+        # Добавление, изменение и удаление работников применяются к таблице построчно
+        self.employee_manager.subscribe(self.on_employees_changed)
 
     def setup_ui(self):
         self.setWindowTitle("Система оценки рисков здоровья работников")
@@ -990,25 +1055,30 @@ class MainWindow(QMainWindow):
 
         self.create_menu_bar()
 
-        # Панель поиска с тремя полями
+        # Панель поиска с тремя полями: поиск запускается после паузы в вводе
         search_layout = QHBoxLayout()
 
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.search_employees)
+
         # Поле поиска по ФИО
         self.search_name_edit = QLineEdit()
         self.search_name_edit.setPlaceholderText("Поиск по фамилии, имени, отчеству...")
-        self.search_name_edit.textChanged.connect(self.search_employees)
+        self.search_name_edit.textChanged.connect(self.search_timer.start)
         search_layout.addWidget(self.search_name_edit)
 
         # Поле поиска по должности
         self.search_position_edit = QLineEdit()
         self.search_position_edit.setPlaceholderText("Поиск по должности...")
-        self.search_position_edit.textChanged.connect(self.search_employees)
+        self.search_position_edit.textChanged.connect(self.search_timer.start)
         search_layout.addWidget(self.search_position_edit)
 
         # Поле поиска по предприятию
         self.search_department_edit = QLineEdit()
         self.search_department_edit.setPlaceholderText("Поиск по номеру предприятия...")
-        self.search_department_edit.textChanged.connect(self.search_employees)
+        self.search_department_edit.textChanged.connect(self.search_timer.start)
         search_layout.addWidget(self.search_department_edit)
 
         # Кнопка сброса поиска
@@ -1103,7 +1173,13 @@ class MainWindow(QMainWindow):
                 try:
                     # Создаем новую систему
                     from fuzzy_system import FuzzyRiskSystem
-                    self.fuzzy_system = FuzzyRiskSystem(new_config)
+                    self.fuzzy_system = FuzzyRiskSystem.from_config(new_config)
+
+                    # Параметры модели здоровья - показатели пересчитаются при загрузке
+                    HealthCalculator.configure(new_config)
+                    # Параметры соединений - соединения откроются заново при следующем запросе
+                    DatabaseManager.configure(new_config)
+                    self.load_employees()
 
                     self.status_bar.showMessage("Конфигурация обновлена", 3000)
 
@@ -1244,7 +1320,10 @@ class MainWindow(QMainWindow):
         """Загрузка работников в таблицу"""
         try:
             if employees is None:
-                employees = self.employee_manager.get_all_employees()
+                self.employee_manager.refresh_health_scores()
+                # Все работники - список с построчными изменениями, общий для таблицы и поиска
+                employees = self.all_employees = EmployeeList(self.employee_manager.get_all_employees())
+                self.search_index = None
 
             if employees:
                 self.model = EmployeeTableModel(employees)
@@ -1270,75 +1349,84 @@ class MainWindow(QMainWindow):
                 self.status_bar.showMessage(f"Загружено сотрудников: {len(employees)}", 3000)
             else:
                 # Если нет сотрудников, показываем пустую модель
-                self.model = EmployeeTableModel([])
+                self.model = EmployeeTableModel(employees)
                 self.table_view.setModel(self.model)
                 self.status_bar.showMessage("Нет данных о сотрудниках", 3000)
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить сотрудников: {str(e)}")
 
+    def on_employees_changed(self, change):
+        """Обновить таблицу по изменению работников: только затронутые строки, без перезагрузки списка"""
+        model = getattr(self, 'model', None)
+        if (model is not None and isinstance(model.employees, EmployeeList)
+                and isinstance(self.all_employees, EmployeeList) and len(change) <= PATCH_MAX_EMPLOYEES):
+            try:
+                # Устаревший показатель здоровья измененных работников считается в модели, без записи в БД
+                changed = self.employee_manager.get_employees_frame(change.inserted + change.updated)
+
+                if model.employees is self.all_employees:
+                    # Таблица показывает весь список - он изменяется вместе с моделью
+                    model.apply_change(change, changed)
+                else:
+                    # Результат поиска: в таблице остаются и появляются только подходящие под поиск
+                    matches = np.zeros(len(changed), dtype=bool)
+                    matches[EmployeeSearchIndex(changed).search(**self.search_queries())] = True
+                    model.apply_change(change, changed, matches)
+                    self.all_employees.apply_change(change, changed)
+                self.search_index = None
+                return
+
+            except Exception as e:
+                print(f"Error applying employee changes: {e}")
+
+        # Перезагрузка всего списка с повтором активного поиска
+        self.load_employees()
+        if any(self.search_queries().values()):
+            self.search_employees()
+
     def open_departments_window(self):
         """Открыть окно управления предприятиями"""
         from department_manager import DepartmentsWindow
         self.departments_window = DepartmentsWindow(self)
         self.departments_window.show()
 
+    def search_queries(self) -> dict:
+        """Запросы полей поиска (EmployeeSearchIndex.search)"""
+        return {
+            'name': self.search_name_edit.text().strip(),
+            'position': self.search_position_edit.text().strip(),
+            'department': self.search_department_edit.text().strip(),
+        }
+
     def search_employees(self):
-        """Поиск работников по трем критериям"""
-        # Получаем значения из полей поиска
-        name_query = self.search_name_edit.text().strip()
-        position_query = self.search_position_edit.text().strip()
-        department_query = self.search_department_edit.text().strip()
+        """Поиск работников по трем критериям (по индексу в памяти, без запросов к БД)"""
+        queries = self.search_queries()
 
         # Если все поля пустые, показываем всех сотрудников
-        if not name_query and not position_query and not department_query:
-            self.load_employees()
+        if not any(queries.values()):
+            self.load_employees(self.all_employees)
             return
 
         try:
-            # Получаем всех сотрудников
-            all_employees = self.employee_manager.get_all_employees()
-            filtered_employees = []
-
-            for employee in all_employees:
-                match = True
-
-                # Поиск по ФИО
-                if name_query:
-                    name_match = False
-                    # Поиск в фамилии
-                    if employee.lastname and name_query.lower() in employee.lastname.lower():
-                        name_match = True
-                    # Поиск в имени
-                    if employee.firstname and name_query.lower() in employee.firstname.lower():
-                        name_match = True
-                    # Поиск в отчестве
-                    if employee.patronymic and name_query.lower() in employee.patronymic.lower():
-                        name_match = True
-
-                    if not name_match:
-                        match = False
-
-                # Поиск по должности
-                if match and position_query:
-                    if not (employee.position and position_query.lower() in employee.position.lower()):
-                        match = False
-
-                # Поиск по предприятию
-                if match and department_query:
-                    if not (employee.department_name and
-                            department_query.lower() in employee.department_name.lower()):
-                        match = False
-
-                if match:
-                    filtered_employees.append(employee)
+            # Хранилище всех работников (после построчных изменений собирается заново)
+            all_employees = getattr(self.all_employees, 'frame', self.all_employees)
+
+            # Индекс строится один раз для загруженных из БД сотрудников
+            if self.search_index is None:
+                self.search_index = EmployeeSearchIndex(all_employees)
+
+            rows = self.search_index.search(**queries)
+            if hasattr(all_employees, 'take'):
+                filtered_employees = all_employees.take(rows)
+            else:
+                filtered_employees = [all_employees[row] for row in rows]
 
             # Загружаем отфильтрованных сотрудников
-            if filtered_employees:
-                self.load_employees(filtered_employees)
+            self.load_employees(filtered_employees)
+            if len(filtered_employees):
                 self.status_bar.showMessage(f"Найдено сотрудников: {len(filtered_employees)}", 3000)
             else:
-                self.load_employees([])  # Показываем пустую таблицу
                 self.status_bar.showMessage("Сотрудники не найдены", 3000)
 
         except Exception as e:
@@ -1350,18 +1438,18 @@ class MainWindow(QMainWindow):
         self.search_name_edit.clear()
         self.search_position_edit.clear()
         self.search_department_edit.clear()
+        self.search_timer.stop()
         self.load_employees()  # Загружаем всех сотрудников
 
     def add_employee(self):
         """Добавление нового работника"""
-        dialog = AddEditEmployeeDialog(self)
+        dialog = AddEditEmployeeDialog(self.employee_manager, self)
         if dialog.exec():
             data = dialog.get_employee_data()
             if data:
                 try:
                     employee = self.employee_manager.add_employee(**data)
                     if employee:
-                        self.load_employees()
                         self.status_bar.showMessage(f"Добавлен сотрудник: {employee.full_name}", 3000)
                     else:
                         QMessageBox.warning(self, "Ошибка", "Не удалось добавить сотрудника")
@@ -1381,13 +1469,14 @@ class MainWindow(QMainWindow):
             employee = self.employee_manager.get_employee_by_id(employee_id)
 
             if employee:
-                dialog = AddEditEmployeeDialog(self, employee)
+                dialog = AddEditEmployeeDialog(self.employee_manager, self, employee)
                 if dialog.exec():
                     data = dialog.get_employee_data()
                     if data:
-                        success = self.employee_manager.update_employee(employee_id, **data)
-                        if success:
-                            self.load_employees()
+                        changes = self.employee_manager.update_employee(employee_id, **data)
+                        if changes is not None and not any(changes.values()):
+                            self.status_bar.showMessage("Данные не изменились", 3000)
+                        elif changes:
                             self.status_bar.showMessage("Данные обновлены", 3000)
                         else:
                             QMessageBox.warning(self, "Ошибка", "Не удалось обновить данные")
@@ -1419,7 +1508,6 @@ class MainWindow(QMainWindow):
             if reply == QMessageBox.StandardButton.Yes:
                 success = self.employee_manager.delete_employee(employee_id)
                 if success:
-                    self.load_employees()
                     self.status_bar.showMessage(f"Сотрудник {employee_name} удален", 3000)
                 else:
                     QMessageBox.warning(self, "Ошибка", "Не удалось удалить сотрудника")
@@ -1447,16 +1535,11 @@ class MainWindow(QMainWindow):
 
         try:
             # Собираем выбранных сотрудников
-            selected_employees = []
-            for index in selected_rows:
-                row = index.row()
-                employee_id = self.model.employees[row].id
-                employee = self.employee_manager.get_employee_by_id(employee_id)
-                if employee:
-                    selected_employees.append(employee)
+            employee_ids = [self.model.employees[index.row()].id for index in selected_rows]
+            selected_employees = self.employee_manager.get_employees_by_ids(employee_ids)
 
             if selected_employees and self.fuzzy_system:
-                dialog = MultiRiskCalculatorDialog(self, selected_employees, self.fuzzy_system)
+                dialog = MultiRiskCalculatorDialog(self, selected_employees, self.fuzzy_system, self.employee_manager)
                 dialog.exec()
             elif not self.fuzzy_system:
                 QMessageBox.warning(self, "Ошибка", "Система нечеткой логики не доступна")
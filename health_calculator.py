@@ -1,90 +1,383 @@
-class HealthCalculator:
-    """Калькулятор показателя дефицита здоровья (0 - отлично, 1 - максимальный дефицит)"""
+import numpy as np
+
+from app_config import load_config
+from config_cache import compiled_configs, config_hash
+
+# Параметры модели здоровья по умолчанию (если в конфигурации нет секции health_model)
+DEFAULT_HEALTH_MODEL = {
+    "category_weights": {
+        "Сердечно-сосудистые": 0.131,
+        "Опорно-двигательный аппарат": 0.230,
+        "Органы зрения": 0.184,
+        "Желудочно-кишечные": 0.141,
+        "ЛОР-органы": 0.065,
+        "Дыхательная система": 0.194,
+        "Мочевыделительная система": 0.088,
+        "Эндокринные": 0.086,
+        "Прочие": 0.025
+    },
+    # Первый диагноз дает 50% от максимального вклада категории
+    "base_diagnosis_contribution": 0.5,
+    "disability_contributions": {"1": 0.35, "2": 0.25, "3": 0.15},
+    # Для неизвестных кодов профвредности используется значение по умолчанию
+    "prof_harm_contributions": {"Т75.2": 0.15},
+    "default_prof_harm_contribution": 0.15,
+    # Возраст и стаж: линейный рост вклада от start до end лет, не более max_contribution
+    "age": {"enabled": False, "start": 40, "end": 70, "max_contribution": 0.25},
+    "experience": {"enabled": False, "start": 10, "end": 40, "max_contribution": 0.20}
+}
+
+
+class HealthModel:
+    """Модель показателя здоровья, скомпилированная из конфигурации в таблицы NumPy"""
+
+    def __init__(self, params=None, categories=None):
+        """
+        Args:
+            params: секция health_model конфигурации
+            categories: записи diagnosis_categories ({'id', 'category'}); без них
+                        категориям назначаются id 1..N в порядке конфигурации
+        """
+        self.params = params or DEFAULT_HEALTH_MODEL
+        self.config_hash = config_hash(self.params)
+
+        weights = self.params.get('category_weights', {})
+        if categories is None:
+            categories = [{'id': i, 'category': name} for i, name in enumerate(weights, 1)]
+        self.category_ids = {cat['category']: cat['id'] for cat in categories}
+
+        # Вес категории по ее id (0 - категория не учитывается)
+        self.category_weights = np.zeros(max(self.category_ids.values(), default=0) + 1)
+        for category, category_id in self.category_ids.items():
+            self.category_weights[category_id] = weights.get(category, 0.0)
+        # Порядок суммирования категорий по умолчанию - порядок конфигурации
+        self.config_order = np.array([self.category_ids[category] for category in weights
+                                      if category in self.category_ids], dtype=np.int64)
+
+        self.base_contribution = float(self.params.get('base_diagnosis_contribution', 0.5))
+
+        # Вклад инвалидности по номеру группы (0 - нет инвалидности)
+        disability = {int(group): float(value)
+                      for group, value in self.params.get('disability_contributions', {}).items()}
+        self.disability_table = np.zeros(max(disability, default=0) + 1)
+        for group, contribution in disability.items():
+            self.disability_table[group] = contribution
 
-    CATEGORY_WEIGHTS = {
-        'Сердечно-сосудистые': 0.131,
-        'Опорно-двигательный аппарат': 0.230,
-        'Органы зрения': 0.184,
-        'Желудочно-кишечные': 0.141,
-        'ЛОР-органы': 0.065,
-        'Дыхательная система': 0.194,
-        'Мочевыделительная система': 0.088,
-        'Эндокринные': 0.086,
-        'Прочие': 0.025
-    }
-
-    # Базовый вклад первого диагноза в категории (от 0 до 1)
-    BASE_DIAGNOSIS_CONTRIBUTION = 0.5  # Первый диагноз дает 50% от максимального вклада категории
+        self.prof_harm_contributions = {str(code): float(value)
+                                        for code, value in self.params.get('prof_harm_contributions', {}).items()}
+        self.default_prof_harm_contribution = float(self.params.get('default_prof_harm_contribution', 0.0))
+
+        self.age_term = self.params.get('age', {})
+        self.experience_term = self.params.get('experience', {})
+
+    @property
+    def num_columns(self):
+        """Число столбцов матрицы количества диагнозов (индекс столбца - id категории)"""
+        return len(self.category_weights)
+
+    @property
+    def uses_age(self):
+        return bool(self.age_term.get('enabled'))
+
+    @property
+    def uses_experience(self):
+        return bool(self.experience_term.get('enabled'))
+
+    def build_count_matrix(self, employees):
+        """
+        Строит матрицу (сотрудники × id категорий) с количеством диагнозов
+
+        Категории, неизвестные модели, игнорируются
+        """
+        counts = np.zeros((len(employees), self.num_columns), dtype=np.int64)
+        for row, employee in enumerate(employees):
+            # id диагнозов общего справочника: подсчет без обращения к тексту
+            diagnosis_ids = getattr(employee, 'diagnosis_ids', None)
+            if diagnosis_ids is not None:
+                columns = employee.diagnosis_dictionary.count_columns(diagnosis_ids, self)
+                np.add.at(counts[row], columns[columns >= 0], 1)
+                continue
+
+            # Готовые количества не требуют загрузки текста диагнозов
+            diagnosis_counts = getattr(employee, 'diagnosis_counts', None)
+            if diagnosis_counts is None:
+                diagnoses = getattr(employee, 'diagnoses', None) or {}
+                diagnosis_counts = {category: len(diagnosis_list) for category, diagnosis_list in diagnoses.items()}
+
+            for category, num_diagnoses in diagnosis_counts.items():
+                category_id = self.category_ids.get(category)
+                if category_id is not None:
+                    counts[row, category_id] = num_diagnoses
+
+        return counts
+
+    def build_category_order(self, employees) -> np.ndarray:
+        """
+        Матрица порядка суммирования категорий (сотрудники × позиция): id категорий в
+        порядке их появления в диагнозах сотрудника, -1 - позиция не занята
+
+        Категории, неизвестные модели, пропускаются
+        """
+        sequences = []
+        for employee in employees:
+            diagnosis_ids = getattr(employee, 'diagnosis_ids', None)
+            if diagnosis_ids is not None:
+                columns = employee.diagnosis_dictionary.count_columns(diagnosis_ids, self)
+                columns = columns[columns >= 0]
+                _, first = np.unique(columns, return_index=True)
+                sequences.append(columns[np.sort(first)].tolist())
+                continue
+
+            diagnosis_counts = getattr(employee, 'diagnosis_counts', None)
+            if diagnosis_counts is None:
+                diagnosis_counts = getattr(employee, 'diagnoses', None) or {}
+            sequences.append([self.category_ids[category] for category in diagnosis_counts
+                              if category in self.category_ids])
+
+        order = np.full((len(sequences), max(map(len, sequences), default=0)), -1, dtype=np.int64)
+        for row, sequence in enumerate(sequences):
+            order[row, :len(sequence)] = sequence
+        return order
 
     @staticmethod
-    def _calculate_category_contribution(weight, num_diagnoses):
+    def order_from_positions(rows, columns, num_rows: int) -> np.ndarray:
+        """
+        Матрица порядка суммирования категорий из пар (строка, id категории), перечисленных
+        в порядке появления категорий у каждого сотрудника (строки - по возрастанию)
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = np.searchsorted(rows, np.arange(num_rows))
+        positions = np.arange(len(rows)) - starts[rows] if len(rows) else np.zeros(0, dtype=np.int64)
+        order = np.full((num_rows, int(positions.max()) + 1 if len(rows) else 0), -1, dtype=np.int64)
+        order[rows, positions] = columns
+        return order
+
+    def pack_category_order(self, employee_ids, count_rows) -> np.ndarray:
+        """
+        Матрица порядка суммирования категорий из результата SQL-агрегации: категории
+        сотрудника упорядочены по наименьшему id диагноза (порядок чтения диагнозов сотрудника)
+
+        Args:
+            employee_ids: отсортированный массив id сотрудников (строки матрицы)
+            count_rows: список (employee_id, category_id, count, наименьший id диагноза)
+        """
+        employee_ids = np.asarray(employee_ids, dtype=np.int64)
+        if not count_rows or not len(employee_ids):
+            return np.full((len(employee_ids), 0), -1, dtype=np.int64)
+
+        data = np.asarray(count_rows, dtype=np.int64)
+        rows = np.searchsorted(employee_ids, data[:, 0])
+        cols = data[:, 1]
+        valid = (rows < len(employee_ids)) & (cols >= 0) & (cols < self.num_columns)
+        valid[valid] = employee_ids[rows[valid]] == data[valid, 0]
+
+        rows, cols, first_ids = rows[valid], cols[valid], data[valid, 3]
+        order = np.lexsort((first_ids, rows))
+        return self.order_from_positions(rows[order], cols[order], len(employee_ids))
+
+    def pack_count_matrix(self, employee_ids, count_rows):
         """
-        Рассчитывает вклад категории диагнозов в общий дефицит здоровья
-        Возвращает значение от 0 до weight (максимальный вклад категории)
+        Упаковывает результат SQL-агрегации в матрицу (сотрудники × id категорий)
 
-        Используется нелинейная функция с насыщением:
-        - 1 диагноз: weight * 0.5
-        - 2 диагноза: weight * 0.75
-        - 3 диагноза: weight * 0.875
-        - и т.д.
+        Args:
+            employee_ids: отсортированный массив id сотрудников (строки матрицы)
+            count_rows: список (employee_id, category_id, count, ...)
         """
-        if num_diagnoses == 0:
-            return 0.0
+        employee_ids = np.asarray(employee_ids, dtype=np.int64)
+        counts = np.zeros((len(employee_ids), self.num_columns), dtype=np.int64)
+        if not count_rows or not len(employee_ids):
+            return counts
+
+        data = np.asarray(count_rows, dtype=np.int64)
 
-        # Нелинейное увеличение вклада: каждый доп. диагноз дает все меньший прирост
-        contribution_factor = 1 - (1 - HealthCalculator.BASE_DIAGNOSIS_CONTRIBUTION) ** num_diagnoses
-        return weight * contribution_factor
+        rows = np.searchsorted(employee_ids, data[:, 0])
+        cols = data[:, 1]
+        valid = (rows < len(employee_ids)) & (cols >= 0) & (cols < self.num_columns)
+        valid[valid] = employee_ids[rows[valid]] == data[valid, 0]
+
+        counts[rows[valid], cols[valid]] = data[valid, 2]
+        return counts
 
     @staticmethod
-    def _calculate_disability_contribution(disability_group):
-        """Расчет вклада инвалидности в дефицит здоровья"""
-        if not disability_group:
-            return 0.0
-
-        disability_contributions = {
-            1: 0.35,  # 1 группа - максимальный вклад
-            2: 0.25,
-            3: 0.15
-        }
-        return disability_contributions.get(disability_group, 0)
-    '''
+    def _ramp_contribution(values, term):
+        """Вклад, линейно растущий от term['start'] до term['end'] лет (не более max_contribution)"""
+        values = np.nan_to_num(np.asarray(values, dtype=np.float64))
+        start, end = float(term['start']), float(term['end'])
+        return float(term['max_contribution']) * np.clip((values - start) / (end - start), 0.0, 1.0)
+
+    def calculate(self, counts, disability_groups, prof_harm_codes, ages=None, experience=None,
+                  category_order=None):
+        """
+        Пакетный расчет показателя дефицита здоровья (0-1)
+
+        Args:
+            counts: матрица (сотрудники × id категорий) с количеством диагнозов
+            disability_groups: массив групп инвалидности (0 - нет инвалидности)
+            prof_harm_codes: массив кодов профвредности (None/'' - нет профвредности)
+            ages: массив возрастов (нужен, если включен возрастной вклад)
+            experience: массив стажа в годах (нужен, если включен вклад стажа)
+            category_order: матрица порядка суммирования категорий (build_category_order);
+                            None - порядок категорий конфигурации
+
+        Returns:
+            np.ndarray с показателями здоровья в порядке строк counts
+
+        HealthScore = 1 - (1 - D_diseases) * (1 - D_disability) * (1 - D_age) * (1 - D_exp) * (1 - D_prof)
+        """
+        counts = np.asarray(counts, dtype=np.float64).reshape(-1, self.num_columns)
+        num_employees = len(counts)
+
+        # 1. Вклад заболеваний: каждая категория дает weight * (1 - (1 - base)^n),
+        # нормировка на суммарный вес категорий сотрудника (как в скалярном расчете,
+        # категория с пустым списком диагнозов учитывается в весе с нулевым вкладом)
+        contribution_factors = 1 - (1 - self.base_contribution) ** counts
+
+        # Категории складываются по одной в порядке скалярного расчета (порядок категорий
+        # в диагнозах сотрудника), поэтому суммы с плавающей точкой совпадают в точности.
+        # Без явного порядка категории сотрудника - те, в которых есть диагнозы
+        if category_order is None:
+            category_order = np.where(counts[:, self.config_order] > 0, self.config_order, -1)
+        rows = np.arange(num_employees)
+        weighted_contribution = np.zeros(num_employees)
+        total_weight = np.zeros(num_employees)
+        for position in range(category_order.shape[1]):
+            columns = category_order[:, position]
+            columns = np.where(columns >= 0, columns, 0)
+            weights = np.where(category_order[:, position] >= 0, self.category_weights[columns], 0.0)
+            weighted_contribution += weights * contribution_factors[rows, columns]
+            total_weight += weights
+
+        diseases_contribution = np.zeros(num_employees)
+        has_diseases = total_weight > 0
+        diseases_contribution[has_diseases] = np.minimum(
+            weighted_contribution[has_diseases] / total_weight[has_diseases], 1.0
+        )
+
+        # 2. Вклад инвалидности
+        groups = np.asarray(disability_groups, dtype=np.int64)
+        known_group = (groups >= 0) & (groups < len(self.disability_table))
+        disability_contribution = np.where(known_group, self.disability_table[np.where(known_group, groups, 0)], 0.0)
+
+        # 3-4. Возрастной вклад и вклад стажа
+        age_contribution = np.zeros(num_employees)
+        if self.uses_age and ages is not None:
+            age_contribution = self._ramp_contribution(ages, self.age_term)
+
+        exp_contribution = np.zeros(num_employees)
+        if self.uses_experience and experience is not None:
+            exp_contribution = self._ramp_contribution(experience, self.experience_term)
+
+        # 5. Вклад профвредности
+        codes = np.asarray(prof_harm_codes, dtype=object)
+        prof_contribution = np.where(codes.astype(bool), self.default_prof_harm_contribution, 0.0)
+        for code, contribution in self.prof_harm_contributions.items():
+            prof_contribution[codes == code] = contribution
+
+        # Композиция вкладов: общий дефицит = 1 - произведение (1 - вклад_i)
+        health_scores = 1 - (
+                (1 - diseases_contribution) *
+                (1 - disability_contribution) *
+                (1 - age_contribution) *
+                (1 - exp_contribution) *
+                (1 - prof_contribution)
+        )
+
+        # Ограничиваем от 0 до 1
+        return np.clip(health_scores, 0.0, 1.0)
+
+    def calculate_for(self, employees):
+        """Пакетный расчет показателя здоровья для списка сотрудников или EmployeeFrame"""
+        if hasattr(employees, 'health_inputs'):
+            return self.calculate(*employees.health_inputs(self))
+
+        counts = self.build_count_matrix(employees)
+        category_order = self.build_category_order(employees)
+        disability_groups = np.array(
+            [getattr(employee, 'disability_group', None) or 0 for employee in employees],
+            dtype=np.int64
+        )
+        prof_harm_codes = np.array(
+            [getattr(employee, 'prof_harm_code', None) for employee in employees],
+            dtype=object
+        )
+
+        ages = None
+        if self.uses_age:
+            ages = np.array([employee.get_age() or 0 for employee in employees], dtype=np.float64)
+
+        experience = None
+        if self.uses_experience:
+            experience = np.array([employee.get_experience() or 0 for employee in employees], dtype=np.float64)
+
+        return self.calculate(counts, disability_groups, prof_harm_codes, ages, experience, category_order)
+
+
+class HealthCalculator:
+    """Калькулятор показателя дефицита здоровья (0 - отлично, 1 - максимальный дефицит)"""
+
+    # Секция health_model активной конфигурации (None - загрузить конфигурацию по умолчанию)
+    _params = None
+
+    @staticmethod
+    def configure(config):
+        """
+        Применить конфигурацию модели здоровья
+
+        Args:
+            config: полная конфигурация (с секцией health_model) или сама секция
+        """
+        if config and 'health_model' in config:
+            config = config['health_model']
+        elif config and 'variables' in config:
+            config = None
+        HealthCalculator._params = config or DEFAULT_HEALTH_MODEL
+
     @staticmethod
-        def _calculate_age_contribution(age):
-            """Расчет возрастного вклада в дефицит здоровья"""
-            if not age or age <= 40:
-                return 0.0
-    
-            if age >= 70:
-                return 0.25  # максимальный вклад от возраста 25%
-    
-            # Плавное увеличение вклада с 40 до 70 лет
-            return min((age - 40) * 0.00833, 0.25)  # 0.00833 = 0.25/30
-    
-        @staticmethod
-        def _calculate_experience_contribution(experience):
-            """Расчет вклада стажа в дефицит здоровья"""
-            if not experience or experience <= 10:
-                return 0.0
-    
-            if experience >= 40:
-                return 0.20  # максимальный вклад от стажа 20%
-    
-            # Плавное увеличение вклада с 10 до 40 лет
-            return min((experience - 10) * 0.00667, 0.20)  # 0.00667 = 0.2/30
-    '''
+    def get_model(categories=None):
+        """
+        Скомпилированная модель для активной конфигурации (кэшируется по хэшу конфигурации)
+
+        Args:
+            categories: записи diagnosis_categories из БД - столбцы матрицы будут
+                        соответствовать id категорий в БД
+        """
+        if HealthCalculator._params is None:
+            HealthCalculator.configure(load_config())
+
+        params = HealthCalculator._params
+        categories_key = tuple((cat['id'], cat['category']) for cat in categories) if categories else None
+        return compiled_configs.get('health', params, lambda: HealthModel(params, categories), categories_key)
 
+    @staticmethod
+    def calculate_health_scores_for(employees):
+        """Пакетный расчет показателя здоровья для списка сотрудников"""
+        return HealthCalculator.get_model().calculate_for(employees)
 
     @staticmethod
-    def _calculate_prof_harm_contribution(prof_harm_code):
-        """Расчет вклада профвредности в дефицит здоровья"""
-        if not prof_harm_code:
-            return 0.0
+    def get_health_scores(employees):
+        """
+        Показатели здоровья для списка сотрудников: материализованные в БД значения,
+        а для сотрудников без актуального значения - пакетный расчет
+        """
+        if hasattr(employees, 'take'):
+            # EmployeeFrame: столбец health_score (NaN - значение устарело)
+            scores = np.array(employees.health_score, dtype=np.float64)
+        else:
+            scores = np.array(
+                [employee.health_score if getattr(employee, 'health_score', None) is not None else np.nan
+                 for employee in employees],
+                dtype=np.float64
+            )
+
+        missing = np.isnan(scores)
+        if missing.any():
+            if hasattr(employees, 'take'):
+                missing_employees = employees.take(np.flatnonzero(missing))
+            else:
+                missing_employees = [employee for employee, is_missing in zip(employees, missing) if is_missing]
+            scores[missing] = HealthCalculator.calculate_health_scores_for(missing_employees)
 
-        # Профвредность увеличивает дефицит здоровья в зависимости от класса
-        harm_contributions = {
-            'Т75.2': 0.15,
-        }
-        return harm_contributions.get(str(prof_harm_code), 0.15)
+        return scores
 
     @staticmethod
     def calculate_health_score(employee):
@@ -96,22 +389,27 @@ class HealthCalculator:
         Используется мультипликативно-аддитивная модель:
         HealthScore = 1 - (1 - D_diseases) * (1 - D_disability) * (1 - D_age) * (1 - D_exp) * (1 - D_prof)
 
-        Где D_* - это вклады различных факторов в дефицит здоровья (0-1)
+        Где D_* - это вклады различных факторов в дефицит здоровья (0-1).
+        Параметры модели задаются секцией health_model конфигурации.
+
+        Пакетный расчет (HealthModel.calculate) складывает категории в том же порядке,
+        поэтому результаты скалярного и пакетного расчета совпадают в точности.
         """
+        model = HealthCalculator.get_model()
+        weights = model.params.get('category_weights', {})
 
-        # 1. Вклад заболеваний (агрегируем по категориям)
+        # 1. Вклад заболеваний (агрегируем по категориям в порядке диагнозов сотрудника)
         diseases_contribution = 0.0
-        if hasattr(employee, 'diagnoses') and employee.diagnoses:
+        diagnoses = getattr(employee, 'diagnoses', None)
+        if diagnoses:
             total_weight = 0.0
             weighted_contribution = 0.0
 
-            for category, diagnosis_list in employee.diagnoses.items():
-                if category in HealthCalculator.CATEGORY_WEIGHTS:
-                    weight = HealthCalculator.CATEGORY_WEIGHTS[category]
-                    num_diagnoses = len(diagnosis_list)
-
-                    category_contribution = HealthCalculator._calculate_category_contribution(weight, num_diagnoses)
-                    weighted_contribution += category_contribution
+            for category, diagnosis_list in diagnoses.items():
+                if category in weights:
+                    weight = weights[category]
+                    contribution_factor = 1 - (1 - model.base_contribution) ** len(diagnosis_list)
+                    weighted_contribution += weight * contribution_factor
                     total_weight += weight
 
             # Нормализуем вклад, чтобы он не превышал 1
@@ -119,33 +417,40 @@ class HealthCalculator:
                 diseases_contribution = min(weighted_contribution / total_weight, 1.0)
 
         # 2. Вклад инвалидности
-        disability_contribution = HealthCalculator._calculate_disability_contribution(
-            getattr(employee, 'disability_group', None)
-        )
+        group = getattr(employee, 'disability_group', None) or 0
+        disability_contribution = float(model.disability_table[group]) if 0 <= group < len(model.disability_table) else 0.0
 
-        # 3. Возрастной вклад
-        #age = getattr(employee, 'get_age', lambda: None)()
-        #age_contribution = HealthCalculator._calculate_age_contribution(age)
+        # 3-4. Возрастной вклад и вклад стажа
+        age_contribution = 0.0
+        if model.uses_age:
+            age_contribution = HealthCalculator._ramp_contribution(employee.get_age(), model.age_term)
 
-        # 4. Вклад стажа
-        #experience = getattr(employee, 'get_experience', lambda: None)()
-        #exp_contribution = HealthCalculator._calculate_experience_contribution(experience)
+        exp_contribution = 0.0
+        if model.uses_experience:
+            exp_contribution = HealthCalculator._ramp_contribution(employee.get_experience(), model.experience_term)
 
         # 5. Вклад профвредности
-        prof_contribution = HealthCalculator._calculate_prof_harm_contribution(
-            getattr(employee, 'prof_harm_code', None)
-        )
+        prof_contribution = 0.0
+        prof_harm_code = getattr(employee, 'prof_harm_code', None)
+        if prof_harm_code:
+            prof_contribution = model.prof_harm_contributions.get(str(prof_harm_code),
+                                                                  model.default_prof_harm_contribution)
 
-        # Композиция вкладов (мультипликативная, как в нечеткой логике)
-        # Формула: общий дефицит = 1 - произведение (1 - вклад_i)
-        # Это гарантирует, что результат всегда в [0, 1]
+        # Композиция вкладов: общий дефицит = 1 - произведение (1 - вклад_i)
         health_score = 1 - (
                 (1 - diseases_contribution) *
                 (1 - disability_contribution) *
-                #(1 - age_contribution) *
-                #(1 - exp_contribution) *
+                (1 - age_contribution) *
+                (1 - exp_contribution) *
                 (1 - prof_contribution)
         )
 
         # Ограничиваем от 0 до 1
-        return max(0.0, min(1.0, health_score))
\ No newline at end of file
+        return max(0.0, min(1.0, health_score))
+
+    @staticmethod
+    def _ramp_contribution(value, term) -> float:
+        """Вклад, линейно растущий от term['start'] до term['end'] лет (скалярный вариант HealthModel)"""
+        value = float(value or 0.0)
+        start, end = float(term['start']), float(term['end'])
+        return float(term['max_contribution']) * min(max((value - start) / (end - start), 0.0), 1.0)
@@ -0,0 +1,459 @@
+"""
+Версионные миграции схемы БД
+
+Номер примененной версии хранится в PRAGMA user_version. Миграции применяются
+по порядку при подключении DatabaseManager, каждая - в отдельной транзакции.
+Запуск вручную (отчет о шагах, --dry-run - выполнить и откатить):
+    python migrations.py [путь к БД] [--dry-run]
+"""
+
+import sqlite3
+import sys
+import time
+
+# Исходная схема (версия 0) - создается в пустой БД перед миграциями
+BASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS diagnosis_categories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    category VARCHAR(100) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS positions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_positions_name ON positions(name);
+
+CREATE TABLE IF NOT EXISTS departments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name varchar(100)
+);
+
+CREATE TABLE IF NOT EXISTS diagnoses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(500) NOT NULL,
+    category_id INTEGER NOT NULL,
+    FOREIGN KEY (category_id) REFERENCES diagnosis_categories(id)
+);
+
+CREATE TABLE IF NOT EXISTS employees (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    lastname VARCHAR(100) NOT NULL,
+    birth_date TIMESTAMP NOT NULL,
+    gender CHAR(1) NOT NULL,
+    position_id INTEGER NOT NULL,
+    department_id INTEGER NOT NULL,
+    start_year TIMESTAMP,
+    firstname varchar(50),
+    patronymic varchar(50),
+    FOREIGN KEY (position_id) REFERENCES positions(id),
+    FOREIGN KEY (department_id) REFERENCES departments(id)
+);
+CREATE INDEX IF NOT EXISTS idx_employees_lastname ON employees(lastname);
+
+CREATE TABLE IF NOT EXISTS employee_diagnoses (
+    employee_id INTEGER NOT NULL,
+    diagnosis_id INTEGER NOT NULL,
+    PRIMARY KEY (employee_id, diagnosis_id),
+    FOREIGN KEY (employee_id) REFERENCES employees(id),
+    FOREIGN KEY (diagnosis_id) REFERENCES diagnoses(id)
+);
+
+CREATE TABLE IF NOT EXISTS employee_harm (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER NOT NULL,
+    prof_harm_code VARCHAR,
+    prof_harm_year TIMESTAMP,
+    CONSTRAINT employee_harm_employees_FK FOREIGN KEY (id) REFERENCES employees(id)
+);
+
+CREATE TABLE IF NOT EXISTS employee_disability (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER NOT NULL,
+    disability_group INTEGER,
+    CONSTRAINT employee_disability_employees_FK FOREIGN KEY (id) REFERENCES employees(id)
+);
+"""
+
+# Материализованный показатель здоровья.
+# version увеличивается триггерами при любом изменении диагнозов, инвалидности или
+# профвредности сотрудника; computed_version - версия, для которой посчитан health_score.
+# Запись "грязная", если computed_version < version. config_hash - хэш параметров
+# модели здоровья, с которыми посчитан health_score.
+HEALTH_SCORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS employee_health (
+    employee_id INTEGER PRIMARY KEY,
+    health_score REAL,
+    version INTEGER NOT NULL DEFAULT 1,
+    computed_version INTEGER NOT NULL DEFAULT 0,
+    config_hash TEXT
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_health_insert AFTER INSERT ON employees
+BEGIN
+    INSERT INTO employee_health (employee_id) VALUES (NEW.id)
+    ON CONFLICT(employee_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_health_delete AFTER DELETE ON employees
+BEGIN
+    DELETE FROM employee_health WHERE employee_id = OLD.id;
+END;
+""" + "".join(f"""
+CREATE TRIGGER IF NOT EXISTS trg_{table}_health_insert AFTER INSERT ON {table}
+BEGIN
+    INSERT INTO employee_health (employee_id) VALUES (NEW.employee_id)
+    ON CONFLICT(employee_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_{table}_health_update AFTER UPDATE ON {table}
+BEGIN
+    INSERT INTO employee_health (employee_id) VALUES (OLD.employee_id)
+    ON CONFLICT(employee_id) DO UPDATE SET version = version + 1;
+    INSERT INTO employee_health (employee_id) VALUES (NEW.employee_id)
+    ON CONFLICT(employee_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_{table}_health_delete AFTER DELETE ON {table}
+BEGIN
+    UPDATE employee_health SET version = version + 1 WHERE employee_id = OLD.employee_id;
+END;
+""" for table in ('employee_diagnoses', 'employee_disability', 'employee_harm'))
+
+
+def _fold_yo(expression: str) -> str:
+    """SQL-выражение expression с заменой ё/Ё на е/Е"""
+    return f"replace(replace({expression}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def _search_row(employee: str) -> str:
+    """Значения столбцов employee_search (без rowid) для сотрудника employee (NEW/OLD/e)"""
+    return ", ".join([
+        _fold_yo(f"{employee}.lastname"),
+        _fold_yo(f"{employee}.firstname"),
+        _fold_yo(f"{employee}.patronymic"),
+        _fold_yo(f"(SELECT name FROM positions WHERE id = {employee}.position_id)"),
+        _fold_yo(f"(SELECT name FROM departments WHERE id = {employee}.department_id)"),
+    ])
+
+
+# Полнотекстовый поиск сотрудников: rowid = employees.id, должность и предприятие
+# денормализованы и обновляются триггерами при их переименовании.
+# unicode61 приводит к нижнему регистру и кириллицу; prefix - индексы префиксов
+# для поиска по началу слова ("Ива"*). Буква ё индексируется как е (запрос
+# приводится так же в DatabaseManager.search_employees).
+EMPLOYEE_SEARCH_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS employee_search USING fts5(
+    lastname, firstname, patronymic, position, department,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_search_insert AFTER INSERT ON employees
+BEGIN
+    INSERT INTO employee_search (rowid, lastname, firstname, patronymic, position, department)
+    VALUES (NEW.id, {_search_row('NEW')});
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_search_update
+AFTER UPDATE OF id, lastname, firstname, patronymic, position_id, department_id ON employees
+BEGIN
+    DELETE FROM employee_search WHERE rowid = OLD.id;
+    INSERT INTO employee_search (rowid, lastname, firstname, patronymic, position, department)
+    VALUES (NEW.id, {_search_row('NEW')});
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_search_delete AFTER DELETE ON employees
+BEGIN
+    DELETE FROM employee_search WHERE rowid = OLD.id;
+END;
+""" + "".join(f"""
+CREATE TRIGGER IF NOT EXISTS trg_{table}_search_update AFTER UPDATE OF name ON {table}
+BEGIN
+    UPDATE employee_search SET {column} = {_fold_yo('NEW.name')}
+    WHERE rowid IN (SELECT id FROM employees WHERE {column}_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_{table}_search_delete AFTER DELETE ON {table}
+BEGIN
+    UPDATE employee_search SET {column} = NULL
+    WHERE rowid IN (SELECT id FROM employees WHERE {column}_id = OLD.id);
+END;
+""" for table, column in (('positions', 'position'), ('departments', 'department'))) + f"""
+DELETE FROM employee_search;
+
+INSERT INTO employee_search (rowid, lastname, firstname, patronymic, position, department)
+SELECT e.id, {_search_row('e')}
+FROM employees e;
+"""
+
+# Результаты пакетного расчета риска: строка на сотрудника в каждом запуске (run_id).
+# config_hash - хэш нечеткой системы и модели здоровья, с которыми посчитан риск;
+# физические параметры одинаковы для всего запуска, нормализованные - с учетом стажа.
+RISK_ASSESSMENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS risk_assessments (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL,
+    config_hash TEXT NOT NULL,
+    employee_id INTEGER NOT NULL REFERENCES employees(id) ON DELETE CASCADE,
+    vibration_physical REAL,
+    noise_physical REAL,
+    chemical_physical REAL,
+    experience REAL,
+    vibration_norm REAL,
+    noise_norm REAL,
+    chemical_norm REAL,
+    health_score REAL,
+    risk_value REAL NOT NULL,
+    risk_category TEXT,
+    assessed_at TEXT NOT NULL
+);
+
+-- История сотрудника: в индексе строки одного сотрудника упорядочены по id (rowid)
+CREATE INDEX IF NOT EXISTS idx_risk_assessments_employee_id ON risk_assessments(employee_id);
+
+-- Сводка по запуску (число, средний и максимальный риск по категориям) только по индексу
+CREATE INDEX IF NOT EXISTS idx_risk_assessments_run ON risk_assessments(run_id, risk_category, risk_value);
+"""
+
+# Таблицы сотрудника с внешним ключом employee_id -> employees(id) ON DELETE CASCADE:
+# {таблица: (определение столбцов, переносимые столбцы, доп. условие переноса, индексы)}.
+# В исходной схеме employee_harm и employee_disability ссылались на employees полем id,
+# employee_diagnoses - без каскадного удаления. SQLite не изменяет ограничения
+# существующей таблицы, поэтому таблицы пересоздаются (строки, ссылающиеся на
+# отсутствующих сотрудников или диагнозы, не переносятся); индексы и триггеры
+# удаленных таблиц создаются заново.
+CASCADE_TABLES = {
+    'employee_diagnoses': ("""
+    employee_id INTEGER NOT NULL,
+    diagnosis_id INTEGER NOT NULL,
+    PRIMARY KEY (employee_id, diagnosis_id),
+    FOREIGN KEY (employee_id) REFERENCES employees(id) ON DELETE CASCADE,
+    FOREIGN KEY (diagnosis_id) REFERENCES diagnoses(id)
+""", "employee_id, diagnosis_id", "AND diagnosis_id IN (SELECT id FROM diagnoses)", [
+        "CREATE INDEX IF NOT EXISTS idx_employee_diagnoses_diagnosis_id ON employee_diagnoses(diagnosis_id)",
+    ]),
+    'employee_harm': ("""
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER NOT NULL,
+    prof_harm_code VARCHAR,
+    prof_harm_year TIMESTAMP,
+    CONSTRAINT employee_harm_employees_FK FOREIGN KEY (employee_id) REFERENCES employees(id) ON DELETE CASCADE
+""", "id, employee_id, prof_harm_code, prof_harm_year", "", [
+        "CREATE INDEX IF NOT EXISTS idx_employee_harm_employee_id ON employee_harm(employee_id)",
+    ]),
+    'employee_disability': ("""
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER NOT NULL,
+    disability_group INTEGER,
+    CONSTRAINT employee_disability_employees_FK FOREIGN KEY (employee_id) REFERENCES employees(id) ON DELETE CASCADE
+""", "id, employee_id, disability_group", "", [
+        "CREATE INDEX IF NOT EXISTS idx_employee_disability_employee_id ON employee_disability(employee_id)",
+    ]),
+}
+
+
+def _rebuild_statements(table: str) -> list:
+    """Пересоздание таблицы из CASCADE_TABLES с переносом строк существующих сотрудников"""
+    columns_sql, columns, condition, indexes = CASCADE_TABLES[table]
+    return [
+        f"CREATE TABLE {table}_new ({columns_sql})",
+        f"INSERT INTO {table}_new ({columns}) SELECT {columns} FROM {table} "
+        f"WHERE employee_id IN (SELECT id FROM employees) {condition}",
+        f"DROP TABLE {table}",
+        f"ALTER TABLE {table}_new RENAME TO {table}",
+    ] + indexes
+
+
+def _check_foreign_keys(conn):
+    """Проверка ссылок пересозданных таблиц (ошибка откатывает миграцию)"""
+    for table in CASCADE_TABLES:
+        violations = conn.execute(f"PRAGMA foreign_key_check({table})").fetchall()
+        if violations:
+            raise sqlite3.IntegrityError(f"{table}: {len(violations)} строк ссылаются на отсутствующие записи")
+
+def split_statements(script: str) -> list:
+    """Разбить SQL-скрипт на операторы (с учетом ';' внутри триггеров)"""
+    statements, buffer = [], ""
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ""
+    if buffer.strip():
+        statements.append(buffer.strip())
+    return statements
+
+
+def _add_health_config_hash(conn):
+    """Столбец config_hash в employee_health, созданной до его появления"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(employee_health)")}
+    if 'config_hash' not in columns:
+        conn.execute("ALTER TABLE employee_health ADD COLUMN config_hash TEXT")
+
+
+# Миграции: (версия, описание, шаги). Шаг - SQL-оператор или функция от соединения,
+# шаги не фиксируют транзакцию сами. Шаги идемпотентны - миграцию можно применить
+# и к БД, где часть изменений уже внесена вручную.
+MIGRATIONS = [
+    (1, "Индексы для соединений и поиска, удаление индексов, дублирующих первичные ключи", [
+        # Соединения сотрудника с профвредностью и инвалидностью, удаление по employee_id
+        "CREATE INDEX IF NOT EXISTS idx_employee_harm_employee_id ON employee_harm(employee_id)",
+        "CREATE INDEX IF NOT EXISTS idx_employee_disability_employee_id ON employee_disability(employee_id)",
+        # Сотрудники предприятия (delete_department, фильтры)
+        "CREATE INDEX IF NOT EXISTS idx_employees_department_id ON employees(department_id)",
+        # Сотрудники с диагнозом (первичный ключ начинается с employee_id)
+        "CREATE INDEX IF NOT EXISTS idx_employee_diagnoses_diagnosis_id ON employee_diagnoses(diagnosis_id)",
+        # Поиск диагноза по названию и категории при добавлении сотрудника
+        "CREATE INDEX IF NOT EXISTS idx_diagnoses_name_category ON diagnoses(name, category_id)",
+        # Индексы по INTEGER PRIMARY KEY и по первичному ключу employee_diagnoses не используются
+        "DROP INDEX IF EXISTS idx_employees_id",
+        "DROP INDEX IF EXISTS idx_diagnoses_id",
+        "DROP INDEX IF EXISTS idx_positions_id",
+        "DROP INDEX IF EXISTS idx_departments_id",
+        "DROP INDEX IF EXISTS idx_diagnosis_categories_id",
+        "DROP INDEX IF EXISTS idx_employee_diagnoses_composite",
+        # Статистика для планировщика запросов
+        "ANALYZE",
+    ]),
+    (2, "Материализованный показатель здоровья: таблица employee_health и триггеры версий",
+     split_statements(HEALTH_SCORE_SCHEMA) + [
+         _add_health_config_hash,
+         # Сотрудники, добавленные до появления триггеров (показатель устарел: version > computed_version)
+         "INSERT OR IGNORE INTO employee_health (employee_id) SELECT id FROM employees",
+     ]),
+    (3, "Полнотекстовый индекс FTS5 по ФИО, должности и предприятию",
+     split_statements(EMPLOYEE_SEARCH_SCHEMA)),
+    (4, "Каскадное удаление данных сотрудника: внешние ключи employee_id -> employees(id)",
+     [statement for table in CASCADE_TABLES for statement in _rebuild_statements(table)]
+     # Триггеры показателя здоровья удалены вместе с таблицами
+     + split_statements(HEALTH_SCORE_SCHEMA) + [_check_foreign_keys]),
+    (5, "Индексы постраничной выборки сотрудников (фамилия, id) с фильтром по предприятию и должности", [
+        # Индекс по фамилии содержит rowid - порядок (lastname, id) без фильтров
+        "CREATE INDEX IF NOT EXISTS idx_employees_department_lastname ON employees(department_id, lastname)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_position_lastname ON employees(position_id, lastname)",
+        # Покрывается idx_employees_department_lastname
+        "DROP INDEX IF EXISTS idx_employees_department_id",
+        "ANALYZE",
+    ]),
+    (6, "Хранение результатов пакетного расчета риска: таблица risk_assessments",
+     split_statements(RISK_ASSESSMENT_SCHEMA)),
+]
+
+
+def get_schema_version(conn) -> int:
+    """Версия схемы БД (PRAGMA user_version)"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+class MigrationRunner:
+    """Применение миграций к соединению с отчетом о времени каждого шага"""
+
+    def __init__(self, conn, migrations=None):
+        self.conn = conn
+        self.migrations = MIGRATIONS if migrations is None else migrations
+
+    def _is_empty(self) -> bool:
+        """В БД нет таблиц - нужна исходная схема"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        ).fetchone()[0] == 0
+
+    def pending(self) -> list:
+        """Миграции новее версии БД; для пустой БД первым шагом идет исходная схема (версия 0)"""
+        current_version = get_schema_version(self.conn)
+        steps = [(version, description, statements) for version, description, statements in self.migrations
+                 if version > current_version]
+        if self._is_empty():
+            steps.insert(0, (0, "Исходная схема", split_statements(BASE_SCHEMA)))
+        return steps
+
+    def _run_steps(self, statements):
+        for statement in statements:
+            if callable(statement):
+                statement(self.conn)
+            else:
+                self.conn.execute(statement)
+
+    def run(self, dry_run: bool = False) -> list:
+        """
+        Применить ожидающие миграции
+
+        Args:
+            dry_run: выполнить все миграции в одной транзакции и откатить ее
+
+        Returns:
+            Отчет: список {'version', 'description', 'seconds'} по примененным шагам
+
+        Raises:
+            Exception: ошибка шага (транзакция шага откатывается, версия БД не меняется)
+        """
+        report = []
+        steps = self.pending()
+        if not steps:
+            return report
+
+        if self.conn.in_transaction:
+            self.conn.commit()
+
+        if dry_run:
+            self.conn.execute("BEGIN")
+
+        try:
+            for version, description, statements in steps:
+                if not dry_run:
+                    self.conn.execute("BEGIN")
+
+                start = time.perf_counter()
+                try:
+                    self._run_steps(statements)
+                    self.conn.execute(f"PRAGMA user_version = {version}")
+                    if not dry_run:
+                        self.conn.execute("COMMIT")
+                except Exception:
+                    if not dry_run:
+                        self.conn.execute("ROLLBACK")
+                    raise
+
+                report.append({
+                    'version': version,
+                    'description': description,
+                    'seconds': time.perf_counter() - start
+                })
+        finally:
+            if dry_run:
+                self.conn.execute("ROLLBACK")
+
+        return report
+
+
+def apply_migrations(conn, dry_run: bool = False) -> list:
+    """Применить ожидающие миграции (см. MigrationRunner.run)"""
+    return MigrationRunner(conn).run(dry_run)
+
+
+def format_report(report: list) -> str:
+    """Отчет о миграциях в виде текста"""
+    if not report:
+        return "Схема БД актуальна"
+    return "\n".join(f"  v{step['version']:<3} {step['seconds'] * 1000:8.1f} мс  {step['description']}"
+                     for step in report)
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != '--dry-run']
+    dry_run = '--dry-run' in sys.argv[1:]
+    db_path = args[0] if args else 'database/risk_assesment.db'
+
+    conn = sqlite3.connect(db_path)
+    try:
+        print(f"{db_path}: версия схемы {get_schema_version(conn)}")
+        report = apply_migrations(conn, dry_run)
+        print(("Пробный запуск (изменения откачены):\n" if dry_run and report else "") + format_report(report))
+        print(f"Версия схемы после запуска: {get_schema_version(conn)}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
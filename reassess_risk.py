@@ -0,0 +1,76 @@
+"""
+Повторная оценка риска сотрудников, у которых изменились данные или конфигурация
+
+Для каждого сотрудника с сохраненным результатом берутся параметры рабочей среды
+последней оценки; риск пересчитывается только при изменении входов (стаж, показатель
+здоровья) или конфигурации, остальные результаты переносятся. Работники
+обрабатываются пакетами, результаты всех пакетов записываются как один новый запуск. Запуск:
+    python reassess_risk.py [путь к БД] [путь к конфигурации]
+"""
+
+import sys
+
+import numpy as np
+
+from app_config import load_config, DEFAULT_CONFIG_PATH
+from employee_manager import EmployeeManager
+from fuzzy_system import FuzzyRiskSystem
+from health_calculator import HealthCalculator
+from risk_assessment import RiskAssessor
+
+DB_URL = 'database/risk_assesment.db'
+
+# Работников в пакете потокового обхода (EmployeeManager.iter_employees)
+BATCH_SIZE = 10000
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DB_URL
+    config = load_config(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_CONFIG_PATH)
+
+    HealthCalculator.configure(config)
+    assessor = RiskAssessor(FuzzyRiskSystem.from_config(config) if config else FuzzyRiskSystem())
+
+    manager = EmployeeManager(db_path)
+    manager.refresh_health_scores()
+
+    # Предыдущие оценки читаются, а результаты сохраняются по пакетам - память не растет
+    # с числом работников; все пакеты записываются в один запуск
+    run_id = None
+    assessed_count = unassessed_count = reused = evaluations = 0
+    for batch in manager.iter_employees(BATCH_SIZE):
+        previous = manager.get_latest_risk_assessments(batch.id.tolist())
+        assessed = np.array([int(employee_id) in previous for employee_id in batch.id], dtype=bool)
+        unassessed_count += int((~assessed).sum())
+        employees = batch.take(np.flatnonzero(assessed))
+        assessed_count += len(employees)
+
+        # Сотрудники пакета с одинаковыми параметрами рабочей среды оцениваются вместе
+        groups = {}
+        for row, employee_id in enumerate(employees.id):
+            stored = previous[int(employee_id)]
+            physical = (stored['vibration_physical'], stored['noise_physical'], stored['chemical_physical'])
+            groups.setdefault(physical, []).append(row)
+
+        results = {}
+        for physical, rows in groups.items():
+            results.update(assessor.assess(employees.take(np.array(rows)), *physical, previous=previous))
+            reused += assessor.stats['reused']
+            evaluations += assessor.stats['unique_inputs']
+
+        if results:
+            saved_run_id = manager.save_risk_assessments(results, assessor.config_hash, run_id)
+            if saved_run_id is None:
+                print("Не удалось сохранить результаты, расчет остановлен")
+                return
+            run_id = saved_run_id
+
+    print(f"Сотрудников с предыдущей оценкой: {assessed_count} (без оценки: {unassessed_count})")
+    print(f"Перенесено без пересчета: {reused}, пересчитано: {assessed_count - reused} "
+          f"(нечетких выводов: {evaluations})")
+
+    if run_id is not None:
+        print(f"Результаты сохранены: запуск №{run_id}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+"""Пересчет устаревших материализованных показателей здоровья в БД"""
+
+import sys
+
+from employee_manager import EmployeeManager
+
+DB_URL = 'database/risk_assesment.db'
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DB_URL
+    manager = EmployeeManager(db_path)
+
+    updated = manager.refresh_health_scores()
+    print(f"Пересчитано показателей здоровья: {updated}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Пакетный расчет риска для списка сотрудников при заданных параметрах рабочей среды"""
+
+import numpy as np
+
+from config_cache import config_hash
+from employee_manager import Employee
+from health_calculator import HealthCalculator
+from normalizers import ParameterNormalizer
+
+
+def assessment_config_hash(fuzzy_system, health_model=None) -> str:
+    """Хэш конфигурации расчета риска: нечеткая система и параметры модели здоровья"""
+    health_model = health_model or HealthCalculator.get_model()
+    return config_hash({'fuzzy': fuzzy_system.config_hash, 'health_model': health_model.config_hash})
+
+
+def _clip(value: float) -> float:
+    """Значение в диапазоне 0-1"""
+    return max(0.0, min(1.0, value))
+
+
+class RiskAssessor:
+    """
+    Пакетный расчет риска нечеткой системой
+
+    Результат по сотруднику - словарь FuzzyRiskSystem.calculate_risk, дополненный
+    физическими и нормализованными входными параметрами, стажем и показателем здоровья
+    (в таком виде результаты сохраняются в БД через EmployeeManager.save_risk_assessments).
+
+    Риск зависит только от четырех нормализованных входов (вибрация и шум с учетом
+    стажа, химический фактор, показатель здоровья), поэтому нечеткий вывод выполняется
+    один раз для каждого различного набора входов, а результат раздается всем
+    сотрудникам с этим набором. Сохраненный результат сотрудника с той же конфигурацией
+    и теми же входами переносится без пересчета.
+    """
+
+    def __init__(self, fuzzy_system):
+        self.fuzzy_system = fuzzy_system
+        self.config_hash = assessment_config_hash(fuzzy_system)
+        # Статистика последнего расчета: сотрудников, перенесенных результатов, различных
+        # наборов входов среди остальных и во сколько раз выводов меньше, чем сотрудников
+        self.stats = {'employees': 0, 'reused': 0, 'unique_inputs': 0, 'dedup_ratio': 1.0}
+
+    @staticmethod
+    def normalized_inputs(employees, vibration_physical: float, noise_physical: float, chemical_physical: float,
+                          health_scores=None):
+        """
+        Входы нечеткой системы для сотрудников
+
+        Returns:
+            (стаж, массив n x 4: вибрация и шум с учетом стажа, химический фактор, показатель здоровья)
+        """
+        if health_scores is None:
+            health_scores = HealthCalculator.get_health_scores(employees)
+
+        # Стаж - один векторный расчет; вибрация и шум нормализуются один раз на каждое
+        # различное значение стажа (полные годы и месяцы), а не на каждого сотрудника
+        experience_values = Employee.experience_array(employees)
+        unique_experience, experience_index = np.unique(experience_values, return_inverse=True)
+        vibration_values = np.array([ParameterNormalizer.normalize_vibration(vibration_physical, experience)
+                                     for experience in unique_experience.tolist()],
+                                    dtype=np.float64)[experience_index.ravel()]
+        noise_values = np.array([ParameterNormalizer.normalize_noise(noise_physical, experience)
+                                 for experience in unique_experience.tolist()],
+                                dtype=np.float64)[experience_index.ravel()]
+        chemical_norm = _clip(ParameterNormalizer.normalize_chemical(chemical_physical))
+
+        inputs = np.column_stack([
+            np.clip(vibration_values, 0.0, 1.0),
+            np.clip(noise_values, 0.0, 1.0),
+            np.full(len(experience_values), chemical_norm),
+            np.asarray(health_scores, dtype=np.float64),
+        ])
+        return experience_values, inputs
+
+    def _is_current(self, stored: dict, physical: tuple, inputs) -> bool:
+        """Совпадают ли конфигурация и входы сохраненного результата с текущими"""
+        return (stored['config_hash'] == self.config_hash
+                and (stored['vibration_physical'], stored['noise_physical'], stored['chemical_physical']) == physical
+                and (stored['vibration_norm'], stored['noise_norm'], stored['chemical_norm'],
+                     stored['health_score']) == tuple(inputs))
+
+    def assess(self, employees, vibration_physical: float, noise_physical: float, chemical_physical: float,
+               health_scores=None, progress=None, previous=None) -> dict:
+        """
+        Рассчитать риск для сотрудников
+
+        Args:
+            employees: EmployeeFrame или список Employee
+            vibration_physical, noise_physical, chemical_physical: физические значения параметров
+            health_scores: показатели здоровья сотрудников (None - HealthCalculator.get_health_scores)
+            progress: функция (выполнено, всего) по числу различных наборов входов,
+                      вызываемая перед каждым нечетким выводом; возвращает False, чтобы прервать расчет
+            previous: последние сохраненные результаты {id сотрудника: строка risk_assessments}
+                      (EmployeeManager.get_latest_risk_assessments); результат, посчитанный с той же
+                      конфигурацией и теми же входами, переносится без пересчета
+
+        Returns:
+            {id сотрудника: результат} - для прерванного расчета только сотрудники с уже
+            рассчитанными наборами входов; сотрудники с ошибкой расчета не включаются
+        """
+        experience_values, inputs = self.normalized_inputs(employees, vibration_physical, noise_physical,
+                                                           chemical_physical, health_scores)
+        employee_ids = employees.id if hasattr(employees, 'take') else [employee.id for employee in employees]
+        physical = (vibration_physical, noise_physical, chemical_physical)
+
+        # Сотрудники, для которых есть актуальный сохраненный результат
+        reused = np.zeros(len(inputs), dtype=bool)
+        if previous:
+            for row, employee_id in enumerate(employee_ids):
+                stored = previous.get(int(employee_id))
+                reused[row] = stored is not None and self._is_current(stored, physical, inputs[row].tolist())
+
+        # Различные наборы входов (точное совпадение) остальных сотрудников и номер набора для каждого
+        pending = np.flatnonzero(~reused)
+        unique_inputs, inverse = np.unique(inputs[pending], axis=0, return_inverse=True)
+        input_index = np.full(len(inputs), -1, dtype=np.int64)
+        input_index[pending] = inverse.ravel()
+
+        self.stats = {
+            'employees': len(inputs),
+            'reused': int(reused.sum()),
+            'unique_inputs': len(unique_inputs),
+            'dedup_ratio': len(pending) / len(unique_inputs) if len(unique_inputs) else 1.0,
+        }
+
+        unique_results = []
+        for done, (vibration_norm, noise_norm, chemical_norm, health_val) in enumerate(unique_inputs.tolist()):
+            if progress is not None and progress(done, len(unique_inputs)) is False:
+                break
+            unique_results.append(
+                self.fuzzy_system.calculate_risk(vibration_norm, noise_norm, chemical_norm, health_val))
+
+        results = {}
+        for row, employee_id in enumerate(employee_ids):
+            employee_id = int(employee_id)
+            if reused[row]:
+                stored = previous[employee_id]
+                result = {
+                    'value': stored['risk_value'],
+                    'percent': f"{stored['risk_value']*100:.1f}%",
+                    'category': stored['risk_category'],
+                    'success': True
+                }
+            else:
+                index = input_index[row]
+                if index >= len(unique_results) or not unique_results[index]['success']:
+                    continue
+                result = unique_results[index]
+
+            vibration_norm, noise_norm, chemical_norm, health_val = inputs[row].tolist()
+            results[employee_id] = {
+                **result,
+                'vibration_physical': vibration_physical,
+                'noise_physical': noise_physical,
+                'chemical_physical': chemical_physical,
+                'vibration_norm': vibration_norm,
+                'noise_norm': noise_norm,
+                'chemical_norm': chemical_norm,
+                'health_val': health_val,
+                'experience': float(experience_values[row])
+            }
+
+        return results
@@ -0,0 +1,138 @@
+"""Индекс поиска сотрудников в памяти: поиск подстроки без учета регистра без обращений к БД"""
+
+import numpy as np
+
+# Поля поиска главного окна и столбцы сотрудника, по которым ищется каждое поле
+SEARCH_FIELDS = {
+    'name': ('lastname', 'firstname', 'patronymic'),
+    'position': ('position',),
+    'department': ('department_name',),
+}
+
+# Длина n-граммы в индексе (триграммы)
+GRAM_SIZE = 3
+
+
+def fold(text) -> str:
+    """
+    Строка для сравнения без учета регистра (ё считается е)
+
+    В отличие от прежнего поиска (str.lower) используется casefold, а ё и е не
+    различаются: "Ёлкин" и "Елкин" находятся по любому из написаний
+    """
+    return str(text).casefold().replace('ё', 'е') if text else ''
+
+
+def _grams(text: str, size: int) -> set:
+    """Все подстроки text длины size"""
+    return {text[start:start + size] for start in range(len(text) - size + 1)}
+
+
+def _column(employees, name: str):
+    """Значения атрибута name по сотрудникам (столбец EmployeeFrame или список Employee)"""
+    if hasattr(employees, 'take'):
+        return getattr(employees, name)
+    return [getattr(employee, name) for employee in employees]
+
+
+class _FieldIndex:
+    """
+    Индекс подстрок для одного поля поиска
+
+    Строки приводятся к нижнему регистру и хранятся без повторов; для каждой
+    триграммы - отсортированный массив id строк, в которых она встречается.
+    Строка сотрудника для каждого столбца - id значения.
+    """
+
+    def __init__(self, columns):
+        """
+        Args:
+            columns: последовательности значений столбцов поля (по строкам сотрудников)
+        """
+        ids_by_value = {}
+        ids_by_folded = {}
+        self.values = []
+        self.value_ids = []
+
+        for column in columns:
+            row_ids = np.empty(len(column), dtype=np.int32)
+            for row, value in enumerate(column):
+                value_id = ids_by_value.get(value)
+                if value_id is None:
+                    folded = fold(value)
+                    value_id = ids_by_folded.setdefault(folded, len(self.values))
+                    if value_id == len(self.values):
+                        self.values.append(folded)
+                    ids_by_value[value] = value_id
+                row_ids[row] = value_id
+            self.value_ids.append(row_ids)
+
+        postings = {}
+        for value_id, value in enumerate(self.values):
+            for gram in _grams(value, GRAM_SIZE):
+                postings.setdefault(gram, []).append(value_id)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def matching_values(self, query: str) -> np.ndarray:
+        """id строк, содержащих query (уже приведенный через fold)"""
+        # Запрос короче триграммы - перебор различных строк (их меньше, чем сотрудников)
+        if len(query) < GRAM_SIZE:
+            return np.array([value_id for value_id, value in enumerate(self.values) if query in value],
+                            dtype=np.int32)
+
+        grams = _grams(query, GRAM_SIZE)
+        if any(gram not in self.postings for gram in grams):
+            return np.zeros(0, dtype=np.int32)
+
+        lists = sorted((self.postings[gram] for gram in grams), key=len)
+        candidates = lists[0]
+        for ids in lists[1:]:
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+
+        # Триграммы есть в строке, но не обязательно подряд - проверяем подстроку
+        if len(query) > GRAM_SIZE:
+            candidates = np.array([value_id for value_id in candidates if query in self.values[value_id]],
+                                  dtype=np.int32)
+        return candidates
+
+    def match(self, query: str) -> np.ndarray:
+        """Маска строк сотрудников, у которых query входит в значение хотя бы одного столбца поля"""
+        matched = np.zeros(len(self.values), dtype=bool)
+        matched[self.matching_values(fold(query))] = True
+
+        mask = matched[self.value_ids[0]]
+        for row_ids in self.value_ids[1:]:
+            mask |= matched[row_ids]
+        return mask
+
+
+class EmployeeSearchIndex:
+    """
+    Индекс для поиска сотрудников главного окна по ФИО, должности и предприятию
+
+    Строится один раз для загруженного набора сотрудников (EmployeeFrame или список
+    Employee); поиск возвращает номера строк этого набора.
+    """
+
+    def __init__(self, employees):
+        self.size = len(employees)
+        self.fields = {
+            field: _FieldIndex([_column(employees, name) for name in columns])
+            for field, columns in SEARCH_FIELDS.items()
+        }
+
+    def search(self, **queries) -> np.ndarray:
+        """
+        Номера сотрудников, подходящих под все непустые запросы
+
+        Args:
+            queries: подстроки по полям SEARCH_FIELDS (name=..., position=..., department=...)
+
+        Returns:
+            возрастающий массив номеров строк
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for field, query in queries.items():
+            if query:
+                mask &= self.fields[field].match(query)
+        return np.flatnonzero(mask)
@@ -0,0 +1,74 @@
+"""Совпадение пакетного и скалярного расчета показателя здоровья"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from employee_manager import Employee
+from health_calculator import DEFAULT_HEALTH_MODEL, HealthCalculator
+
+
+def make_employee(employee_id, diagnoses, disability_group=None, prof_harm_code=None):
+    return Employee({
+        'id': employee_id,
+        'full_name': f'Сотрудник {employee_id}',
+        'position': 'Слесарь',
+        'gender': 'М',
+        'birth_date': '1975-03-01',
+        'start_year': '2001',
+        'diagnoses': diagnoses,
+        'disability_group': disability_group,
+        'prof_harm_code': prof_harm_code,
+    })
+
+
+# Категории в разном порядке, пустые списки диагнозов и неизвестная модели категория
+FIXTURE = [
+    {},
+    {'Сердечно-сосудистые': ['Гипертония']},
+    {'Органы зрения': ['Миопия', 'Катаракта'], 'Сердечно-сосудистые': ['ИБС']},
+    {'ЛОР-органы': ['Тугоухость'], 'Прочие': []},
+    {'Дыхательная система': []},
+    {'Неизвестная категория': ['Диагноз'], 'Эндокринные': ['Диабет', 'Гипотиреоз', 'Ожирение']},
+    {'Прочие': ['А'], 'Опорно-двигательный аппарат': ['Б', 'В'], 'Желудочно-кишечные': ['Г'],
+     'Мочевыделительная система': []},
+]
+
+
+class HealthScoreConsistencyTest(unittest.TestCase):
+    def setUp(self):
+        HealthCalculator.configure(DEFAULT_HEALTH_MODEL)
+        self.employees = [
+            make_employee(index, diagnoses, disability_group=index % 4, prof_harm_code=index % 3 or None)
+            for index, diagnoses in enumerate(FIXTURE, 1)
+        ]
+
+    def test_batch_matches_scalar(self):
+        scalar = [HealthCalculator.calculate_health_score(employee) for employee in self.employees]
+        batch = HealthCalculator.calculate_health_scores_for(self.employees)
+        self.assertEqual(list(batch), scalar)
+
+    def test_default_order_matches_scalar(self):
+        # Без матрицы порядка категории складываются в порядке конфигурации
+        employees = [make_employee(1, {'Сердечно-сосудистые': ['Гипертония'], 'Органы зрения': ['Миопия']})]
+        model = HealthCalculator.get_model()
+        counts = model.build_count_matrix(employees)
+        batch = model.calculate(counts, np.zeros(1, dtype=np.int64), np.array([None], dtype=object))
+        self.assertEqual(batch[0], HealthCalculator.calculate_health_score(employees[0]))
+
+    def test_empty_category_counts_in_weight(self):
+        with_empty = make_employee(1, {'Сердечно-сосудистые': ['Гипертония'], 'Прочие': []})
+        without_empty = make_employee(2, {'Сердечно-сосудистые': ['Гипертония']})
+        weights = DEFAULT_HEALTH_MODEL['category_weights']
+
+        expected = weights['Сердечно-сосудистые'] * 0.5 / (weights['Сердечно-сосудистые'] + weights['Прочие'])
+        self.assertAlmostEqual(HealthCalculator.calculate_health_score(with_empty), expected)
+        self.assertLess(HealthCalculator.calculate_health_score(with_empty),
+                        HealthCalculator.calculate_health_score(without_empty))
+
+
+if __name__ == '__main__':
+    unittest.main()